@@ -23,4 +23,29 @@ app.conf.beat_schedule = {
         "task": "slm.tasks.send_renewal_reminders",
         "schedule": crontab(hour=9, minute=0),
     },
+    "lease-usage-summary": {
+        "task": "slm.tasks.summarize_lease_usage",
+        "schedule": crontab(minute="*/5"),
+    },
+    "monthly-chargeback": {
+        "task": "slm.tasks.compute_monthly_chargeback",
+        "schedule": crontab(day_of_month=1, hour=2, minute=0),
+    },
+    "utilization-snapshot": {
+        "task": "slm.tasks.snapshot_utilization",
+        # Just after midnight, so the rewrite of the previous day sees all of it
+        "schedule": crontab(hour=0, minute=5),
+    },
+    "report-job-purge": {
+        "task": "slm.tasks.purge_report_jobs",
+        "schedule": crontab(hour=3, minute=15),
+    },
+    "audit-log-archive": {
+        "task": "slm.tasks.archive_audit_logs",
+        "schedule": crontab(hour=2, minute=30),
+    },
+    "audit-chain-verify": {
+        "task": "slm.tasks.verify_audit_chain",
+        "schedule": crontab(hour=4, minute=0),
+    },
 }
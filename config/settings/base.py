@@ -127,7 +127,7 @@ REST_FRAMEWORK = {
         "rest_framework.throttling.AnonRateThrottle",
         "rest_framework.throttling.UserRateThrottle",
     ],
-    "DEFAULT_THROTTLE_RATES": {"anon": "100/hour", "user": "1000/hour"},
+    "DEFAULT_THROTTLE_RATES": {"anon": "100/hour", "user": "1000/hour", "leases": "10000/minute"},
 }
 
 # JWT
@@ -151,14 +151,41 @@ CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_TIMEZONE = TIME_ZONE
 
+REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/1")
+
+# Cache (dashboard counters, unread counts, API ETag versions). Web and Celery processes must
+# share it or their table versions drift apart, so it is always Redis: CACHE_URL, else REDIS_URL.
+CACHE_URL = os.environ.get("CACHE_URL") or REDIS_URL
+CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": CACHE_URL}
+}
+
 # Channels (WebSockets)
 CHANNEL_LAYERS = {
     "default": {
         "BACKEND": "channels_redis.core.RedisChannelLayer",
-        "CONFIG": {"hosts": [os.environ.get("REDIS_URL", "redis://localhost:6379/1")]},
+        "CONFIG": {"hosts": [REDIS_URL]},
     }
 }
 
+# Floating (concurrent) license leases: "redis" or in-process "memory"
+LEASE_STORE = os.environ.get("LEASE_STORE", "redis")
+LEASE_REDIS_URL = os.environ.get("LEASE_REDIS_URL", "redis://localhost:6379/2")
+LEASE_DEFAULT_TTL = int(os.environ.get("LEASE_DEFAULT_TTL", "300"))  # seconds
+LEASE_MAX_TTL = int(os.environ.get("LEASE_MAX_TTL", "3600"))
+
+# Currency conversion for spend reports; rates CSV columns: date,currency,rate (value in base currency)
+FX_BASE_CURRENCY = os.environ.get("FX_BASE_CURRENCY", "USD")
+FX_RATES_CSV = os.environ.get("FX_RATES_CSV", str(BASE_DIR / "data" / "fx_rates.csv"))
+
+# Background report results (MEDIA_ROOT/reports/) are deleted after this many days
+REPORT_JOB_RETENTION_DAYS = int(os.environ.get("REPORT_JOB_RETENTION_DAYS", "7"))
+# Jobs pending or running longer than this are marked failed so the same report can be requested again
+REPORT_JOB_TIMEOUT_MINUTES = int(os.environ.get("REPORT_JOB_TIMEOUT_MINUTES", "60"))
+
+# Audit log months older than this move to compressed files under MEDIA_ROOT/audit-archive/
+AUDIT_HOT_MONTHS = int(os.environ.get("AUDIT_HOT_MONTHS", "12"))
+
 # Email (notifications)
 EMAIL_BACKEND = os.environ.get(
     "EMAIL_BACKEND", "django.core.mail.backends.console.EmailBackend"
@@ -12,7 +12,12 @@ if not os.environ.get("DB_NAME"):
         "default": {
             "ENGINE": "django.db.backends.sqlite3",
             "NAME": str(_base / "db.sqlite3"),
+            "TEST": {"NAME": str(_base / "test_db.sqlite3")},
         }
     }
 
 CORS_ALLOW_ALL_ORIGINS = True
+
+# Single-process runserver and tests: keep the cache in memory unless CACHE_URL points at Redis
+if not os.environ.get("CACHE_URL"):
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
@@ -44,3 +44,7 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
+
+# No Redis in minimal installs: keep floating-license leases and the cache in process memory
+LEASE_STORE = "memory"
+CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
@@ -5,7 +5,8 @@ from .models import (
     User, Department, Branch,
     SoftwareAsset, LicenseContract, Allocation, RenewalHistory,
     Vendor, Invoice, Payment,
-    AuditLog, Notification, ReminderSchedule,
+    AuditLog, AuditChainCheckpoint, AuditArchiveSegment, Notification, ReminderSchedule, UtilizationSnapshot,
+    LeaseUsage, ChargebackLine, ImportJob, ExchangeRate, VendorSpendRollup, ReportJob, SpendFact,
 )
 
 
@@ -39,10 +40,10 @@ class BranchAdmin(admin.ModelAdmin):
 
 @admin.register(SoftwareAsset)
 class SoftwareAssetAdmin(admin.ModelAdmin):
-    list_display = ("name", "category", "version", "license_type", "total_licenses", "is_deleted", "updated_at")
+    list_display = ("name", "category", "version", "license_type", "total_licenses", "used_seats", "is_deleted", "updated_at")
     list_filter = ("license_type", "category", "is_deleted")
     search_fields = ("name", "description", "tags")
-    readonly_fields = ("created_at", "updated_at")
+    readonly_fields = ("used_seats", "created_at", "updated_at")
 
 
 @admin.register(LicenseContract)
@@ -104,6 +105,18 @@ class AuditLogAdmin(admin.ModelAdmin):
     date_hierarchy = "timestamp"
 
 
+@admin.register(AuditArchiveSegment)
+class AuditArchiveSegmentAdmin(admin.ModelAdmin):
+    list_display = ("month", "row_count", "first_id", "last_id", "created_at")
+    readonly_fields = ("month", "file", "row_count", "first_id", "last_id", "entities", "sha256", "created_at")
+
+
+@admin.register(AuditChainCheckpoint)
+class AuditChainCheckpointAdmin(admin.ModelAdmin):
+    list_display = ("first_id", "last_id", "row_count", "verified_at")
+    readonly_fields = ("first_id", "last_id", "last_hash", "row_count", "verified_at")
+
+
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
     list_display = ("title", "user", "is_read", "created_at")
@@ -113,3 +126,59 @@ class NotificationAdmin(admin.ModelAdmin):
 @admin.register(ReminderSchedule)
 class ReminderScheduleAdmin(admin.ModelAdmin):
     list_display = ("name", "days_before_due", "is_active")
+
+
+@admin.register(UtilizationSnapshot)
+class UtilizationSnapshotAdmin(admin.ModelAdmin):
+    list_display = ("date", "software_asset", "department", "used_seats", "available_seats")
+    list_filter = ("department",)
+    date_hierarchy = "date"
+
+
+@admin.register(LeaseUsage)
+class LeaseUsageAdmin(admin.ModelAdmin):
+    list_display = ("software_asset", "period_start", "checkouts", "denied", "expired", "peak_concurrent")
+    date_hierarchy = "period_start"
+
+
+@admin.register(ChargebackLine)
+class ChargebackLineAdmin(admin.ModelAdmin):
+    list_display = ("period_start", "period_end", "department", "branch", "software_asset", "currency", "seat_days", "amount")
+    list_filter = ("currency", "branch")
+
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "kind", "status", "processed_rows", "created_count", "updated_count", "error_count", "created_by", "created_at")
+    list_filter = ("kind", "status")
+    readonly_fields = ("errors",)
+
+
+@admin.register(ReportJob)
+class ReportJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "report", "file_type", "status", "row_count", "created_by", "created_at", "finished_at")
+    list_filter = ("report", "status", "file_type")
+    readonly_fields = ("params", "params_hash")
+    filter_horizontal = ("requested_by",)
+
+
+@admin.register(ExchangeRate)
+class ExchangeRateAdmin(admin.ModelAdmin):
+    list_display = ("currency", "date", "rate")
+    list_filter = ("currency",)
+    date_hierarchy = "date"
+
+
+@admin.register(VendorSpendRollup)
+class VendorSpendRollupAdmin(admin.ModelAdmin):
+    list_display = ("vendor", "month", "currency", "invoiced", "invoice_count", "paid", "payment_count")
+    list_filter = ("currency",)
+    date_hierarchy = "month"
+
+
+@admin.register(SpendFact)
+class SpendFactAdmin(admin.ModelAdmin):
+    list_display = ("invoice", "vendor", "department", "software_asset", "month", "currency", "seats", "amount", "paid")
+    list_filter = ("currency",)
+    date_hierarchy = "month"
+    raw_id_fields = ("invoice", "vendor", "department", "software_asset")
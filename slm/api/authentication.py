@@ -0,0 +1,17 @@
+"""Extra DRF authentication schemes."""
+from rest_framework import authentication, exceptions
+
+from slm.services.renewals import feed_token_user
+
+
+class FeedTokenAuthentication(authentication.BaseAuthentication):
+    """Signed ``?token=`` for calendar clients that cannot send session cookies or bearer tokens."""
+
+    def authenticate(self, request):
+        token = request.query_params.get("token")
+        if not token:
+            return None
+        user = feed_token_user(token)
+        if user is None:
+            raise exceptions.AuthenticationFailed("Invalid or revoked feed token.")
+        return user, token
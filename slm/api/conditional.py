@@ -0,0 +1,41 @@
+"""Conditional GET (ETag / Last-Modified) for read endpoints."""
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from slm.services.versions import table_versions
+
+
+class ConditionalGetMixin:
+    """
+    Answer unchanged list/retrieve requests with 304 before touching the queryset.
+
+    Validators are derived from the per-table versions of ``etag_models`` (the
+    view's own model plus whatever its serializer reads), the request path and
+    the Accept header, so one cache lookup decides whether anything changed.
+    """
+    etag_models = ()
+
+    def _validators(self, request):
+        models = self.etag_models or (self.get_queryset().model,)
+        versions = table_versions(models)
+        raw = "|".join([request.get_full_path(), request.META.get("HTTP_ACCEPT", "")] + [str(v) for v in versions])
+        return hashlib.md5(raw.encode()).hexdigest(), max(versions) // 1_000_000_000
+
+    def _conditional(self, handler, request, *args, **kwargs):
+        etag, last_modified = self._validators(request)
+        not_modified = get_conditional_response(request._request, etag=quote_etag(etag), last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            response["ETag"] = quote_etag(etag)
+            response["Last-Modified"] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(super().retrieve, request, *args, **kwargs)
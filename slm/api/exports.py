@@ -0,0 +1,43 @@
+"""Streaming file export for list endpoints."""
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+from slm.services.exports import stream_csv, stream_xlsx, CSV_CONTENT_TYPE, XLSX_CONTENT_TYPE
+
+
+class ExportMixin:
+    """
+    ``GET <list>/export/?file_type=csv|xlsx`` streams the filtered list as a file.
+
+    Rows go straight from ``values_list().iterator()`` to the writer, so the
+    export applies the same filter/search/ordering parameters as the list
+    endpoint without materialising the result set.
+    """
+    export_fields = ()  # (header, lookup) pairs
+    export_name = "export"
+    export_chunk_size = 2000
+
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        file_type = request.query_params.get("file_type", "csv")
+        if file_type not in ("csv", "xlsx"):
+            return Response({"detail": "file_type must be csv or xlsx."}, status=status.HTTP_400_BAD_REQUEST)
+        headers, lookups = zip(*self.export_fields)
+        rows = (
+            self.filter_queryset(self.get_queryset())
+            .prefetch_related(None)
+            .values_list(*lookups)
+            .iterator(chunk_size=self.export_chunk_size)
+        )
+        if file_type == "xlsx":
+            response = StreamingHttpResponse(
+                stream_xlsx(headers, rows, sheet_name=self.export_name.title()), content_type=XLSX_CONTENT_TYPE
+            )
+        else:
+            response = StreamingHttpResponse(stream_csv(headers, rows), content_type=CSV_CONTENT_TYPE)
+        filename = f"{self.export_name}_{timezone.now():%Y%m%d}.{file_type}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
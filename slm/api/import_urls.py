@@ -0,0 +1,7 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from slm.api.views import ImportJobViewSet
+
+router = DefaultRouter()
+router.register("", ImportJobViewSet, basename="import-job")
+urlpatterns = [path("", include(router.urls))]
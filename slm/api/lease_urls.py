@@ -0,0 +1,7 @@
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
+from slm.api.views import LeaseViewSet
+
+router = DefaultRouter()
+router.register("", LeaseViewSet, basename="lease")
+urlpatterns = [path("", include(router.urls))]
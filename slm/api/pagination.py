@@ -0,0 +1,72 @@
+"""
+Keyset ("seek") pagination.
+
+Pages are addressed by the ordering values of the last row served rather than
+by an offset, so page N costs the same as page 1 and no COUNT(*) is issued.
+A view whose rows continue outside the queryset (the archived audit trail)
+can define ``get_archived_rows(after, limit)`` to fill pages past its end.
+"""
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from slm.services.keyset import seek_filter, position, encode_cursor, decode_cursor
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination on ``ordering``; responses carry ``next`` and ``results`` but no count."""
+    ordering = ("-timestamp", "-id")
+    page_size = 50
+    max_page_size = 1000
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    invalid_cursor_message = "Invalid cursor."
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            size = self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        cursor = request.query_params.get(self.cursor_query_param)
+        values = None
+        if cursor:
+            try:
+                values = decode_cursor(queryset.model, self.ordering, cursor)
+            except ValueError:
+                raise NotFound(self.invalid_cursor_message)
+            queryset = queryset.filter(seek_filter(self.ordering, values))
+        rows = list(queryset.order_by(*self.ordering)[:self.page_size + 1])
+        archived = getattr(view, "get_archived_rows", None)
+        if archived is not None and len(rows) <= self.page_size:
+            after = position(rows[-1], self.ordering) if rows else values
+            rows += archived(after, self.page_size + 1 - len(rows))
+        self.next_cursor = None
+        if len(rows) > self.page_size:
+            rows = rows[:self.page_size]
+            self.next_cursor = encode_cursor(position(rows[-1], self.ordering))
+        return rows
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.get_next_link(), "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
@@ -1,9 +1,26 @@
-from django.urls import path
+from django.urls import path, include
+from rest_framework.routers import DefaultRouter
 from slm.api import report_views
+from slm.api.views import ReportJobViewSet
+
+router = DefaultRouter()
+router.register("jobs", ReportJobViewSet, basename="report-job")
 
 urlpatterns = [
     path("inventory/", report_views.ReportInventoryView.as_view(), name="report-inventory"),
     path("renewal-calendar/", report_views.ReportRenewalCalendarView.as_view(), name="report-renewal-calendar"),
+    path(
+        "renewal-calendar/feed-token/", report_views.ReportRenewalCalendarFeedTokenView.as_view(),
+        name="report-renewal-calendar-feed-token",
+    ),
+    path(
+        "renewal-calendar.ics", report_views.ReportRenewalCalendarFeedView.as_view(), name="report-renewal-calendar-ics"
+    ),
     path("vendor-spend/", report_views.ReportVendorSpendView.as_view(), name="report-vendor-spend"),
+    path("spend-cube/", report_views.ReportSpendCubeView.as_view(), name="report-spend-cube"),
+    path("renewal-forecast/", report_views.ReportRenewalForecastView.as_view(), name="report-renewal-forecast"),
+    path("utilization/", report_views.ReportUtilizationTrendView.as_view(), name="report-utilization"),
+    path("chargeback/", report_views.ReportChargebackView.as_view(), name="report-chargeback"),
     path("audit-trail/", report_views.ReportAuditTrailView.as_view(), name="report-audit-trail"),
+    path("", include(router.urls)),
 ]
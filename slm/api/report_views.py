@@ -1,8 +1,9 @@
 """Report API endpoints - return JSON or trigger export."""
+from rest_framework import status, permissions
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from django.db.models import Sum
-from slm.models import SoftwareAsset, LicenseContract, Invoice, AuditLog, Allocation
+from django.db.models import F
+from slm.models import SoftwareAsset, AuditLog
 from slm.permissions import SLMPermission
 
 
@@ -10,47 +11,267 @@ class ReportInventoryView(APIView):
     permission_classes = [SLMPermission]
 
     def get(self, request):
-        data = list(SoftwareAsset.objects.filter(is_deleted=False).values(
-            "id", "name", "category", "version", "license_type", "total_licenses"
+        data = list(SoftwareAsset.objects.filter(is_deleted=False).with_usage(live=True).values(
+            "id", "name", "category", "version", "license_type", "total_licenses",
+            used=F("used_count"), available=F("available_count"),
         ))
-        for a in data:
-            a["used"] = Allocation.objects.filter(software_asset_id=a["id"], active_flag=True).count()
         return Response({"assets": data})
 
 
 class ReportRenewalCalendarView(APIView):
+    """Active contracts expiring in ``[start, end]`` (default: the next year), keyset-paginated via ``after``."""
     permission_classes = [SLMPermission]
+    PAGE_SIZE = 100
+    MAX_PAGE_SIZE = 1000
 
     def get(self, request):
-        from datetime import timedelta
-        from django.utils import timezone
-        today = timezone.now().date()
-        end = today + timedelta(days=365)
-        contracts = LicenseContract.objects.filter(
-            expiry_date__gte=today, expiry_date__lte=end, status="active"
-        ).select_related("software_asset", "vendor").order_by("expiry_date").values(
-            "id", "software_asset__name", "expiry_date", "renewal_due_date", "vendor__company_name"
+        from urllib.parse import urlencode
+        from django.urls import reverse
+        from slm.services import renewals
+
+        params = request.query_params
+        try:
+            start, end = renewals.parse_range(params)
+            limit = min(max(int(params.get("limit", self.PAGE_SIZE)), 1), self.MAX_PAGE_SIZE)
+            contracts, cursor = renewals.keyset_page(
+                renewals.renewal_window(start, end, ["active"]).values(
+                    "id", "software_asset__name", "expiry_date", "renewal_due_date", "vendor__company_name"
+                ),
+                after=params.get("after"),
+                limit=limit,
+            )
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        next_url = None
+        if cursor:
+            next_url = request.build_absolute_uri(
+                "?" + urlencode({"start": start, "end": end, "limit": limit, "after": cursor})
+            )
+        ics_url = request.build_absolute_uri(
+            reverse("report-renewal-calendar-ics")
+            + "?" + urlencode({"start": start, "end": end, "token": renewals.feed_token(request.user)})
         )
-        return Response({"contracts": list(contracts)})
+        return Response({"start": start, "end": end, "contracts": contracts, "next": next_url, "ics_url": ics_url})
+
+
+class ReportRenewalCalendarFeedTokenView(APIView):
+    """POST revokes the caller's feed URLs; the next renewal calendar response carries a new ``ics_url``."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        from slm.services import renewals
+
+        renewals.revoke_feed_tokens(request.user)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ReportRenewalCalendarFeedView(APIView):
+    """iCalendar feed of upcoming renewals; calendar clients authenticate with the signed ``token``."""
+    permission_classes = [SLMPermission]
+
+    def get_authenticators(self):
+        from slm.api.authentication import FeedTokenAuthentication
+        return [FeedTokenAuthentication()] + super().get_authenticators()
+
+    def get(self, request):
+        from django.http import HttpResponse
+        from slm.services import renewals
+
+        try:
+            start, end = renewals.parse_range(request.query_params)
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        feed = renewals.get_renewal_ics(start, end, renewals.feed_audience(request.user))
+        response = HttpResponse(feed, content_type="text/calendar; charset=utf-8")
+        response["Content-Disposition"] = f'inline; filename="renewals_{start}_{end}.ics"'
+        return response
 
 
 class ReportVendorSpendView(APIView):
+    """Vendor spend converted to ``?currency=`` (default FX_BASE_CURRENCY), optionally limited to ``start``/``end`` months."""
     permission_classes = [SLMPermission]
 
     def get(self, request):
-        from slm.models import Vendor
-        spend = Invoice.objects.values("vendor").annotate(total=Sum("total")).order_by("-total")
-        vendor_ids = [s["vendor"] for s in spend if s["vendor"]]
-        vendors = {v.id: v.company_name for v in Vendor.objects.filter(id__in=vendor_ids)}
-        data = [{"vendor_id": s["vendor"], "vendor_name": vendors.get(s["vendor"], "N/A"), "total": str(s["total"])} for s in spend]
-        return Response({"vendor_spend": data})
+        from django.conf import settings
+        from slm.models.invoice import CURRENCY_CHOICES
+        from slm.services.spend import vendor_spend, parse_month
+
+        currency = request.query_params.get("currency", settings.FX_BASE_CURRENCY).upper()
+        try:
+            start = parse_month(request.query_params.get("start"))
+            end = parse_month(request.query_params.get("end"))
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        if currency not in dict(CURRENCY_CHOICES) or currency == "OTHER":
+            return Response({"detail": "Unsupported reporting currency."}, status=status.HTTP_400_BAD_REQUEST)
+        data = [
+            {
+                **row, "total": str(row["total"]), "paid": str(row["paid"]),
+                "unconverted": {c: str(a) for c, a in row["unconverted"].items()},
+            }
+            for row in vendor_spend(currency, start, end)
+        ]
+        return Response({"currency": currency, "start": start, "end": end, "vendor_spend": data})
+
+
+class ReportSpendCubeView(APIView):
+    """
+    Spend sliced by any of vendor, department, branch, asset, month and currency.
+
+    ``group_by`` is a comma-separated list of dimensions; ``vendor``,
+    ``department``, ``branch``, ``asset`` (ids) and ``currency`` (codes) filter
+    with comma-separated values; ``start``/``end`` bound invoice months and
+    ``convert_to`` converts amounts to one currency.
+    """
+    permission_classes = [SLMPermission]
+
+    def get(self, request):
+        from slm.models.invoice import CURRENCY_CHOICES
+        from slm.services.spend import parse_month
+        from slm.services.spend_cube import spend_cube, DIMENSIONS, FILTERS
+
+        params = request.query_params
+        group_by = [d for d in params.get("group_by", "vendor").split(",") if d]
+        convert_to = params.get("convert_to", "").upper() or None
+        try:
+            unknown = [d for d in group_by if d not in DIMENSIONS]
+            if unknown or not group_by:
+                raise ValueError(f"group_by takes a comma-separated list of: {', '.join(DIMENSIONS)}.")
+            if convert_to and (convert_to not in dict(CURRENCY_CHOICES) or convert_to == "OTHER"):
+                raise ValueError("Unsupported reporting currency.")
+            filters = {}
+            for name in FILTERS:
+                values = [v.strip() for v in params.get(name, "").split(",") if v.strip()]
+                if values and name == "currency":
+                    filters[name] = [v.upper() for v in values]
+                elif values:
+                    try:
+                        filters[name] = [int(v) for v in values]
+                    except ValueError:
+                        raise ValueError(f"{name} takes comma-separated ids.")
+            start, end = parse_month(params.get("start")), parse_month(params.get("end"))
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = spend_cube(group_by, filters, start, end, convert_to)
+        data = [
+            {
+                **row, "amount": str(row["amount"]), "paid": str(row["paid"]),
+                **({"unconverted": {c: str(a) for c, a in row["unconverted"].items()}} if "unconverted" in row else {}),
+            }
+            for row in rows
+        ]
+        return Response({"group_by": group_by, "convert_to": convert_to, "start": start, "end": end, "rows": data})
+
+
+class ReportRenewalForecastView(APIView):
+    """
+    Projected renewal spend for the next ``months`` months (default 12, at most 36) in ``?currency=``.
+
+    Totals come by month, vendor and department; ``rightsized`` renews only
+    the seats currently in use.
+    """
+    permission_classes = [SLMPermission]
+
+    def get(self, request):
+        from django.conf import settings
+        from slm.models.invoice import CURRENCY_CHOICES
+        from slm.services.forecast import forecast_renewals, MAX_MONTHS
+
+        currency = request.query_params.get("currency", settings.FX_BASE_CURRENCY).upper()
+        try:
+            months = int(request.query_params.get("months", 12))
+        except ValueError:
+            months = 0
+        if not 1 <= months <= MAX_MONTHS:
+            return Response({"detail": f"months must be 1-{MAX_MONTHS}."}, status=status.HTTP_400_BAD_REQUEST)
+        if currency not in dict(CURRENCY_CHOICES) or currency == "OTHER":
+            return Response({"detail": "Unsupported reporting currency."}, status=status.HTTP_400_BAD_REQUEST)
+
+        forecast = forecast_renewals(months, currency)
+
+        def money(rows):
+            return [{**r, "amount": str(r["amount"]), "rightsized": str(r["rightsized"])} for r in rows]
+
+        return Response({
+            **forecast, "amount": str(forecast["amount"]), "rightsized": str(forecast["rightsized"]),
+            "by_month": money(forecast["by_month"]), "by_vendor": money(forecast["by_vendor"]),
+            "by_department": money(forecast["by_department"]),
+        })
 
 
 class ReportAuditTrailView(APIView):
+    """
+    Newest entries first, keyset-paginated via ``cursor``/``page_size``; follow
+    ``next`` for older ones, including archived months.
+    """
     permission_classes = [SLMPermission]
+    fields = ("id", "entity", "change_type", "user__email", "ip_address", "timestamp")
+
+    def get_archived_rows(self, after, limit):
+        from slm.services.audit_archive import archived_rows
+        return archived_rows(after, limit, fields=self.fields)
 
     def get(self, request):
-        logs = AuditLog.objects.select_related("user").order_by("-timestamp")[:500].values(
-            "id", "entity", "change_type", "user__email", "ip_address", "timestamp"
-        )
-        return Response({"audit_logs": list(logs)})
+        from slm.api.pagination import KeysetPagination
+
+        paginator = KeysetPagination()
+        logs = paginator.paginate_queryset(AuditLog.objects.values(*self.fields), request, view=self)
+        return Response({"audit_logs": logs, "next": paginator.get_next_link()})
+
+
+class ReportUtilizationTrendView(APIView):
+    """Daily seat usage from UtilizationSnapshot, filterable by asset, department and branch."""
+    permission_classes = [SLMPermission]
+
+    def get(self, request):
+        from django.utils.dateparse import parse_date
+        from slm.services.reports import REPORTS
+        from slm.services.utilization import utilization_trend
+
+        try:
+            params = REPORTS["utilization"]().clean(request.query_params)
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        start, end = parse_date(params["start"]), parse_date(params["end"])
+        asset = SoftwareAsset.objects.get(pk=params["asset"]) if params["asset"] else None
+        series = utilization_trend(start, end, asset, params["department"], params["branch"])
+        return Response({"start": start, "end": end, "series": series})
+
+
+class ReportChargebackView(APIView):
+    """Spend charged back to departments or branches for a period (?export=csv for a file)."""
+    permission_classes = [SLMPermission]
+
+    def get(self, request):
+        import csv
+        from django.http import HttpResponse
+        from django.utils.dateparse import parse_date
+        from slm.services.chargeback import chargeback_summary
+        from slm.services.reports import REPORTS
+
+        params = request.query_params
+        try:
+            cleaned = REPORTS["chargeback"]().clean(params)
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        start, end, group = parse_date(cleaned["start"]), parse_date(cleaned["end"]), cleaned["group_by"]
+        recompute = params.get("recompute") == "1"
+        if recompute and not request.user.can_edit_finance:
+            # Recomputing rewrites the stored ChargebackLine rows
+            return Response(
+                {"detail": "Recomputing chargeback needs finance permissions."}, status=status.HTTP_403_FORBIDDEN
+            )
+
+        rows = chargeback_summary(start, end, group, recompute=recompute)
+
+        if params.get("export") == "csv":
+            response = HttpResponse(content_type="text/csv")
+            response["Content-Disposition"] = f'attachment; filename="chargeback_{group}_{start}_{end}.csv"'
+            writer = csv.writer(response)
+            writer.writerow([group, "code", "name", "currency", "seat_days", "amount"])
+            for r in rows:
+                writer.writerow([r["id"], r["code"], r["name"], r["currency"], r["seat_days"], r["amount"]])
+            return response
+        return Response({"start": start, "end": end, "group_by": group, "rows": rows})
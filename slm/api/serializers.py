@@ -1,11 +1,12 @@
 """Serializers for SLM API."""
 from rest_framework import serializers
+from rest_framework.reverse import reverse
 from django.contrib.auth import get_user_model
 from slm.models import (
     Department, Branch,
     SoftwareAsset, LicenseContract, Allocation, RenewalHistory,
     Vendor, Invoice, Payment,
-    AuditLog, Notification,
+    AuditLog, Notification, ImportJob, ReportJob,
 )
 
 User = get_user_model()
@@ -31,8 +32,9 @@ class BranchSerializer(serializers.ModelSerializer):
 
 
 class SoftwareAssetSerializer(serializers.ModelSerializer):
-    used_licenses = serializers.ReadOnlyField()
-    available_licenses = serializers.ReadOnlyField()
+    # Read from SoftwareAsset.objects.with_usage() annotations when present
+    used_licenses = serializers.IntegerField(read_only=True)
+    available_licenses = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = SoftwareAsset
@@ -115,9 +117,51 @@ class AuditLogSerializer(serializers.ModelSerializer):
         fields = ("id", "entity", "object_id", "change_type", "old_value", "new_value", "user", "user_email", "ip_address", "timestamp", "extra")
         read_only_fields = fields
 
+    def to_representation(self, instance):
+        from slm.services.audit import expand
+
+        data = super().to_representation(instance)
+        if instance.changes:
+            data["old_value"], data["new_value"] = expand(instance.change_type, instance.changes)
+        return data
+
 
 class NotificationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Notification
         fields = ("id", "title", "message", "link", "is_read", "notification_type", "created_at")
         read_only_fields = ("created_at",)
+
+
+class ReportJobSerializer(serializers.ModelSerializer):
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ReportJob
+        fields = (
+            "id", "report", "file_type", "params", "status", "row_count", "message", "download_url",
+            "created_at", "started_at", "finished_at",
+        )
+        read_only_fields = fields
+
+    def get_download_url(self, obj):
+        if obj.status != "completed":
+            return None
+        return reverse("report-job-download", args=[obj.pk], request=self.context.get("request"))
+
+
+class ImportJobSerializer(serializers.ModelSerializer):
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ImportJob
+        fields = (
+            "id", "kind", "status", "total_rows", "processed_rows", "progress", "created_count",
+            "updated_count", "error_count", "errors", "message", "created_at", "started_at", "finished_at",
+        )
+        read_only_fields = fields
+
+    def get_progress(self, obj):
+        if obj.status == "completed":
+            return 100
+        return min(99, obj.processed_rows * 100 // obj.total_rows) if obj.total_rows else 0
@@ -1,25 +1,43 @@
 """API ViewSets for SLM."""
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from rest_framework.reverse import reverse
+from rest_framework.throttling import ScopedRateThrottle
 from django_filters.rest_framework import DjangoFilterBackend
+from django.http import StreamingHttpResponse, FileResponse
 from django.utils import timezone
-from django.db.models import Sum, Count, Q
+from django.db import transaction
+from django.db.models import Count, Q
 
 from slm.models import (
     SoftwareAsset, LicenseContract, Allocation, RenewalHistory,
-    Vendor, Invoice, Payment, AuditLog, Notification,
+    Vendor, Invoice, Payment, AuditLog, AuditArchiveSegment, Notification, Department, User, ImportJob, ReportJob,
 )
 from slm.api.serializers import (
     SoftwareAssetSerializer, LicenseContractSerializer, AllocationSerializer,
     RenewalHistorySerializer, VendorSerializer, InvoiceSerializer, PaymentSerializer,
-    AuditLogSerializer, NotificationSerializer,
+    AuditLogSerializer, NotificationSerializer, ImportJobSerializer, ReportJobSerializer,
 )
 from slm.permissions import SLMPermission, CanEditAssets, CanEditFinance
+from slm.api.conditional import ConditionalGetMixin
+from slm.api.exports import ExportMixin
+from slm.api.pagination import KeysetPagination
+from slm.services.allocation import allocate, update_allocation, bulk_allocate, bulk_return, SeatsUnavailable
+from slm.services.usage_index import get_usage_index
+from slm.services import leases
+from slm.services.dashboard import get_dashboard_stats
+from slm.services import notifications
+from slm.services.imports import IMPORTERS, FILE_TYPES
+from slm.services.exports import stream_ndjson, NDJSON_CONTENT_TYPE, CSV_CONTENT_TYPE
+from slm.services import reports
+from slm.services import audit, audit_archive
+from slm.tasks import import_file, generate_report
 
 
-class SoftwareAssetViewSet(viewsets.ModelViewSet):
-    queryset = SoftwareAsset.objects.filter(is_deleted=False).select_related("created_by")
+class SoftwareAssetViewSet(ExportMixin, ConditionalGetMixin, viewsets.ModelViewSet):
+    queryset = SoftwareAsset.objects.filter(is_deleted=False).select_related("created_by").with_usage()
     serializer_class = SoftwareAssetSerializer
     permission_classes = [SLMPermission, CanEditAssets]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -27,6 +45,13 @@ class SoftwareAssetViewSet(viewsets.ModelViewSet):
     search_fields = ["name", "description", "tags", "version"]
     ordering_fields = ["name", "total_licenses", "updated_at"]
     ordering = ["name"]
+    etag_models = (SoftwareAsset, Allocation)
+    export_name = "assets"
+    export_fields = (
+        ("ID", "id"), ("Name", "name"), ("Category", "category"), ("Version", "version"),
+        ("License Type", "license_type"), ("Total", "total_licenses"), ("Used", "used_count"),
+        ("Available", "available_count"), ("Tags", "tags"), ("Created", "created_at"),
+    )
 
     def perform_destroy(self, instance):
         instance.is_deleted = True
@@ -34,16 +59,24 @@ class SoftwareAssetViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=["post"])
     def bulk_import(self, request):
-        # Placeholder: parse Excel/CSV and create assets
-        return Response({"detail": "Use web upload for bulk import."}, status=status.HTTP_400_BAD_REQUEST)
-
-    @action(detail=False, methods=["get"])
-    def export(self, request):
-        # Placeholder: return CSV/Excel
-        return Response({"detail": "Use web export."}, status=status.HTTP_400_BAD_REQUEST)
+        """Queue a CSV/XLSX import (kind: assets, vendors, contracts or allocations); poll /api/imports/<id>/."""
+        upload = request.FILES.get("file")
+        kind = request.data.get("kind", "assets")
+        if kind not in IMPORTERS:
+            return Response({"detail": f"kind must be one of: {', '.join(IMPORTERS)}."}, status=status.HTTP_400_BAD_REQUEST)
+        if upload is None or not upload.name.lower().endswith(FILE_TYPES):
+            return Response({"detail": "Upload a .csv or .xlsx file as 'file'."}, status=status.HTTP_400_BAD_REQUEST)
+        if kind == "vendors" and not request.user.can_edit_finance:
+            return Response({"detail": "Vendor imports need finance permissions."}, status=status.HTTP_403_FORBIDDEN)
+        job = ImportJob.objects.create(kind=kind, file=upload, created_by=request.user)
+        transaction.on_commit(lambda: import_file.delay(job.pk))
+        return Response(
+            ImportJobSerializer(job).data, status=status.HTTP_202_ACCEPTED,
+            headers={"Location": reverse("import-job-detail", args=[job.pk], request=request)},
+        )
 
 
-class LicenseContractViewSet(viewsets.ModelViewSet):
+class LicenseContractViewSet(ExportMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = LicenseContract.objects.select_related("software_asset", "vendor")
     serializer_class = LicenseContractSerializer
     permission_classes = [SLMPermission, CanEditAssets]
@@ -51,6 +84,14 @@ class LicenseContractViewSet(viewsets.ModelViewSet):
     filterset_fields = ["status", "support_level"]
     ordering_fields = ["expiry_date", "renewal_due_date", "purchase_date"]
     ordering = ["-expiry_date"]
+    etag_models = (LicenseContract, SoftwareAsset, Vendor)
+    export_name = "contracts"
+    export_fields = (
+        ("ID", "id"), ("Asset", "software_asset__name"), ("Vendor", "vendor__company_name"),
+        ("Purchase Date", "purchase_date"), ("Duration (months)", "duration_months"),
+        ("Expiry Date", "expiry_date"), ("Renewal Due", "renewal_due_date"), ("Status", "status"),
+        ("Support Level", "support_level"),
+    )
 
     @action(detail=True, methods=["post"])
     def renew(self, request, pk=None):
@@ -75,55 +116,309 @@ class LicenseContractViewSet(viewsets.ModelViewSet):
         return Response(LicenseContractSerializer(contract).data)
 
 
-class AllocationViewSet(viewsets.ModelViewSet):
+def _parse_instant(value, end_of_day=False):
+    """Parse an ISO datetime, or a date meaning its start (or end) of day, as an aware datetime."""
+    from datetime import datetime, time
+    from django.utils.dateparse import parse_date, parse_datetime
+
+    if not value:
+        return None
+    try:
+        day = parse_date(value)
+        if day is not None:
+            parsed = datetime.combine(day, time.max if end_of_day else time.min)
+        else:
+            parsed = parse_datetime(value)
+    except ValueError:
+        return None
+    if parsed is None:
+        return None
+    return parsed if timezone.is_aware(parsed) else timezone.make_aware(parsed)
+
+
+class AllocationViewSet(ExportMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Allocation.objects.select_related("software_asset", "department", "user")
     serializer_class = AllocationSerializer
     permission_classes = [SLMPermission, CanEditAssets]
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ["software_asset", "department", "active_flag"]
     ordering = ["-allocated_on"]
+    etag_models = (Allocation, SoftwareAsset, Department, User)
+    export_name = "allocations"
+    export_fields = (
+        ("ID", "id"), ("Asset", "software_asset__name"), ("Department", "department__code"),
+        ("User", "user__email"), ("Allocated On", "allocated_on"), ("Returned On", "returned_on"),
+        ("Active", "active_flag"), ("Notes", "notes"),
+    )
+    BULK_MAX_ROWS = 10000
+
+    @staticmethod
+    def _seats_unavailable(exc):
+        return Response(
+            {"detail": "No available licenses. Over-allocation not allowed.", "software_asset": exc.asset_id},
+            status=status.HTTP_409_CONFLICT,
+        )
 
     def perform_create(self, serializer):
-        serializer.save()
+        serializer.instance = allocate(Allocation(**serializer.validated_data))
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        asset = SoftwareAsset.objects.get(pk=serializer.validated_data["software_asset"].id)
-        used = asset.allocations.filter(active_flag=True).count()
-        if used >= asset.total_licenses:
+        try:
+            self.perform_create(serializer)
+        except SeatsUnavailable as exc:
+            return self._seats_unavailable(exc)
+        headers = self.get_success_headers(serializer.data)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+
+    def perform_update(self, serializer):
+        allocation = serializer.instance
+        for name, value in serializer.validated_data.items():
+            setattr(allocation, name, value)
+        serializer.instance = update_allocation(allocation)
+
+    def update(self, request, *args, **kwargs):
+        try:
+            return super().update(request, *args, **kwargs)
+        except SeatsUnavailable as exc:
+            return self._seats_unavailable(exc)
+
+    def _bulk_rows(self, request):
+        rows = request.data.get("rows") if isinstance(request.data, dict) else request.data
+        if not isinstance(rows, list) or not rows:
+            return None, Response({"detail": "rows must be a non-empty list."}, status=status.HTTP_400_BAD_REQUEST)
+        if len(rows) > self.BULK_MAX_ROWS:
+            return None, Response(
+                {"detail": f"At most {self.BULK_MAX_ROWS} rows per request."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        return rows, None
+
+    @staticmethod
+    def _bulk_response(results, ok_status):
+        succeeded = sum(1 for r in results if r["status"] == ok_status)
+        return Response({"succeeded": succeeded, "failed": len(results) - succeeded, "results": results})
+
+    def _usage_asset(self, request):
+        try:
+            return SoftwareAsset.objects.get(pk=request.query_params.get("asset"))
+        except (SoftwareAsset.DoesNotExist, ValueError, TypeError):
+            return None
+
+    @action(detail=False, methods=["get"], url_path="usage-at")
+    def usage_at(self, request):
+        """Seats of ?asset= in use at ?at= (ISO datetime, or a date meaning end of that day)."""
+        asset = self._usage_asset(request)
+        at = _parse_instant(request.query_params.get("at"), end_of_day=True) or timezone.now()
+        if asset is None:
+            return Response({"detail": "asset must be a valid asset id."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            "software_asset": asset.pk,
+            "at": at,
+            "used": get_usage_index(asset.pk).at(at),
+            "total_licenses": asset.total_licenses,
+        })
+
+    @action(detail=False, methods=["get"], url_path="usage-peak")
+    def usage_peak(self, request):
+        """Peak concurrent seats of ?asset= between ?start= and ?end= (ISO datetimes or dates)."""
+        asset = self._usage_asset(request)
+        start = _parse_instant(request.query_params.get("start"))
+        end = _parse_instant(request.query_params.get("end"), end_of_day=True) or timezone.now()
+        if asset is None or start is None or start > end:
             return Response(
-                {"detail": "No available licenses. Over-allocation not allowed."},
+                {"detail": "asset, start and end are required and start must not be after end."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        self.perform_create(serializer)
-        headers = self.get_success_headers(serializer.data)
-        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
+        peak, peak_at = get_usage_index(asset.pk).peak(start, end)
+        return Response({
+            "software_asset": asset.pk,
+            "start": start,
+            "end": end,
+            "peak": peak,
+            "peak_at": peak_at,
+            "total_licenses": asset.total_licenses,
+        })
+
+    @action(detail=False, methods=["post"])
+    def bulk_allocate(self, request):
+        """Allocate many (software_asset, department, user) rows in one transaction."""
+        rows, error = self._bulk_rows(request)
+        if error:
+            return error
+        return self._bulk_response(bulk_allocate(rows), "created")
+
+    @action(detail=False, methods=["post"])
+    def bulk_return(self, request):
+        """Return many allocations (by id or software_asset + user) in one transaction."""
+        rows, error = self._bulk_rows(request)
+        if error:
+            return error
+        return self._bulk_response(bulk_return(rows), "returned")
+
+
+class LeaseViewSet(viewsets.ViewSet):
+    """Checkout / renew / checkin of floating seats on concurrent-type assets."""
+    permission_classes = [SLMPermission]
+    throttle_classes = [ScopedRateThrottle]
+    throttle_scope = "leases"
+    lookup_value_regex = r"[0-9]+\.[0-9a-f]+"
+
+    def list(self, request):
+        try:
+            asset_id = int(request.query_params.get("asset"))
+            capacity = leases.lease_capacity(asset_id)
+        except (TypeError, ValueError, leases.LeaseError):
+            return Response({"detail": "asset must be a concurrent-type asset id."}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"software_asset": asset_id, "active": leases.active_leases(asset_id), "capacity": capacity})
+
+    @action(detail=False, methods=["post"])
+    def checkout(self, request):
+        try:
+            lease = leases.checkout(int(request.data.get("asset")), request.data.get("ttl"))
+        except (TypeError, ValueError):
+            return Response({"detail": "asset must be an asset id."}, status=status.HTTP_400_BAD_REQUEST)
+        except leases.LeaseError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        if lease is None:
+            return Response({"detail": "All floating seats are leased."}, status=status.HTTP_409_CONFLICT)
+        lease_id, expires = lease
+        return Response({"lease_id": lease_id, "expires_at": expires}, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=["post"])
+    def renew(self, request, pk=None):
+        try:
+            expires = leases.renew(pk, request.data.get("ttl"))
+        except leases.LeaseError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        if expires is None:
+            return Response({"detail": "Lease expired or unknown."}, status=status.HTTP_404_NOT_FOUND)
+        return Response({"lease_id": pk, "expires_at": expires})
+
+    @action(detail=True, methods=["post"])
+    def checkin(self, request, pk=None):
+        try:
+            released = leases.checkin(pk)
+        except leases.LeaseError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        if not released:
+            return Response({"detail": "Lease expired or unknown."}, status=status.HTTP_404_NOT_FOUND)
+        return Response({"status": "ok"})
 
 
-class VendorViewSet(viewsets.ModelViewSet):
+class VendorViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Vendor.objects.all()
     serializer_class = VendorSerializer
     permission_classes = [SLMPermission, CanEditFinance]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     search_fields = ["company_name", "contact_person", "email"]
+    etag_models = (Vendor,)
 
 
-class InvoiceViewSet(viewsets.ModelViewSet):
+class InvoiceViewSet(ExportMixin, ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Invoice.objects.select_related("vendor", "license_contract", "created_by").prefetch_related("payments")
     permission_classes = [SLMPermission, CanEditFinance]
     serializer_class = InvoiceSerializer
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter]
     filterset_fields = ["vendor", "currency"]
     ordering = ["-invoice_date"]
+    etag_models = (Invoice, Payment)
+    export_name = "invoices"
+    export_fields = (
+        ("ID", "id"), ("Invoice Number", "invoice_number"), ("Invoice Date", "invoice_date"),
+        ("Vendor", "vendor__company_name"), ("Contract", "license_contract_id"), ("Subtotal", "subtotal"),
+        ("Tax", "tax"), ("Total", "total"), ("Currency", "currency"),
+    )
 
 
-class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = AuditLog.objects.select_related("user").order_by("-timestamp")
+class AuditLogViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Newest first, keyset-paginated on ``(timestamp, id)``. ``timestamp__gte`` /
+    ``timestamp__lt`` bound the range; ``field`` (an attname) with optional
+    ``old`` / ``new`` values finds field-level changes through the
+    AuditFieldChange index. ``export/`` streams the filtered trail oldest first
+    as NDJSON. Both continue into archived months.
+    """
+    queryset = AuditLog.objects.select_related("user").order_by("-timestamp", "-id")
     serializer_class = AuditLogSerializer
     permission_classes = [SLMPermission]
+    pagination_class = KeysetPagination
     filter_backends = [DjangoFilterBackend]
-    filterset_fields = ["entity", "change_type", "user"]
+    filterset_fields = {
+        "entity": ["exact"], "object_id": ["exact"], "change_type": ["exact"], "user": ["exact"],
+        "timestamp": ["gte", "lt"],
+    }
+    etag_models = (AuditLog, AuditArchiveSegment, User)
+    export_fields = (
+        "id", "timestamp", "entity", "object_id", "change_type", "old_value", "new_value",
+        "user_id", "user__email", "ip_address", "user_agent", "extra",
+    )
+    export_chunk_size = 5000
+
+    def get_archive_query(self):
+        """``(start, end, filters)`` for the archived trail from the validated query filters."""
+        filterset = DjangoFilterBackend().get_filterset(self.request, self.get_queryset(), self)
+        data = filterset.form.cleaned_data if filterset.is_valid() else {}
+        filters = {name: data[name] for name in ("entity", "change_type") if data.get(name)}
+        if data.get("object_id") is not None:
+            filters["object_id"] = data["object_id"]
+        if data.get("user"):
+            filters["user_id"] = data["user"].pk
+        return data.get("timestamp__gte"), data.get("timestamp__lt"), filters
+
+    def get_field_search(self):
+        params = self.request.query_params
+        if not any(params.get(name) for name in ("field", "old", "new")):
+            return None
+        if not params.get("field"):
+            raise ValidationError({"field": "Give the field whose old/new value to match."})
+        return audit.FieldSearch(
+            params["field"], params.get("old") or None, params.get("new") or None, params.get("entity")
+        )
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        search = self.get_field_search()
+        return search.filter(queryset) if search else queryset
+
+    def get_archived_rows(self, after, limit):
+        start, end, filters = self.get_archive_query()
+        return audit_archive.archived_rows(after, limit, start, end, filters, search=self.get_field_search())
+
+    @action(detail=False, methods=["get"])
+    def state(self, request):
+        """Fields of ?entity= #?object_id= at ?at= (ISO datetime, or a date meaning end of that day), from the trail."""
+        models = {model.__name__: model for model in audit.AUDITED_MODELS}
+        model = models.get(request.query_params.get("entity"))
+        at = request.query_params.get("at")
+        when = _parse_instant(at, end_of_day=True)
+        try:
+            object_id = int(request.query_params.get("object_id", ""))
+        except ValueError:
+            object_id = None
+        if model is None or object_id is None or (at and when is None):
+            return Response(
+                {"detail": f"Give entity ({', '.join(models)}), object_id and optionally at (ISO date/datetime)."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        values = audit.state_at(model, object_id, when)
+        return Response({
+            "entity": model.__name__, "object_id": object_id, "at": when or timezone.now(),
+            "exists": values is not None, "state": values,
+        })
+
+    @action(detail=False, methods=["get"])
+    def export(self, request):
+        self.filter_queryset(self.get_queryset())  # rejects invalid filters
+        start, end, filters = self.get_archive_query()
+        rows = map(audit.expand_row, audit_archive.iter_entries(
+            start, end, filters, self.export_fields + ("changes",), chunk_size=self.export_chunk_size,
+            search=self.get_field_search(),
+        ))
+        response = StreamingHttpResponse(stream_ndjson(rows), content_type=NDJSON_CONTENT_TYPE)
+        response["Content-Disposition"] = f'attachment; filename="audit_log_{timezone.now():%Y%m%d}.ndjson"'
+        return response
 
 
 class NotificationViewSet(viewsets.ModelViewSet):
@@ -141,7 +436,7 @@ class NotificationViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=["post"])
     def mark_all_read(self, request):
-        Notification.objects.filter(user=request.user).update(is_read=True)
+        notifications.mark_all_read(request.user)
         return Response({"status": "ok"})
 
 
@@ -150,23 +445,63 @@ class DashboardStatsViewSet(viewsets.ViewSet):
     permission_classes = [SLMPermission]
 
     def list(self, request):
-        today = timezone.now().date()
-        from datetime import timedelta
-        next_30 = today + timedelta(days=30)
-        next_90 = today + timedelta(days=90)
-        assets = SoftwareAsset.objects.filter(is_deleted=False)
-        contracts = LicenseContract.objects.all()
-        active_contracts = contracts.filter(status="active")
-        expiring_30 = active_contracts.filter(expiry_date__lte=next_30, expiry_date__gte=today)
-        expiring_90 = active_contracts.filter(expiry_date__lte=next_90, expiry_date__gt=next_30)
-        expired = contracts.filter(expiry_date__lt=today, status="active")
-        total_spend = Invoice.objects.aggregate(s=Sum("total"))["s"] or 0
-        return Response({
-            "total_assets": assets.count(),
-            "active_contracts": active_contracts.count(),
-            "expiring_in_30_days": expiring_30.count(),
-            "expiring_in_90_days": expiring_90.count(),
-            "expired_pending": expired.count(),
-            "total_spend": str(total_spend),
-            "total_vendors": Vendor.objects.filter(is_active=True).count(),
-        })
+        stats = get_dashboard_stats()
+        return Response({**stats, "total_spend": str(stats["total_spend"])})
+
+
+class ImportJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Status, progress and rejected rows of bulk import jobs."""
+    serializer_class = ImportJobSerializer
+    permission_classes = [SLMPermission]
+
+    def get_queryset(self):
+        jobs = ImportJob.objects.all()
+        if self.request.user.role != "super_admin":
+            jobs = jobs.filter(created_by=self.request.user)
+        return jobs
+
+
+class ReportJobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    Queue a report (POST ``report``, ``file_type`` csv|json, ``params``) and poll or download it.
+
+    Identical requests over unchanged data share one job. Creating a job only
+    reads data, so auditors may queue reports too.
+    """
+    serializer_class = ReportJobSerializer
+    permission_classes = [SLMPermission]
+    auditor_actions = ("create",)
+
+    def get_queryset(self):
+        jobs = ReportJob.objects.all()
+        if self.request.user.role != "super_admin":
+            jobs = jobs.filter(requested_by=self.request.user)
+        return jobs
+
+    def create(self, request):
+        params = request.data.get("params") or {}
+        if not isinstance(params, dict):
+            return Response({"detail": "params must be an object."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            job, created = reports.request_report(
+                request.user, request.data.get("report"), request.data.get("file_type", "csv"), params
+            )
+        except ValueError as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        if created:
+            transaction.on_commit(lambda: generate_report.delay(job.pk))
+        return Response(
+            self.get_serializer(job).data,
+            status=status.HTTP_200_OK if job.status == "completed" else status.HTTP_202_ACCEPTED,
+            headers={"Location": reverse("report-job-detail", args=[job.pk], request=request)},
+        )
+
+    @action(detail=True, methods=["get"])
+    def download(self, request, pk=None):
+        job = self.get_object()
+        if job.status != "completed" or not job.file:
+            return Response({"detail": f"Report is {job.status}."}, status=status.HTTP_409_CONFLICT)
+        return FileResponse(
+            job.file.open("rb"), as_attachment=True, filename=f"{job.report}_{job.pk}.{job.file_type}",
+            content_type=CSV_CONTENT_TYPE if job.file_type == "csv" else "application/json",
+        )
@@ -8,6 +8,8 @@ urlpatterns = [
     path("assets/", include("slm.api.asset_urls")),
     path("contracts/", include("slm.api.contract_urls")),
     path("allocations/", include("slm.api.allocation_urls")),
+    path("leases/", include("slm.api.lease_urls")),
+    path("imports/", include("slm.api.import_urls")),
     path("vendors/", include("slm.api.vendor_urls")),
     path("invoices/", include("slm.api.invoice_urls")),
     path("dashboard/", include("slm.api.dashboard_urls")),
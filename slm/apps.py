@@ -5,3 +5,6 @@ class SlmConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "slm"
     verbose_name = "Software & License Management"
+
+    def ready(self):
+        from slm import signals  # noqa: F401
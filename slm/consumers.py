@@ -4,6 +4,8 @@ from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from asgiref.sync import sync_to_async
 
+from slm.services.notifications import GROUP_NAME
+
 
 class NotificationConsumer(AsyncWebsocketConsumer):
     async def connect(self):
@@ -11,7 +13,7 @@ class NotificationConsumer(AsyncWebsocketConsumer):
         if not self.user or not self.user.is_authenticated:
             await self.close()
             return
-        self.room_name = f"user_{self.user.id}"
+        self.room_name = GROUP_NAME.format(self.user.id)
         await self.channel_layer.group_add(self.room_name, self.channel_name)
         await self.accept()
 
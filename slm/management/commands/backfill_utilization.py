@@ -0,0 +1,32 @@
+"""Backfill daily utilization snapshots from allocation history."""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from slm.models import Allocation
+from slm.services.utilization import rebuild_snapshots
+
+
+class Command(BaseCommand):
+    help = "Rebuild UtilizationSnapshot rows for a date range in one sweep over allocation intervals."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", help="First day (YYYY-MM-DD); defaults to the earliest allocation.")
+        parser.add_argument("--end", help="Last day (YYYY-MM-DD); defaults to today.")
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        end = parse_date(options["end"]) if options["end"] else timezone.now().date()
+        if options["start"]:
+            start = parse_date(options["start"])
+        else:
+            first = Allocation.objects.aggregate(d=Min("allocated_on"))["d"]
+            start = timezone.localtime(first).date() if first else end
+        if not start or not end or start > end:
+            raise CommandError("Give a valid --start/--end range (YYYY-MM-DD, start <= end).")
+        written = rebuild_snapshots(start, end, batch_size=options["batch_size"])
+        days = (end - start + timedelta(days=1)).days
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} snapshot rows covering {days} day(s)."))
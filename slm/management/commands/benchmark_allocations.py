@@ -0,0 +1,57 @@
+"""Benchmark contended seat allocation."""
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, close_old_connections
+
+from slm.models import Department, SoftwareAsset, Allocation
+from slm.services.allocation import allocate, SeatsUnavailable
+
+
+class Command(BaseCommand):
+    help = (
+        "Time concurrent allocate() calls racing for the seats of one synthetic asset; the asset, its "
+        "allocations and the department are deleted afterwards. Needs a file-backed or server database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seats", type=int, default=50, help="Seats on the contended asset.")
+        parser.add_argument("--attempts", type=int, default=300, help="Allocation attempts in total.")
+        parser.add_argument("--workers", type=int, default=16, help="Concurrent threads.")
+        parser.add_argument("--runs", type=int, default=3, help="Runs, one line each.")
+
+    def handle(self, *args, **options):
+        if min(options["seats"], options["attempts"], options["workers"], options["runs"]) < 1:
+            raise CommandError("--seats, --attempts, --workers and --runs must be positive.")
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            raise CommandError("Threads cannot share an in-memory SQLite database.")
+
+        seats, attempts = options["seats"], options["attempts"]
+        self.stdout.write(f"{'seats':>6} {'attempts':>9} {'granted':>8} {'seconds':>9} {'allocations/s':>14}")
+        for _ in range(options["runs"]):
+            tag = uuid.uuid4().hex[:8]
+            dept = Department.objects.create(name=f"Bench {tag}", code=f"B{tag}")
+            asset = SoftwareAsset.objects.create(name=f"Bench {tag}", total_licenses=seats)
+
+            def attempt(_):
+                try:
+                    allocate(Allocation(software_asset_id=asset.pk, department_id=dept.pk))
+                    return True
+                except SeatsUnavailable:
+                    return False
+                finally:
+                    close_old_connections()
+                    connection.close()
+
+            try:
+                started = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=options["workers"]) as pool:
+                    granted = sum(pool.map(attempt, range(attempts)))
+                elapsed = time.perf_counter() - started
+            finally:
+                Allocation.objects.filter(software_asset=asset).delete()
+                asset.delete()
+                dept.delete()
+            self.stdout.write(f"{seats:>6} {attempts:>9} {granted:>8} {elapsed:>9.3f} {attempts / elapsed:>14.0f}")
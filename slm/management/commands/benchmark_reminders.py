@@ -0,0 +1,94 @@
+"""Benchmark renewal reminder generation on synthetic tenants."""
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from slm.models import SoftwareAsset, Vendor, LicenseContract, ReminderSchedule, User, Notification
+from slm.tasks import send_renewal_reminders, REMINDER_ROLES
+
+DAYS_BEFORE = 30
+
+
+class _Rollback(Exception):
+    pass
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def _tenant(contracts, managers):
+    """Managers, one reminder schedule and ``contracts`` active contracts due for it."""
+    tag = uuid.uuid4().hex[:8]
+    due = timezone.now().date() + timedelta(days=DAYS_BEFORE)
+    ReminderSchedule.objects.create(name=f"bench-{tag}", days_before_due=DAYS_BEFORE)
+    User.objects.bulk_create([
+        User(email=f"bench-{tag}-{i}@example.com", role=REMINDER_ROLES[i % len(REMINDER_ROLES)])
+        for i in range(managers)
+    ])
+    asset = SoftwareAsset.objects.create(name=f"Bench {tag}")
+    vendor = Vendor.objects.create(company_name=f"Bench {tag}")
+    LicenseContract.objects.bulk_create([
+        LicenseContract(
+            software_asset=asset, vendor=vendor, purchase_date=due - timedelta(days=335),
+            expiry_date=due + timedelta(days=30), renewal_due_date=due,
+        )
+        for _ in range(contracts)
+    ], batch_size=2000)
+
+
+class Command(BaseCommand):
+    help = (
+        "Time send_renewal_reminders on synthetic tenants (contracts x managers) inside a transaction "
+        "that is rolled back; emails go to the in-memory backend."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes", default="100x10,500x40,2000x100",
+            help="Comma-separated CONTRACTSxMANAGERS tenant sizes.",
+        )
+        parser.add_argument("--runs", type=int, default=3, help="Runs per size; the fastest is reported.")
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [tuple(int(n) for n in size.lower().split("x")) for size in options["sizes"].split(",")]
+            if any(len(size) != 2 or min(size) < 1 for size in sizes) or options["runs"] < 1:
+                raise ValueError
+        except ValueError:
+            raise CommandError("Give --sizes like 500x40,2000x100 and a positive --runs.")
+
+        self.stdout.write(f"{'tenant':>12} {'reminders':>10} {'queries':>8} {'seconds':>9} {'tasks/s':>8} {'reminders/s':>12}")
+        for contracts, managers in sizes:
+            best, reminders, queries = None, 0, 0
+            for _ in range(options["runs"]):
+                try:
+                    with override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend"):
+                        with transaction.atomic():
+                            _tenant(contracts, managers)
+                            before = Notification.objects.count()
+                            counter = _QueryCounter()
+                            with connection.execute_wrapper(counter):
+                                started = time.perf_counter()
+                                send_renewal_reminders()
+                                elapsed = time.perf_counter() - started
+                            reminders = Notification.objects.count() - before
+                            queries = counter.count
+                            raise _Rollback
+                except _Rollback:
+                    pass
+                best = elapsed if best is None else min(best, elapsed)
+            self.stdout.write(
+                f"{f'{contracts}x{managers}':>12} {reminders:>10} {queries:>8} {best:>9.3f} "
+                f"{1 / best:>8.2f} {reminders / best:>12.0f}"
+            )
@@ -0,0 +1,22 @@
+"""Load exchange rates for currency-normalized spend reports."""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from slm.services.spend import load_rates
+
+
+class Command(BaseCommand):
+    help = "Upsert ExchangeRate rows from a CSV (date,currency,rate; rate = value of 1 unit in FX_BASE_CURRENCY)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", help="CSV file; defaults to settings.FX_RATES_CSV.")
+
+    def handle(self, *args, **options):
+        path = options["path"] or settings.FX_RATES_CSV
+        try:
+            loaded, errors = load_rates(path)
+        except OSError as exc:
+            raise CommandError(f"Cannot read {path}: {exc}")
+        for error in errors:
+            self.stderr.write(error)
+        self.stdout.write(self.style.SUCCESS(f"Loaded {loaded} exchange rate(s); skipped {len(errors)} line(s)."))
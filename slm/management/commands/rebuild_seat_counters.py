@@ -0,0 +1,51 @@
+"""Rebuild and verify the denormalized SoftwareAsset.used_seats counters."""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count
+
+from slm.models import SoftwareAsset, Allocation
+from slm.services.versions import bump_table_version
+
+
+class Command(BaseCommand):
+    help = "Recount active allocations per asset and repair SoftwareAsset.used_seats where it drifted."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verify", action="store_true",
+            help="Only report mismatched counters; exit non-zero if any are found.",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        with transaction.atomic():
+            actual = dict(
+                Allocation.objects.filter(active_flag=True)
+                .values("software_asset")
+                .annotate(n=Count("id"))
+                .values_list("software_asset", "n")
+            )
+            stale = []
+            assets = SoftwareAsset.objects.only("id", "used_seats").order_by("pk")
+            if not options["verify"]:
+                assets = assets.select_for_update()
+            for asset in assets.iterator(chunk_size=batch_size):
+                expected = actual.get(asset.pk, 0)
+                if asset.used_seats != expected:
+                    asset.used_seats = expected
+                    stale.append(asset)
+
+            if options["verify"]:
+                if stale:
+                    raise CommandError(
+                        f"{len(stale)} asset(s) have stale seat counters: "
+                        + ", ".join(str(a.pk) for a in stale[:20])
+                    )
+                self.stdout.write(self.style.SUCCESS("All seat counters are consistent."))
+                return
+
+            SoftwareAsset.objects.bulk_update(stale, ["used_seats"], batch_size=batch_size)
+            if stale:
+                bump_table_version(SoftwareAsset)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt seat counters; {len(stale)} asset(s) corrected."))
@@ -0,0 +1,12 @@
+"""Rebuild the spend cube fact table."""
+from django.core.management.base import BaseCommand
+
+from slm.services.spend_cube import rebuild_spend_cube
+
+
+class Command(BaseCommand):
+    help = "Recompute SpendFact from all invoices, payments and allocations."
+
+    def handle(self, *args, **options):
+        rows = rebuild_spend_cube()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt spend cube; {rows} fact row(s) written."))
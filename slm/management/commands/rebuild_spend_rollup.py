@@ -0,0 +1,12 @@
+"""Rebuild the pre-aggregated vendor spend table."""
+from django.core.management.base import BaseCommand
+
+from slm.services.spend import rebuild_spend_rollup
+
+
+class Command(BaseCommand):
+    help = "Recompute VendorSpendRollup from all invoices and payments."
+
+    def handle(self, *args, **options):
+        rows = rebuild_spend_rollup()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt vendor spend rollup; {rows} row(s) written."))
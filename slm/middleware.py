@@ -23,11 +23,21 @@ def get_client_ip(request):
 
 
 class AuditLogMiddleware(MiddlewareMixin):
-    """Log request metadata for audit (actual model changes logged in signals or views)."""
+    """
+    Attribute model changes captured during the request to its user, IP and
+    user agent, and write them with one bulk insert once the response is ready.
+    """
     def process_request(self, request):
-        request._audit_extra = {}
+        from slm.services import audit
+        request._audit_tokens = (audit.bind_request(request), audit.begin())
 
     def process_response(self, request, response):
+        tokens = getattr(request, "_audit_tokens", None)
+        if tokens:
+            from slm.services import audit
+            del request._audit_tokens
+            audit.end(tokens[1])
+            audit.unbind_request(tokens[0])
         return response
 
 
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.30 on 2026-10-18 03:58
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_used_seats(apps, schema_editor):
+    SoftwareAsset = apps.get_model("slm", "SoftwareAsset")
+    Allocation = apps.get_model("slm", "Allocation")
+    active = (
+        Allocation.objects.filter(software_asset=OuterRef("pk"), active_flag=True)
+        .order_by()
+        .values("software_asset")
+        .annotate(n=Count("id"))
+        .values("n")
+    )
+    SoftwareAsset.objects.update(used_seats=Coalesce(Subquery(active), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("slm", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="softwareasset",
+            name="used_seats",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="Active allocations; maintained by Allocation writes",
+            ),
+        ),
+        migrations.RunPython(backfill_used_seats, migrations.RunPython.noop),
+    ]
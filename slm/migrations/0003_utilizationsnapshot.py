@@ -0,0 +1,73 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:04
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("slm", "0002_softwareasset_used_seats"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UtilizationSnapshot",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("used_seats", models.PositiveIntegerField(default=0)),
+                (
+                    "available_seats",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Free seats on the asset as a whole that day",
+                    ),
+                ),
+                (
+                    "department",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="utilization_snapshots",
+                        to="slm.department",
+                    ),
+                ),
+                (
+                    "software_asset",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="utilization_snapshots",
+                        to="slm.softwareasset",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-date"],
+                "indexes": [
+                    models.Index(
+                        fields=["software_asset", "date"],
+                        name="slm_utiliza_softwar_249607_idx",
+                    ),
+                    models.Index(
+                        fields=["department", "date"],
+                        name="slm_utiliza_departm_e439d4_idx",
+                    ),
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="utilizationsnapshot",
+            constraint=models.UniqueConstraint(
+                fields=("date", "software_asset", "department"),
+                name="uniq_utilization_snapshot",
+            ),
+        ),
+    ]
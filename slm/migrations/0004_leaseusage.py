@@ -0,0 +1,53 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:07
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("slm", "0003_utilizationsnapshot"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LeaseUsage",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("period_start", models.DateTimeField()),
+                ("checkouts", models.PositiveIntegerField(default=0)),
+                ("checkins", models.PositiveIntegerField(default=0)),
+                ("denied", models.PositiveIntegerField(default=0)),
+                ("expired", models.PositiveIntegerField(default=0)),
+                ("peak_concurrent", models.PositiveIntegerField(default=0)),
+                ("lease_seconds", models.PositiveBigIntegerField(default=0)),
+                (
+                    "software_asset",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="lease_usage",
+                        to="slm.softwareasset",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-period_start"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="leaseusage",
+            constraint=models.UniqueConstraint(
+                fields=("software_asset", "period_start"),
+                name="uniq_lease_usage_period",
+            ),
+        ),
+    ]
@@ -0,0 +1,92 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:09
+
+from decimal import Decimal
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("slm", "0004_leaseusage"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChargebackLine",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("period_start", models.DateField()),
+                ("period_end", models.DateField()),
+                (
+                    "currency",
+                    models.CharField(
+                        choices=[
+                            ("USD", "USD"),
+                            ("EUR", "EUR"),
+                            ("GBP", "GBP"),
+                            ("INR", "INR"),
+                            ("OTHER", "Other"),
+                        ],
+                        default="USD",
+                        max_length=10,
+                    ),
+                ),
+                ("seat_days", models.PositiveBigIntegerField(default=0)),
+                (
+                    "amount",
+                    models.DecimalField(
+                        decimal_places=2, default=Decimal("0"), max_digits=14
+                    ),
+                ),
+                ("computed_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "branch",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="chargeback_lines",
+                        to="slm.branch",
+                    ),
+                ),
+                (
+                    "department",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="chargeback_lines",
+                        to="slm.department",
+                    ),
+                ),
+                (
+                    "software_asset",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="chargeback_lines",
+                        to="slm.softwareasset",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["period_start", "department"],
+                "indexes": [
+                    models.Index(
+                        fields=["period_start", "period_end"],
+                        name="slm_chargeb_period__530180_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("slm", "0007_importjob"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="licensecontract",
+            index=models.Index(
+                fields=["expiry_date", "id"], name="slm_contract_expiry_keyset"
+            ),
+        ),
+    ]
@@ -0,0 +1,144 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:22
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+import django.db.models.deletion
+
+
+def backfill_spend_rollup(apps, schema_editor):
+    Invoice = apps.get_model("slm", "Invoice")
+    Payment = apps.get_model("slm", "Payment")
+    VendorSpendRollup = apps.get_model("slm", "VendorSpendRollup")
+    rows = defaultdict(lambda: dict(invoiced=Decimal("0"), invoice_count=0, paid=Decimal("0"), payment_count=0))
+    for vendor_id, month, currency, total, n in (
+        Invoice.objects.order_by().annotate(month=TruncMonth("invoice_date"))
+        .values_list("vendor_id", "month", "currency").annotate(total=Sum("total"), n=Count("id"))
+    ):
+        rows[vendor_id, month, currency].update(invoiced=total or Decimal("0"), invoice_count=n)
+    for vendor_id, month, currency, total, n in (
+        Payment.objects.order_by().annotate(month=TruncMonth("paid_on"))
+        .values_list("invoice__vendor_id", "month", "invoice__currency").annotate(total=Sum("amount"), n=Count("id"))
+    ):
+        rows[vendor_id, month, currency].update(paid=total or Decimal("0"), payment_count=n)
+    VendorSpendRollup.objects.bulk_create(
+        [VendorSpendRollup(vendor_id=v, month=m, currency=c, **totals) for (v, m, c), totals in rows.items()],
+        batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("slm", "0008_licensecontract_expiry_keyset_index"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ExchangeRate",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "currency",
+                    models.CharField(
+                        choices=[
+                            ("USD", "USD"),
+                            ("EUR", "EUR"),
+                            ("GBP", "GBP"),
+                            ("INR", "INR"),
+                            ("OTHER", "Other"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("date", models.DateField()),
+                ("rate", models.DecimalField(decimal_places=10, max_digits=20)),
+            ],
+            options={
+                "ordering": ["currency", "-date"],
+            },
+        ),
+        migrations.CreateModel(
+            name="VendorSpendRollup",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("month", models.DateField(help_text="First day of the month")),
+                (
+                    "currency",
+                    models.CharField(
+                        choices=[
+                            ("USD", "USD"),
+                            ("EUR", "EUR"),
+                            ("GBP", "GBP"),
+                            ("INR", "INR"),
+                            ("OTHER", "Other"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "invoiced",
+                    models.DecimalField(
+                        decimal_places=2, default=Decimal("0"), max_digits=18
+                    ),
+                ),
+                ("invoice_count", models.IntegerField(default=0)),
+                (
+                    "paid",
+                    models.DecimalField(
+                        decimal_places=2, default=Decimal("0"), max_digits=18
+                    ),
+                ),
+                ("payment_count", models.IntegerField(default=0)),
+                (
+                    "vendor",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="spend_rollups",
+                        to="slm.vendor",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-month"],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="exchangerate",
+            constraint=models.UniqueConstraint(
+                fields=("currency", "date"), name="uniq_exchange_rate"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="vendorspendrollup",
+            index=models.Index(fields=["month"], name="slm_vendors_month_0d4e75_idx"),
+        ),
+        migrations.AddConstraint(
+            model_name="vendorspendrollup",
+            constraint=models.UniqueConstraint(
+                fields=("vendor", "month", "currency"), name="uniq_vendor_spend_rollup"
+            ),
+        ),
+        migrations.RunPython(backfill_spend_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,111 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:33
+
+from decimal import Decimal
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("slm", "0010_reportjob"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SpendFact",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("month", models.DateField(help_text="First day of the invoice month")),
+                (
+                    "currency",
+                    models.CharField(
+                        choices=[
+                            ("USD", "USD"),
+                            ("EUR", "EUR"),
+                            ("GBP", "GBP"),
+                            ("INR", "INR"),
+                            ("OTHER", "Other"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                ("seats", models.PositiveIntegerField(default=0)),
+                (
+                    "amount",
+                    models.DecimalField(
+                        decimal_places=2, default=Decimal("0"), max_digits=14
+                    ),
+                ),
+                (
+                    "paid",
+                    models.DecimalField(
+                        decimal_places=2, default=Decimal("0"), max_digits=14
+                    ),
+                ),
+                (
+                    "department",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="spend_facts",
+                        to="slm.department",
+                    ),
+                ),
+                (
+                    "invoice",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="spend_facts",
+                        to="slm.invoice",
+                    ),
+                ),
+                (
+                    "software_asset",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="spend_facts",
+                        to="slm.softwareasset",
+                    ),
+                ),
+                (
+                    "vendor",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="spend_facts",
+                        to="slm.vendor",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-month"],
+                "indexes": [
+                    models.Index(
+                        fields=["month", "currency"],
+                        name="slm_spendfa_month_4cfb04_idx",
+                    ),
+                    models.Index(
+                        fields=["vendor", "month"],
+                        name="slm_spendfa_vendor__afd5d6_idx",
+                    ),
+                    models.Index(
+                        fields=["department", "month"],
+                        name="slm_spendfa_departm_d8129d_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
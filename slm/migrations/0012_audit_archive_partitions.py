@@ -0,0 +1,102 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:43
+
+from datetime import datetime, timezone
+
+from django.db import migrations, models
+
+
+def _months(first, count):
+    year, month = first.year, first.month
+    for _ in range(count):
+        yield datetime(year, month, 1, tzinfo=timezone.utc)
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def partition_audit_log(apps, schema_editor):
+    """
+    On PostgreSQL, rebuild slm_auditlog as a table range-partitioned by month
+    on "timestamp", keeping its rows, indexes and foreign keys. The primary key
+    becomes (id, timestamp) because unique constraints must include the
+    partition key; ids still come from one sequence.
+    """
+    connection = schema_editor.connection
+    if connection.vendor != "postgresql":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = 'slm_auditlog'::regclass")
+        if cursor.fetchone():
+            return
+        cursor.execute(
+            "SELECT indexdef FROM pg_indexes WHERE tablename = 'slm_auditlog' AND indexname <> 'slm_auditlog_pkey'"
+        )
+        indexes = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = 'slm_auditlog'::regclass AND contype = 'f'"
+        )
+        foreign_keys = cursor.fetchall()
+        cursor.execute("SELECT MIN(timestamp), COALESCE(MAX(id), 0) FROM slm_auditlog")
+        oldest, last_id = cursor.fetchone()
+
+        cursor.execute("ALTER TABLE slm_auditlog RENAME TO slm_auditlog_unpartitioned")
+        cursor.execute(
+            "CREATE TABLE slm_auditlog (LIKE slm_auditlog_unpartitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+            'PARTITION BY RANGE ("timestamp")'
+        )
+        cursor.execute("CREATE TABLE slm_auditlog_default PARTITION OF slm_auditlog DEFAULT")
+        now = datetime.now(timezone.utc)
+        first = min(oldest, now).astimezone(timezone.utc) if oldest else now
+        count = (now.year - first.year) * 12 + now.month - first.month + 3
+        months = list(_months(first, count + 1))
+        for start, end in zip(months, months[1:]):
+            cursor.execute(
+                f'CREATE TABLE "slm_auditlog_p{start:%Y%m}" PARTITION OF slm_auditlog '
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            )
+        cursor.execute("INSERT INTO slm_auditlog SELECT * FROM slm_auditlog_unpartitioned")
+        cursor.execute("DROP TABLE slm_auditlog_unpartitioned")
+
+        cursor.execute("CREATE SEQUENCE slm_auditlog_id_seq AS bigint OWNED BY slm_auditlog.id")
+        cursor.execute("ALTER TABLE slm_auditlog ALTER COLUMN id SET DEFAULT nextval('slm_auditlog_id_seq')")
+        cursor.execute("SELECT setval('slm_auditlog_id_seq', %s + 1, false)", [last_id])
+        cursor.execute('ALTER TABLE slm_auditlog ADD PRIMARY KEY (id, "timestamp")')
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE slm_auditlog ADD CONSTRAINT "{name}" {definition}')
+        for definition in indexes:
+            cursor.execute(definition)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("slm", "0011_spendfact"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AuditArchiveSegment",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("month", models.DateField(unique=True)),
+                ("file", models.FileField(upload_to="audit-archive/")),
+                ("row_count", models.PositiveIntegerField(default=0)),
+                ("first_id", models.BigIntegerField(blank=True, null=True)),
+                ("last_id", models.BigIntegerField(blank=True, null=True)),
+                ("entities", models.JSONField(blank=True, default=list)),
+                ("sha256", models.CharField(max_length=64)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "ordering": ["month"],
+            },
+        ),
+        migrations.RunPython(partition_audit_log, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("contenttypes", "0002_remove_content_type_name"),
+        ("slm", "0012_audit_archive_partitions"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AuditField",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=100)),
+            ],
+        ),
+        migrations.AddField(
+            model_name="auditlog",
+            name="changes",
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="auditlog",
+            index=models.Index(
+                fields=["content_type", "object_id", "timestamp"],
+                name="slm_auditlo_content_e0600b_idx",
+            ),
+        ),
+        migrations.AddField(
+            model_name="auditfield",
+            name="content_type",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to="contenttypes.contenttype",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="auditfield",
+            constraint=models.UniqueConstraint(
+                fields=("content_type", "name"), name="uniq_audit_field"
+            ),
+        ),
+    ]
@@ -0,0 +1,90 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+def _text(value):
+    if value is None:
+        return None
+    return (value if isinstance(value, str) else DjangoJSONEncoder().encode(value))[:255]
+
+
+def index_existing_changes(apps, schema_editor):
+    """Index the compact changes already in the hot audit table."""
+    AuditLog = apps.get_model("slm", "AuditLog")
+    AuditFieldChange = apps.get_model("slm", "AuditFieldChange")
+    logs = AuditLog.objects.filter(changes__isnull=False).order_by("pk")
+    rows = []
+    for pk, timestamp, entity, object_id, change_type, changes in logs.values_list(
+        "pk", "timestamp", "entity", "object_id", "change_type", "changes"
+    ).iterator(chunk_size=5000):
+        for field_id, *values in changes:
+            old, new = values if len(values) == 2 else (values[0], None) if change_type == "delete" else (None, values[0])
+            rows.append(AuditFieldChange(
+                audit_log_id=pk, timestamp=timestamp, entity=entity, object_id=object_id,
+                field_id=field_id, old=_text(old), new=_text(new),
+            ))
+        if len(rows) >= 5000:
+            AuditFieldChange.objects.bulk_create(rows)
+            rows = []
+    AuditFieldChange.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("slm", "0013_audit_compact_changes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AuditFieldChange",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("audit_log_id", models.BigIntegerField()),
+                ("timestamp", models.DateTimeField()),
+                ("entity", models.CharField(max_length=100)),
+                ("object_id", models.PositiveIntegerField(blank=True, null=True)),
+                ("old", models.CharField(blank=True, max_length=255, null=True)),
+                ("new", models.CharField(blank=True, max_length=255, null=True)),
+                (
+                    "field",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="slm.auditfield",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["field", "new", "timestamp"],
+                        name="slm_auditfi_field_i_aa7ddc_idx",
+                    ),
+                    models.Index(
+                        fields=["field", "old", "timestamp"],
+                        name="slm_auditfi_field_i_b99271_idx",
+                    ),
+                    models.Index(
+                        fields=["entity", "object_id", "field"],
+                        name="slm_auditfi_entity_372823_idx",
+                    ),
+                    models.Index(
+                        fields=["timestamp"], name="slm_auditfi_timesta_71968f_idx"
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(index_existing_changes, migrations.RunPython.noop),
+    ]
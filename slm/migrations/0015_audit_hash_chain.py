@@ -0,0 +1,86 @@
+# Generated by Django 4.2.30 on 2026-10-18 04:54
+
+import hashlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import migrations, models
+
+# As slm.services.audit_chain at the time of this migration
+CHAINED_FIELDS = (
+    "id", "timestamp", "entity", "object_id", "content_type_id", "change_type", "old_value", "new_value",
+    "changes", "user_id", "ip_address", "user_agent", "extra",
+)
+
+
+def chain_existing_entries(apps, schema_editor):
+    """Hash the entries already in the hot table, oldest id first; archived months predate the chain."""
+    AuditLog = apps.get_model("slm", "AuditLog")
+    AuditChain = apps.get_model("slm", "AuditChain")
+    encoder = DjangoJSONEncoder(sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    chain = AuditChain(pk=1, last_hash="")
+    batch = []
+    for row in AuditLog.objects.order_by("id").values(*CHAINED_FIELDS).iterator(chunk_size=5000):
+        text = encoder.encode([row[name] for name in CHAINED_FIELDS])
+        chain.last_hash = hashlib.sha256((chain.last_hash + text).encode()).hexdigest()
+        chain.first_id, chain.last_id = chain.first_id or row["id"], row["id"]
+        batch.append(AuditLog(id=row["id"], row_hash=chain.last_hash))
+        if len(batch) >= 5000:
+            AuditLog.objects.bulk_update(batch, ["row_hash"])
+            batch = []
+    AuditLog.objects.bulk_update(batch, ["row_hash"])
+    chain.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("slm", "0014_audit_field_search"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AuditChain",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("first_id", models.BigIntegerField(blank=True, null=True)),
+                ("last_id", models.BigIntegerField(blank=True, null=True)),
+                ("last_hash", models.CharField(blank=True, max_length=64)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="AuditChainCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("first_id", models.BigIntegerField()),
+                ("last_id", models.BigIntegerField(unique=True)),
+                ("last_hash", models.CharField(max_length=64)),
+                ("row_count", models.PositiveIntegerField(default=0)),
+                ("verified_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "ordering": ["last_id"],
+            },
+        ),
+        migrations.AddField(
+            model_name="auditlog",
+            name="row_hash",
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.RunPython(chain_existing_entries, migrations.RunPython.noop),
+    ]
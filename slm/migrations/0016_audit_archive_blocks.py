@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("slm", "0015_audit_hash_chain"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="auditarchivesegment",
+            name="blocks",
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
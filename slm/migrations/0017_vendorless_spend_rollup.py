@@ -0,0 +1,43 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:32
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def merge_vendorless_rows(apps, schema_editor):
+    """Collapse duplicate vendor-less rows (left by vendor deletions) into one per month and currency."""
+    VendorSpendRollup = apps.get_model("slm", "VendorSpendRollup")
+    rows = VendorSpendRollup.objects.filter(vendor__isnull=True)
+    duplicated = (
+        rows.order_by().values("month", "currency").annotate(
+            n=Count("id"), invoiced_sum=Sum("invoiced"), invoice_count_sum=Sum("invoice_count"),
+            paid_sum=Sum("paid"), payment_count_sum=Sum("payment_count"),
+        ).filter(n__gt=1)
+    )
+    for group in duplicated:
+        same = rows.filter(month=group["month"], currency=group["currency"]).order_by("pk")
+        keep = same.first()
+        same.exclude(pk=keep.pk).delete()
+        same.filter(pk=keep.pk).update(
+            invoiced=group["invoiced_sum"], invoice_count=group["invoice_count_sum"],
+            paid=group["paid_sum"], payment_count=group["payment_count_sum"],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("slm", "0016_audit_archive_blocks"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_vendorless_rows, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="vendorspendrollup",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("vendor__isnull", True)),
+                fields=("month", "currency"),
+                name="uniq_vendorless_spend_rollup",
+            ),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-18 05:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("slm", "0017_vendorless_spend_rollup"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="feed_token_version",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Signed into renewal calendar feed URLs; bump it to revoke them",
+            ),
+        ),
+    ]
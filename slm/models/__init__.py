@@ -2,8 +2,13 @@ from .user import User, Department, Branch
 from .software import SoftwareAsset, LicenseContract, Allocation, RenewalHistory
 from .vendor import Vendor
 from .invoice import Invoice, Payment
-from .audit import AuditLog
+from .audit import AuditLog, AuditField, AuditFieldChange, AuditChain, AuditChainCheckpoint, AuditArchiveSegment
 from .notification import Notification, ReminderSchedule
+from .utilization import UtilizationSnapshot, LeaseUsage
+from .chargeback import ChargebackLine
+from .imports import ImportJob
+from .spend import ExchangeRate, VendorSpendRollup, SpendFact
+from .reports import ReportJob
 
 __all__ = [
     "User",
@@ -17,6 +22,19 @@ __all__ = [
     "Invoice",
     "Payment",
     "AuditLog",
+    "AuditField",
+    "AuditFieldChange",
+    "AuditChain",
+    "AuditChainCheckpoint",
+    "AuditArchiveSegment",
     "Notification",
     "ReminderSchedule",
+    "UtilizationSnapshot",
+    "LeaseUsage",
+    "ChargebackLine",
+    "ImportJob",
+    "ExchangeRate",
+    "VendorSpendRollup",
+    "SpendFact",
+    "ReportJob",
 ]
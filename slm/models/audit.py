@@ -5,8 +5,32 @@ from django.contrib.contenttypes.fields import GenericForeignKey
 from django.contrib.contenttypes.models import ContentType
 
 
+class AuditField(models.Model):
+    """Dictionary of audited field names; compact audit entries refer to fields by this id."""
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE, related_name="+")
+    name = models.CharField(max_length=100)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["content_type", "name"], name="uniq_audit_field"),
+        ]
+
+    def __str__(self):
+        return f"{self.content_type.model}.{self.name}"
+
+
 class AuditLog(models.Model):
-    """Log entity changes for audit trail."""
+    """
+    Log entity changes for audit trail.
+
+    Model changes captured by slm.services.audit store only ``changes``: a
+    list of ``[field_id, old, new]`` (updates), ``[field_id, new]`` (creates,
+    non-null fields) or ``[field_id, old]`` (deletes), with field ids from
+    AuditField. ``old_value``/``new_value`` hold full JSON for other events.
+
+    ``row_hash`` chains entries in id order: the SHA-256 of the previous
+    entry's hash and this entry's content (see slm.services.audit_chain).
+    """
     CHANGE_TYPES = [
         ("create", "Create"),
         ("update", "Update"),
@@ -21,6 +45,7 @@ class AuditLog(models.Model):
     change_type = models.CharField(max_length=20, choices=CHANGE_TYPES)
     old_value = models.JSONField(null=True, blank=True)
     new_value = models.JSONField(null=True, blank=True)
+    changes = models.JSONField(null=True, blank=True)
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name="audit_logs"
     )
@@ -28,6 +53,7 @@ class AuditLog(models.Model):
     user_agent = models.CharField(max_length=500, blank=True)
     timestamp = models.DateTimeField(auto_now_add=True)
     extra = models.JSONField(null=True, blank=True)
+    row_hash = models.CharField(max_length=64, blank=True)
 
     class Meta:
         ordering = ["-timestamp"]
@@ -35,7 +61,91 @@ class AuditLog(models.Model):
             models.Index(fields=["entity"]),
             models.Index(fields=["timestamp"]),
             models.Index(fields=["user"]),
+            models.Index(fields=["content_type", "object_id", "timestamp"]),
         ]
 
     def __str__(self):
         return f"{self.change_type} {self.entity} by {self.user} at {self.timestamp}"
+
+
+class AuditFieldChange(models.Model):
+    """
+    Search index over compact audit changes: one row per changed field of
+    each entry, with old and new values as text (strings as is, other values
+    as JSON, both cut to 255 characters). ``audit_log_id`` is a plain column
+    because the partitioned ``slm_auditlog`` has no single-column key to
+    reference on PostgreSQL.
+    """
+    audit_log_id = models.BigIntegerField()
+    timestamp = models.DateTimeField()
+    entity = models.CharField(max_length=100)
+    object_id = models.PositiveIntegerField(null=True, blank=True)
+    field = models.ForeignKey(AuditField, on_delete=models.CASCADE, related_name="+")
+    old = models.CharField(max_length=255, null=True, blank=True)
+    new = models.CharField(max_length=255, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["field", "new", "timestamp"]),
+            models.Index(fields=["field", "old", "timestamp"]),
+            models.Index(fields=["entity", "object_id", "field"]),
+            models.Index(fields=["timestamp"]),
+        ]
+
+    def __str__(self):
+        return f"{self.entity}#{self.object_id} {self.field_id}: {self.old} -> {self.new}"
+
+
+class AuditChain(models.Model):
+    """
+    Head of the AuditLog hash chain (a single row). Writers lock it so
+    entries are chained in id order; entries before ``first_id`` predate the
+    chain.
+    """
+    first_id = models.BigIntegerField(null=True, blank=True)
+    last_id = models.BigIntegerField(null=True, blank=True)
+    last_hash = models.CharField(max_length=64, blank=True)
+
+    def __str__(self):
+        return f"Audit chain head at {self.last_id}"
+
+
+class AuditChainCheckpoint(models.Model):
+    """A stretch of the hash chain verified intact, ending at entry ``last_id`` with ``last_hash``."""
+    first_id = models.BigIntegerField()
+    last_id = models.BigIntegerField(unique=True)
+    last_hash = models.CharField(max_length=64)
+    row_count = models.PositiveIntegerField(default=0)
+    verified_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["last_id"]
+
+    def __str__(self):
+        return f"Audit chain verified {self.first_id}-{self.last_id}"
+
+
+class AuditArchiveSegment(models.Model):
+    """
+    One month of the audit trail moved out of ``slm_auditlog`` into a
+    gzip-compressed JSONL file (one entry per line, oldest first).
+
+    The file is a series of gzip members of up to audit_archive.BLOCK_ROWS
+    entries each; ``blocks`` lists ``[offset, first timestamp, first id]``
+    per member so a reader can decompress only the blocks a page needs.
+    """
+    month = models.DateField(unique=True)  # first day of the month (UTC)
+    file = models.FileField(upload_to="audit-archive/")
+    row_count = models.PositiveIntegerField(default=0)
+    first_id = models.BigIntegerField(null=True, blank=True)
+    last_id = models.BigIntegerField(null=True, blank=True)
+    entities = models.JSONField(default=list, blank=True)
+    blocks = models.JSONField(default=list, blank=True)
+    sha256 = models.CharField(max_length=64)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["month"]
+
+    def __str__(self):
+        return f"Audit archive {self.month:%Y-%m} ({self.row_count} entries)"
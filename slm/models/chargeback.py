@@ -0,0 +1,39 @@
+"""Department / branch chargeback results."""
+from django.db import models
+from decimal import Decimal
+
+from .user import Department, Branch
+from .software import SoftwareAsset
+from .invoice import CURRENCY_CHOICES
+
+
+class ChargebackLine(models.Model):
+    """Share of one asset's invoiced spend charged to a department for a period.
+
+    Lines with no department hold spend that could not be apportioned (invoices
+    without a contract, or assets with no seat usage in the period).
+    """
+    period_start = models.DateField()
+    period_end = models.DateField()
+    department = models.ForeignKey(
+        Department, on_delete=models.CASCADE, null=True, blank=True, related_name="chargeback_lines"
+    )
+    branch = models.ForeignKey(
+        Branch, on_delete=models.SET_NULL, null=True, blank=True, related_name="chargeback_lines"
+    )
+    software_asset = models.ForeignKey(
+        SoftwareAsset, on_delete=models.CASCADE, null=True, blank=True, related_name="chargeback_lines"
+    )
+    currency = models.CharField(max_length=10, choices=CURRENCY_CHOICES, default="USD")
+    seat_days = models.PositiveBigIntegerField(default=0)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0"))
+    computed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["period_start", "department"]
+        indexes = [
+            models.Index(fields=["period_start", "period_end"]),
+        ]
+
+    def __str__(self):
+        return f"{self.period_start}..{self.period_end} {self.department_id}: {self.amount} {self.currency}"
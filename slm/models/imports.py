@@ -0,0 +1,43 @@
+"""Background bulk import jobs."""
+from django.db import models
+from django.conf import settings
+
+
+class ImportJob(models.Model):
+    """One uploaded CSV/XLSX file imported in chunks by a Celery worker."""
+    KINDS = [
+        ("vendors", "Vendors"),
+        ("assets", "Software Assets"),
+        ("contracts", "License Contracts"),
+        ("allocations", "Allocations"),
+    ]
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("completed", "Completed"),
+        ("failed", "Failed"),
+    ]
+    MAX_STORED_ERRORS = 1000
+
+    kind = models.CharField(max_length=20, choices=KINDS)
+    file = models.FileField(upload_to="imports/%Y/%m/")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending", db_index=True)
+    total_rows = models.PositiveIntegerField(default=0, help_text="Estimated from the file before parsing")
+    processed_rows = models.PositiveIntegerField(default=0)
+    created_count = models.PositiveIntegerField(default=0)
+    updated_count = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True, help_text="First rejected rows: {row, errors}")
+    message = models.TextField(blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name="import_jobs"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} import #{self.pk} ({self.status})"
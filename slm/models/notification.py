@@ -17,6 +17,9 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["user", "is_read"]),
+        ]
 
     def __str__(self):
         return f"{self.title} -> {self.user.email}"
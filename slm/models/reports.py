@@ -0,0 +1,61 @@
+"""Background report jobs."""
+from django.db import models
+from django.db.models import Q
+from django.conf import settings
+
+
+class ReportJob(models.Model):
+    """
+    One report rendered to a CSV/JSON file by a Celery worker.
+
+    ``params_hash`` covers the report, file type, cleaned parameters and the
+    data versions the report reads, so at most one live (not failed) job exists
+    per distinct result; everyone who asks for it is added to ``requested_by``.
+    """
+    REPORTS = [
+        ("inventory", "License Inventory"),
+        ("renewal_calendar", "Renewal Calendar"),
+        ("vendor_spend", "Vendor Spend"),
+        ("utilization", "Utilization Trend"),
+        ("chargeback", "Chargeback"),
+        ("audit_trail", "Audit Trail"),
+    ]
+    FILE_TYPES = [
+        ("csv", "CSV"),
+        ("json", "JSON"),
+    ]
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("completed", "Completed"),
+        ("failed", "Failed"),
+    ]
+
+    report = models.CharField(max_length=30, choices=REPORTS)
+    file_type = models.CharField(max_length=10, choices=FILE_TYPES, default="csv")
+    params = models.JSONField(default=dict, blank=True)
+    params_hash = models.CharField(max_length=64)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending", db_index=True)
+    file = models.FileField(upload_to="reports/%Y/%m/", blank=True)
+    row_count = models.PositiveIntegerField(default=0)
+    message = models.TextField(blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name="report_jobs"
+    )
+    requested_by = models.ManyToManyField(
+        settings.AUTH_USER_MODEL, blank=True, related_name="requested_report_jobs"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["params_hash"], condition=~Q(status="failed"), name="uniq_live_report_job"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_report_display()} report #{self.pk} ({self.status})"
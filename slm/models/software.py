@@ -1,5 +1,7 @@
 """SoftwareAsset, LicenseContract, Allocation, RenewalHistory."""
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Q, Count, Value, ExpressionWrapper
+from django.db.models.functions import Greatest
 from django.conf import settings
 from django.utils import timezone
 from decimal import Decimal
@@ -8,6 +10,24 @@ from .user import Department, User
 from .vendor import Vendor
 
 
+class SoftwareAssetQuerySet(models.QuerySet):
+    def with_usage(self, live=False):
+        """
+        Annotate ``used_count`` and ``available_count`` on every row.
+
+        By default these read the persisted ``used_seats`` counter (no join). With
+        ``live=True`` the active allocations are counted in the same grouped query,
+        which is what the inventory reports use when they must not trust the counter.
+        """
+        used = Count("allocations", filter=Q(allocations__active_flag=True)) if live else F("used_seats")
+        return self.annotate(used_count=used).annotate(
+            available_count=Greatest(
+                ExpressionWrapper(F("total_licenses") - F("used_count"), output_field=models.IntegerField()),
+                Value(0),
+            )
+        )
+
+
 class SoftwareAsset(models.Model):
     """Software asset registry."""
     LICENSE_TYPES = [
@@ -22,6 +42,9 @@ class SoftwareAsset(models.Model):
     version = models.CharField(max_length=100, blank=True)
     license_type = models.CharField(max_length=30, choices=LICENSE_TYPES, default="subscription")
     total_licenses = models.PositiveIntegerField(default=0)
+    used_seats = models.PositiveIntegerField(
+        default=0, editable=False, help_text="Active allocations; maintained by Allocation writes"
+    )
     description = models.TextField(blank=True)
     tags = models.CharField(max_length=500, blank=True, help_text="Comma-separated tags")
     is_deleted = models.BooleanField(default=False, db_index=True)  # Soft delete
@@ -31,6 +54,8 @@ class SoftwareAsset(models.Model):
         settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name="created_assets"
     )
 
+    objects = SoftwareAssetQuerySet.as_manager()
+
     class Meta:
         ordering = ["name"]
         verbose_name_plural = "Software assets"
@@ -38,18 +63,36 @@ class SoftwareAsset(models.Model):
     def __str__(self):
         return f"{self.name} ({self.version or 'N/A'})"
 
+    def save(self, *args, **kwargs):
+        # used_seats only moves in SQL (adjust_used_seats, reserve_seats); never write a stale loaded value back
+        adding = self._state.adding or kwargs.get("force_insert")
+        if self.pk and not adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name != "used_seats" and f.attname in self.__dict__
+            ]
+        super().save(*args, **kwargs)
+
     @property
     def used_licenses(self):
-        return self.allocations.filter(active_flag=True).count()
+        return getattr(self, "used_count", self.used_seats)
 
     @property
     def available_licenses(self):
+        if hasattr(self, "available_count"):
+            return self.available_count
         return max(0, self.total_licenses - self.used_licenses)
 
     @property
     def tag_list(self):
         return [t.strip() for t in self.tags.split(",") if t.strip()]
 
+    @classmethod
+    def adjust_used_seats(cls, asset_id, delta):
+        """Shift the persisted seat counter in SQL so concurrent writers do not clobber each other."""
+        if asset_id and delta:
+            cls.objects.filter(pk=asset_id).update(used_seats=F("used_seats") + delta)
+
 
 class LicenseContract(models.Model):
     """License contract linked to software and vendor."""
@@ -84,6 +127,9 @@ class LicenseContract(models.Model):
 
     class Meta:
         ordering = ["-expiry_date", "-renewal_due_date"]
+        indexes = [
+            models.Index(fields=["expiry_date", "id"], name="slm_contract_expiry_keyset"),
+        ]
 
     def __str__(self):
         return f"{self.software_asset.name} - {self.get_status_display()}"
@@ -124,10 +170,28 @@ class Allocation(models.Model):
         u = self.user.email if self.user else "Unassigned"
         return f"{self.software_asset.name} -> {self.department.code} / {u}"
 
-    def save(self, *args, **kwargs):
+    def save(self, *args, seat_reserved=False, **kwargs):
+        # seat_reserved: the caller already counted this row in used_seats (see slm.services.allocation)
         if self.returned_on:
             self.active_flag = False
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            previous = None
+            if self.pk:
+                # Locked so concurrent saves of this row (e.g. two returns) adjust the counter once
+                previous = Allocation.objects.select_for_update().filter(pk=self.pk).values(
+                    "software_asset_id", "active_flag", "department_id", "allocated_on", "returned_on", "updated_at"
+                ).first()
+            # Stored state before this save, for the post_save receivers
+            self._previous_state = previous
+            self._previous_asset_id = previous["software_asset_id"] if previous else None
+            super().save(*args, **kwargs)
+            if previous is None or (previous["software_asset_id"], previous["active_flag"]) != (
+                self.software_asset_id, self.active_flag
+            ):
+                if previous and previous["active_flag"]:
+                    SoftwareAsset.adjust_used_seats(previous["software_asset_id"], -1)
+                if self.active_flag and not seat_reserved:
+                    SoftwareAsset.adjust_used_seats(self.software_asset_id, 1)
 
 
 class RenewalHistory(models.Model):
@@ -0,0 +1,95 @@
+"""Exchange rates, pre-aggregated vendor spend and the spend cube."""
+from django.db import models
+from decimal import Decimal
+
+from .vendor import Vendor
+from .invoice import CURRENCY_CHOICES
+
+
+class ExchangeRate(models.Model):
+    """Value of one unit of ``currency`` in settings.FX_BASE_CURRENCY, effective from ``date``."""
+    currency = models.CharField(max_length=10, choices=CURRENCY_CHOICES)
+    date = models.DateField()
+    rate = models.DecimalField(max_digits=20, decimal_places=10)
+
+    class Meta:
+        ordering = ["currency", "-date"]
+        constraints = [
+            models.UniqueConstraint(fields=["currency", "date"], name="uniq_exchange_rate"),
+        ]
+
+    def __str__(self):
+        return f"{self.currency} {self.date}: {self.rate}"
+
+
+class VendorSpendRollup(models.Model):
+    """Invoiced and paid totals per vendor, calendar month and invoice currency.
+
+    Maintained incrementally by the Invoice/Payment signal receivers; invoices
+    are counted in the month of ``invoice_date``, payments in the month of
+    ``paid_on``. Spend without a vendor has one row per month and currency;
+    a deleted vendor's rows are folded into those (see spend.fold_vendor).
+    """
+    vendor = models.ForeignKey(
+        Vendor, on_delete=models.SET_NULL, null=True, blank=True, related_name="spend_rollups"
+    )
+    month = models.DateField(help_text="First day of the month")
+    currency = models.CharField(max_length=10, choices=CURRENCY_CHOICES)
+    invoiced = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal("0"))
+    invoice_count = models.IntegerField(default=0)
+    paid = models.DecimalField(max_digits=18, decimal_places=2, default=Decimal("0"))
+    payment_count = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ["-month"]
+        constraints = [
+            models.UniqueConstraint(fields=["vendor", "month", "currency"], name="uniq_vendor_spend_rollup"),
+            # NULLs never collide in the constraint above
+            models.UniqueConstraint(
+                fields=["month", "currency"], condition=models.Q(vendor__isnull=True),
+                name="uniq_vendorless_spend_rollup",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["month"]),
+        ]
+
+    def __str__(self):
+        return f"{self.vendor_id} {self.month:%Y-%m} {self.currency}: {self.invoiced}"
+
+
+class SpendFact(models.Model):
+    """One invoice's spend attributed to one department: the spend cube's fact table.
+
+    An invoice is split across the departments holding seats of its
+    contract's asset on the invoice date, in proportion to those seats; with
+    no seats held (or no contract) it gets a single row without a department.
+    ``paid`` is the invoice's paid-to-date split the same way. Maintained by
+    slm.services.spend_cube.
+    """
+    invoice = models.ForeignKey("slm.Invoice", on_delete=models.CASCADE, related_name="spend_facts")
+    vendor = models.ForeignKey(
+        Vendor, on_delete=models.SET_NULL, null=True, blank=True, related_name="spend_facts"
+    )
+    department = models.ForeignKey(
+        "slm.Department", on_delete=models.SET_NULL, null=True, blank=True, related_name="spend_facts"
+    )
+    software_asset = models.ForeignKey(
+        "slm.SoftwareAsset", on_delete=models.SET_NULL, null=True, blank=True, related_name="spend_facts"
+    )
+    month = models.DateField(help_text="First day of the invoice month")
+    currency = models.CharField(max_length=10, choices=CURRENCY_CHOICES)
+    seats = models.PositiveIntegerField(default=0)
+    amount = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0"))
+    paid = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0"))
+
+    class Meta:
+        ordering = ["-month"]
+        indexes = [
+            models.Index(fields=["month", "currency"]),
+            models.Index(fields=["vendor", "month"]),
+            models.Index(fields=["department", "month"]),
+        ]
+
+    def __str__(self):
+        return f"Invoice {self.invoice_id} {self.month:%Y-%m} dept {self.department_id}: {self.amount} {self.currency}"
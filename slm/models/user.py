@@ -78,6 +78,9 @@ class User(AbstractUser):
     )
     phone = models.CharField(max_length=30, blank=True)
     is_verified = models.BooleanField(default=False)
+    feed_token_version = models.PositiveIntegerField(
+        default=0, help_text="Signed into renewal calendar feed URLs; bump it to revoke them"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
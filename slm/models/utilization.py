@@ -0,0 +1,56 @@
+"""Daily license utilization snapshots for trend reporting."""
+from django.db import models
+
+from .user import Department
+from .software import SoftwareAsset
+
+
+class UtilizationSnapshot(models.Model):
+    """Seats in use at the end of a day, per asset and department."""
+    date = models.DateField()
+    software_asset = models.ForeignKey(
+        SoftwareAsset, on_delete=models.CASCADE, related_name="utilization_snapshots"
+    )
+    department = models.ForeignKey(
+        Department, on_delete=models.CASCADE, related_name="utilization_snapshots"
+    )
+    used_seats = models.PositiveIntegerField(default=0)
+    available_seats = models.PositiveIntegerField(default=0, help_text="Free seats on the asset as a whole that day")
+
+    class Meta:
+        ordering = ["-date"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["date", "software_asset", "department"], name="uniq_utilization_snapshot"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["software_asset", "date"]),
+            models.Index(fields=["department", "date"]),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.software_asset_id}/{self.department_id}: {self.used_seats}"
+
+
+class LeaseUsage(models.Model):
+    """Hourly rollup of floating-license lease activity, drained from the lease store."""
+    software_asset = models.ForeignKey(
+        SoftwareAsset, on_delete=models.CASCADE, related_name="lease_usage"
+    )
+    period_start = models.DateTimeField()
+    checkouts = models.PositiveIntegerField(default=0)
+    checkins = models.PositiveIntegerField(default=0)
+    denied = models.PositiveIntegerField(default=0)
+    expired = models.PositiveIntegerField(default=0)
+    peak_concurrent = models.PositiveIntegerField(default=0)
+    lease_seconds = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        ordering = ["-period_start"]
+        constraints = [
+            models.UniqueConstraint(fields=["software_asset", "period_start"], name="uniq_lease_usage_period"),
+        ]
+
+    def __str__(self):
+        return f"{self.software_asset_id} @ {self.period_start}: {self.checkouts} checkouts"
@@ -40,12 +40,18 @@ class IsAuditorReadOnly(permissions.BasePermission):
 
 
 class SLMPermission(permissions.BasePermission):
-    """Combine: auditor read-only, else check view-specific permission."""
+    """
+    Combine: auditor read-only, else check view-specific permission. Views
+    may list actions that only read data in ``auditor_actions`` to open them
+    to auditors as well.
+    """
     def has_permission(self, request, view):
         if not request.user or not request.user.is_authenticated:
             return False
         if request.user.role == "auditor":
-            return request.method in permissions.SAFE_METHODS
+            return request.method in permissions.SAFE_METHODS or getattr(view, "action", None) in getattr(
+                view, "auditor_actions", ()
+            )
         return True
 
     def has_object_permission(self, request, view, obj):
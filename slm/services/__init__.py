@@ -0,0 +1 @@
+# SLM domain services
@@ -0,0 +1,213 @@
+"""Race-free seat reservation for license allocations."""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from slm.models import SoftwareAsset, Allocation, Department, User
+from slm.services.usage_index import invalidate_usage_index
+from slm.services.versions import bump_table_version
+from slm.services import audit, spend_cube
+
+
+class SeatsUnavailable(Exception):
+    """Raised when an asset has no free seat left for the requested allocation."""
+
+    def __init__(self, asset_id, requested=1):
+        self.asset_id = asset_id
+        self.requested = requested
+        super().__init__(f"No available licenses for asset {asset_id}. Over-allocation not allowed.")
+
+
+def reserve_seats(asset_id, count=1):
+    """
+    Claim ``count`` seats on an asset with one conditional UPDATE.
+
+    The capacity check and the increment happen in the same statement, so the
+    database row lock serializes concurrent writers and no caller can observe a
+    stale free seat. Returns True when the seats were claimed.
+    """
+    if count <= 0:
+        return True
+    return bool(
+        SoftwareAsset.objects.filter(
+            pk=asset_id,
+            is_deleted=False,
+            used_seats__lte=F("total_licenses") - count,
+        ).update(used_seats=F("used_seats") + count)
+    )
+
+
+def allocate(allocation):
+    """Save an unsaved Allocation, reserving its seat first when it is active."""
+    if allocation.returned_on:
+        allocation.active_flag = False
+    with transaction.atomic():
+        if allocation.active_flag and not reserve_seats(allocation.software_asset_id):
+            raise SeatsUnavailable(allocation.software_asset_id)
+        allocation.save(seat_reserved=allocation.active_flag)
+    return allocation
+
+
+def update_allocation(allocation):
+    """
+    Save changes to an existing Allocation. Reactivating it or moving it to
+    another asset takes a seat there, reserved first as in :func:`allocate`.
+    """
+    if allocation.returned_on:
+        allocation.active_flag = False
+    with transaction.atomic():
+        previous = (
+            Allocation.objects.select_for_update().filter(pk=allocation.pk)
+            .values_list("software_asset_id", "active_flag").first()
+        )
+        takes_seat = allocation.active_flag and previous != (allocation.software_asset_id, True)
+        if takes_seat and not reserve_seats(allocation.software_asset_id):
+            raise SeatsUnavailable(allocation.software_asset_id)
+        allocation.save(seat_reserved=takes_seat)
+    return allocation
+
+
+def _as_id(value):
+    try:
+        return int(value) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        return False
+
+
+def bulk_allocate(rows):
+    """
+    Allocate many seats in one transaction.
+
+    ``rows`` is a list of dicts with ``software_asset``, ``department`` and an
+    optional ``user``/``notes``. Referenced objects are fetched once per batch,
+    each asset gets a single capacity check and counter update, and accepted
+    rows are written with one ``bulk_create``. Returns one result per input
+    row, in order: ``{"row": i, "status": "created", "id": pk}`` or
+    ``{"row": i, "status": "error", "error": msg}``.
+    """
+    results = [None] * len(rows)
+    parsed = []
+    for i, row in enumerate(rows):
+        if not isinstance(row, dict):
+            results[i] = {"row": i, "status": "error", "error": "Row must be an object."}
+            continue
+        asset_id, dept_id, user_id = (_as_id(row.get(k)) for k in ("software_asset", "department", "user"))
+        if not asset_id or not dept_id or user_id is False:
+            results[i] = {"row": i, "status": "error", "error": "software_asset and department must be valid ids."}
+            continue
+        parsed.append((i, asset_id, dept_id, user_id, str(row.get("notes") or "")[:500]))
+
+    dept_ids = set(Department.objects.filter(pk__in={p[2] for p in parsed}).values_list("pk", flat=True))
+    user_ids = set(User.objects.filter(pk__in={p[3] for p in parsed if p[3]}).values_list("pk", flat=True))
+
+    with transaction.atomic():
+        capacity = {
+            pk: total - used
+            for pk, total, used in SoftwareAsset.objects.select_for_update()
+            .filter(pk__in={p[1] for p in parsed}, is_deleted=False)
+            .values_list("pk", "total_licenses", "used_seats")
+        }
+        accepted = {}
+        for i, asset_id, dept_id, user_id, notes in parsed:
+            if asset_id not in capacity:
+                error = "Unknown software asset."
+            elif dept_id not in dept_ids:
+                error = "Unknown department."
+            elif user_id and user_id not in user_ids:
+                error = "Unknown user."
+            elif len(accepted.get(asset_id, ())) >= capacity[asset_id]:
+                error = "No available licenses. Over-allocation not allowed."
+            else:
+                accepted.setdefault(asset_id, []).append(
+                    (i, Allocation(software_asset_id=asset_id, department_id=dept_id, user_id=user_id, notes=notes))
+                )
+                continue
+            results[i] = {"row": i, "status": "error", "error": error}
+
+        for asset_id, pending in list(accepted.items()):
+            if not reserve_seats(asset_id, len(pending)):
+                for i, _ in pending:
+                    results[i] = {"row": i, "status": "error", "error": "Seat count changed concurrently; retry."}
+                del accepted[asset_id]
+
+        pending = [p for group in accepted.values() for p in group]
+        Allocation.objects.bulk_create([a for _, a in pending], batch_size=1000)
+        # bulk_create/bulk_update skip the signals that capture audit entries
+        for _, allocation in pending:
+            audit.capture_save(allocation, created=True)
+        invalidate_usage_index(*accepted)
+        bump_table_version(Allocation)
+        spend_cube.refresh_assets(accepted, since=min((a.allocated_on for _, a in pending), default=None))
+        for i, allocation in pending:
+            results[i] = {"row": i, "status": "created", "id": allocation.pk}
+    return results
+
+
+def bulk_return(rows, returned_on=None):
+    """
+    Return many allocations in one transaction.
+
+    Each row identifies an active allocation either by ``id`` or by
+    ``software_asset`` + ``user`` (and optionally ``department``). Matches are
+    resolved with one query, written with one ``bulk_update`` and the seat
+    counters are released once per affected asset.
+    """
+    returned_on = returned_on or timezone.now()
+    results = [None] * len(rows)
+    wanted = []
+    for i, row in enumerate(rows):
+        row = row if isinstance(row, dict) else {}
+        alloc_id = _as_id(row.get("id"))
+        key = tuple(_as_id(row.get(k)) for k in ("software_asset", "user", "department"))
+        if alloc_id:
+            wanted.append((i, alloc_id, None))
+        elif key[0] and key[1] and key[2] is not False:
+            wanted.append((i, None, key))
+        else:
+            results[i] = {"row": i, "status": "error", "error": "Give an allocation id or software_asset and user."}
+
+    ids = {w[1] for w in wanted if w[1]}
+    keys = [w[2] for w in wanted if w[2]]
+    with transaction.atomic():
+        match = Q(pk__in=ids)
+        if keys:
+            match |= Q(software_asset_id__in={k[0] for k in keys}, user_id__in={k[1] for k in keys})
+        candidates = Allocation.objects.select_for_update().filter(match, active_flag=True)
+        by_id, by_key = {}, {}
+        for allocation in candidates.order_by("allocated_on", "pk"):
+            by_id[allocation.pk] = allocation
+            by_key.setdefault((allocation.software_asset_id, allocation.user_id), []).append(allocation)
+
+        touched, released = {}, Counter()
+        for i, alloc_id, key in wanted:
+            allocation = None
+            if alloc_id:
+                allocation = by_id.get(alloc_id)
+            else:
+                for candidate in by_key.get(key[:2], ()):
+                    if candidate.pk not in touched and (not key[2] or candidate.department_id == key[2]):
+                        allocation = candidate
+                        break
+            if allocation is None or allocation.pk in touched:
+                results[i] = {"row": i, "status": "error", "error": "No matching active allocation."}
+                continue
+            allocation.active_flag = False
+            allocation.returned_on = returned_on
+            allocation.updated_at = returned_on
+            touched[allocation.pk] = allocation
+            released[allocation.software_asset_id] += 1
+            results[i] = {"row": i, "status": "returned", "id": allocation.pk}
+
+        Allocation.objects.bulk_update(
+            list(touched.values()), ["active_flag", "returned_on", "updated_at"], batch_size=1000
+        )
+        for allocation in touched.values():
+            audit.capture_save(allocation, created=False, update_fields=["active_flag", "returned_on"])
+        for asset_id, count in released.items():
+            SoftwareAsset.adjust_used_seats(asset_id, -count)
+        invalidate_usage_index(*released)
+        bump_table_version(Allocation)
+        spend_cube.refresh_assets(released, since=min((a.allocated_on for a in touched.values()), default=None))
+    return results
@@ -0,0 +1,363 @@
+"""
+Change capture for the audit trail.
+
+Creates, updates and deletes of AUDITED_MODELS become AuditLog entries with
+field-level diffs and the request context (user, IP, user agent). Capturing
+costs no query: updates are diffed against the values the instance was
+loaded with. Entries store only the changed fields, as a compact ``changes``
+list keyed by AuditField ids (see AuditLog); :func:`expand` turns them back
+into ``old_value``/``new_value`` dicts and :func:`state_at` replays them to
+rebuild an object as of any moment. Each changed field is also written to
+AuditFieldChange so :class:`FieldSearch` finds changes by field and value
+through an index instead of scanning JSON. An entry joins the current batch
+only when its transaction commits (so changes rolled back, including by a
+savepoint, are never logged), and the batch is written with one
+``bulk_create`` when it ends: at the end of the request for web and API
+writes (AuditLogMiddleware), or around a unit of background work via
+:func:`batch`. Outside a batch each committed change is written on its own.
+Written entries are sealed onto the hash chain (slm.services.audit_chain).
+"""
+import ipaddress
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+from functools import partial
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models.fields.files import FieldFile
+
+from slm.models import (
+    AuditLog, AuditField, AuditFieldChange, SoftwareAsset, LicenseContract, Invoice, Allocation, Vendor,
+)
+from slm.services import audit_chain
+from slm.services.versions import bump_table_version
+
+logger = logging.getLogger(__name__)
+
+AUDITED_MODELS = (SoftwareAsset, LicenseContract, Invoice, Allocation, Vendor)
+# Bookkeeping columns that change on every save
+IGNORED_FIELDS = {"created_at", "updated_at"}
+SEARCH_LENGTH = 255
+
+_request = ContextVar("slm_audit_request", default=None)
+_batch = ContextVar("slm_audit_batch", default=None)
+_encoder = DjangoJSONEncoder()
+
+
+def is_audited(model):
+    return issubclass(model, AUDITED_MODELS)
+
+
+def _fields(model):
+    try:
+        return model._audit_fields
+    except AttributeError:
+        model._audit_fields = tuple(
+            f.attname for f in model._meta.concrete_fields if f.name not in IGNORED_FIELDS
+        )
+        return model._audit_fields
+
+
+def _plain(value):
+    """JSON-safe form of a field value."""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, FieldFile):
+        return value.name or None
+    return _encoder.default(value)
+
+
+def state(instance):
+    """Loaded field values by attname; deferred fields are left out rather than fetched."""
+    loaded = instance.__dict__
+    return {name: loaded[name] for name in _fields(type(instance)) if name in loaded}
+
+
+def remember(instance):
+    """Record the values ``instance`` holds now as the base for its next diff."""
+    instance._audit_state = state(instance)
+
+
+def bind_request(request):
+    """Attribute changes made in this context to ``request``; returns a token for :func:`unbind_request`."""
+    return _request.set(request)
+
+
+def unbind_request(token):
+    _request.reset(token)
+
+
+def begin():
+    """Start collecting committed entries for one bulk write; returns a token for :func:`end`."""
+    return _batch.set([] if _batch.get() is None else _batch.get())
+
+
+def end(token):
+    """Write the entries collected since :func:`begin` (the outermost batch only)."""
+    entries = _batch.get()
+    _batch.reset(token)
+    if _batch.get() is None:
+        write(entries)
+
+
+@contextmanager
+def batch():
+    """Write every change committed inside the block with one ``bulk_create`` at the end."""
+    token = begin()
+    try:
+        yield
+    finally:
+        end(token)
+
+
+def _context():
+    request = _request.get()
+    if request is None:
+        return {}
+    from slm.middleware import get_client_ip, get_request_user
+
+    user = get_request_user(request)
+    extra = {"method": request.method, "path": request.path}
+    ip = get_client_ip(request)
+    try:
+        ipaddress.ip_address(ip or "")
+    except ValueError:
+        # X-Forwarded-For is client-controlled; an invalid value must not fail the insert
+        if ip:
+            extra["client_ip"] = ip[:200]
+        ip = None
+    return {
+        "user_id": user.pk if user else None,
+        "ip_address": ip,
+        "user_agent": request.META.get("HTTP_USER_AGENT", "")[:500],
+        "extra": extra,
+    }
+
+
+def _committed(entry):
+    entries = _batch.get()
+    if entries is None:
+        write([entry])
+    else:
+        entries.append(entry)
+
+
+def capture(model, pk, change_type, changes):
+    """
+    Queue one entry; it is kept only if the current transaction commits.
+
+    ``changes`` is ``[(attname, *values)]`` with ``(old, new)`` values for
+    updates, ``(new,)`` for creates and ``(old,)`` for deletes.
+    """
+    entry = AuditLog(entity=model.__name__, object_id=pk, change_type=change_type, **_context())
+    entry._changes = (model, changes)
+    transaction.on_commit(partial(_committed, entry))
+
+
+def capture_save(instance, created, update_fields=None):
+    """Entry for a saved instance: its non-null fields on create, only the changed ones on update."""
+    model, after = type(instance), state(instance)
+    before = getattr(instance, "_audit_state", None)
+    remember(instance)
+    if created or before is None:
+        changes = [(n, _plain(v)) for n, v in after.items() if v is not None]
+        capture(model, instance.pk, "create" if created else "update", changes)
+        return
+    names = [n for n in after if n in before and before[n] != after[n]]
+    if update_fields is not None:
+        saved = {instance._meta.get_field(f).attname for f in update_fields}
+        names = [n for n in names if n in saved]
+    if not names:
+        return
+    soft_deleted = "is_deleted" in names and after["is_deleted"]
+    changes = [(n, _plain(before[n]), _plain(after[n])) for n in names]
+    capture(model, instance.pk, "soft_delete" if soft_deleted else "update", changes)
+
+
+def capture_delete(instance):
+    changes = [(n, _plain(v)) for n, v in state(instance).items() if v is not None]
+    capture(type(instance), instance.pk, "delete", changes)
+
+
+def capture_update(model, rows):
+    """Entries for a queryset ``update()``: ``rows`` is ``[(pk, {attname: (old, new)})]``."""
+    for pk, fields in rows:
+        capture(model, pk, "update", [(n, _plain(old), _plain(new)) for n, (old, new) in fields.items()])
+
+
+_field_ids, _field_names = {}, {}
+
+
+def _load_fields():
+    for pk, content_type_id, name in AuditField.objects.values_list("pk", "content_type_id", "name"):
+        _field_ids[content_type_id, name] = pk
+        _field_names[pk] = name
+
+
+def field_ids(keys):
+    """AuditField ids by ``(content_type_id, attname)``, creating entries for new fields."""
+    if any(key not in _field_ids for key in keys):
+        _load_fields()
+        missing = {key for key in keys if key not in _field_ids}
+        if missing:
+            AuditField.objects.bulk_create(
+                [AuditField(content_type_id=ct, name=name) for ct, name in missing], ignore_conflicts=True
+            )
+            _load_fields()
+    return _field_ids
+
+
+def field_name(pk):
+    if pk not in _field_names:
+        _load_fields()
+    return _field_names.get(pk, str(pk))
+
+
+def ensure_fields():
+    """Register every audited field up front (run after migrate) so writes rarely extend the dictionary."""
+    from django.contrib.contenttypes.models import ContentType
+
+    types = ContentType.objects.get_for_models(*AUDITED_MODELS)
+    field_ids([(types[model].pk, name) for model in AUDITED_MODELS for name in _fields(model)])
+
+
+def _sides(change_type, values):
+    """``(old, new)`` of one compact change; the missing side is None."""
+    if len(values) == 2:
+        return tuple(values)
+    return (values[0], None) if change_type == "delete" else (None, values[0])
+
+
+def expand(change_type, changes):
+    """``(old_value, new_value)`` dicts keyed by attname from a compact ``changes`` list."""
+    old, new = {}, {}
+    for field, *values in changes:
+        name = field_name(field)
+        if len(values) == 2:
+            old[name], new[name] = values
+        elif change_type == "delete":
+            old[name] = values[0]
+        else:
+            new[name] = values[0]
+    return old or None, new or None
+
+
+def expand_row(row):
+    """Fill ``old_value``/``new_value`` of a ``values()`` row from its ``changes`` (which is dropped)."""
+    changes = row.pop("changes", None)
+    if changes:
+        row["old_value"], row["new_value"] = expand(row["change_type"], changes)
+    return row
+
+
+def search_value(value):
+    """Indexed text of a field value: strings as is, other values as JSON, None as None."""
+    if value is None:
+        return None
+    return (value if isinstance(value, str) else _encoder.encode(value))[:SEARCH_LENGTH]
+
+
+def index_rows(entries):
+    """Unsaved AuditFieldChange rows for saved ``entries`` that carry compact changes."""
+    rows = []
+    for entry in entries:
+        for field, *values in entry.changes or ():
+            old, new = _sides(entry.change_type, values)
+            rows.append(AuditFieldChange(
+                audit_log_id=entry.pk, timestamp=entry.timestamp, entity=entry.entity, object_id=entry.object_id,
+                field_id=field, old=search_value(old), new=search_value(new),
+            ))
+    return rows
+
+
+class FieldSearch:
+    """
+    Entries that changed ``field`` (an attname such as ``status`` or
+    ``vendor_id``), optionally from ``old`` and/or to ``new`` (compared as
+    :func:`search_value` text), of ``entity`` when given.
+    """
+
+    def __init__(self, field, old=None, new=None, entity=None):
+        fields = AuditField.objects.filter(name=field)
+        model = next((m for m in AUDITED_MODELS if m.__name__ == entity), None)
+        if model is not None:
+            from django.contrib.contenttypes.models import ContentType
+
+            fields = fields.filter(content_type=ContentType.objects.get_for_model(model))
+        self.field_ids = set(fields.values_list("pk", flat=True))
+        self.old, self.new = search_value(old), search_value(new)
+
+    def filter(self, queryset):
+        """Narrow an AuditLog queryset through the AuditFieldChange index."""
+        index = AuditFieldChange.objects.filter(field_id__in=self.field_ids)
+        if self.old is not None:
+            index = index.filter(old=self.old)
+        if self.new is not None:
+            index = index.filter(new=self.new)
+        return queryset.filter(pk__in=index.values("audit_log_id"))
+
+    def matches(self, row):
+        """Whether an archived entry (a dict with ``change_type`` and ``changes``) has a matching change."""
+        for field, *values in row.get("changes") or ():
+            if field not in self.field_ids:
+                continue
+            old, new = map(search_value, _sides(row["change_type"], values))
+            if (self.old is None or old == self.old) and (self.new is None or new == self.new):
+                return True
+        return False
+
+
+def write(entries):
+    """Insert ``entries`` in one statement; auditing never fails the change it records."""
+    if not entries:
+        return
+    from django.contrib.contenttypes.models import ContentType
+
+    captured = [entry for entry in entries if hasattr(entry, "_changes")]
+    try:
+        types = ContentType.objects.get_for_models(*{entry._changes[0] for entry in captured})
+        ids = field_ids({
+            (types[model].pk, change[0]) for model, changes in (entry._changes for entry in captured) for change in changes
+        })
+        for entry in captured:
+            model, changes = entry._changes
+            entry.content_type = types[model]
+            entry.changes = [[ids[types[model].pk, name], *values] for name, *values in changes]
+        with transaction.atomic():
+            chain = audit_chain.lock()
+            AuditLog.objects.bulk_create(entries, batch_size=1000)
+            audit_chain.seal(chain, entries)
+            AuditFieldChange.objects.bulk_create(index_rows(captured), batch_size=1000)
+    except Exception:
+        logger.exception("Could not write %d audit log entries", len(entries))
+        return
+    bump_table_version(AuditLog)
+
+
+def state_at(model, pk, when=None):
+    """
+    Field values (by attname, JSON-safe) of ``model`` row ``pk`` as of ``when``
+    (default now), rebuilt by replaying its audit entries from hot and
+    archived months; None if it did not exist then.
+
+    History captured before the row's creation was audited starts from the
+    first known change, so untouched fields may be missing.
+    """
+    from django.contrib.contenttypes.models import ContentType
+    from slm.services.audit_archive import iter_entries
+
+    filters = {"entity": model.__name__, "content_type_id": ContentType.objects.get_for_model(model).pk, "object_id": pk}
+    end = when + timedelta(microseconds=1) if when else None
+    fields = ("id", "timestamp", "change_type", "old_value", "new_value", "changes")
+    current = None
+    for row in iter_entries(None, end, filters, fields):
+        expand_row(row)
+        if row["change_type"] == "delete":
+            current = None
+        elif row["change_type"] == "create":
+            current = dict(row["new_value"] or {})
+        else:
+            current = {**(current or {}), **(row["new_value"] or {})}
+    return current
@@ -0,0 +1,313 @@
+"""
+Monthly partitions of the audit trail and their cold archive.
+
+On PostgreSQL ``slm_auditlog`` is range-partitioned by month on
+``timestamp`` (migration 0012) with partitions created ahead of time; other
+backends keep one rolling table. Months older than AUDIT_HOT_MONTHS are
+written, oldest entry first, to a gzip-compressed JSONL file recorded as an
+AuditArchiveSegment and then removed from the hot table; on PostgreSQL by
+detaching and dropping the month's partition, which costs the same however
+large the month is.
+
+Readers don't need to know where a month lives: :func:`iter_entries` yields
+archived then hot entries oldest first and :func:`archived_rows` continues a
+newest-first keyset page into the archive once hot rows run out. Segments are
+pruned by month and entity before any file is opened. Readers take an
+optional ``search`` (slm.services.audit.FieldSearch) that narrows hot rows
+through its index and tests archived rows against their ``changes``.
+"""
+import gzip
+import hashlib
+import json
+import tempfile
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.files import File
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from slm.models import AuditLog, AuditFieldChange, AuditArchiveSegment, User
+from slm.services.keyset import iter_keyset
+from slm.services.versions import bump_table_version
+
+FIELDS = (
+    "id", "timestamp", "entity", "object_id", "content_type_id", "change_type", "old_value", "new_value",
+    "changes", "user_id", "ip_address", "user_agent", "extra", "row_hash",
+)
+ORDERING = ("timestamp", "id")
+TABLE = AuditLog._meta.db_table
+PARTITION = TABLE + "_p{:%Y%m}"
+PARTITIONS_AHEAD = 2
+ARCHIVE_CHUNK = 5000
+# Entries per independently compressed block of a segment file
+BLOCK_ROWS = 2000
+
+
+def month_start(value):
+    """First instant (UTC) of the month containing ``value`` (a date or datetime)."""
+    if isinstance(value, datetime) and timezone.is_aware(value):
+        value = value.astimezone(dt_timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=dt_timezone.utc)
+
+
+def shift_month(month, months):
+    index = month.year * 12 + month.month - 1 + months
+    return month.replace(year=index // 12, month=index % 12 + 1)
+
+
+def next_month(month):
+    return shift_month(month, 1)
+
+
+def is_partitioned():
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass", [TABLE])
+        return cursor.fetchone() is not None
+
+
+def ensure_partitions(ahead=PARTITIONS_AHEAD):
+    """Create this month's and the next ``ahead`` months' partitions if missing; returns their names."""
+    if not is_partitioned():
+        return []
+    names, month = [], month_start(timezone.now())
+    with connection.cursor() as cursor:
+        for _ in range(ahead + 1):
+            end = next_month(month)
+            name = PARTITION.format(month)
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{TABLE}" '
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{end.isoformat()}')"
+            )
+            names.append(name)
+            month = end
+    return names
+
+
+def _drop_month(month):
+    """Remove one month from the hot table: its partition if it has one, plus stray rows elsewhere."""
+    end = next_month(month)
+    with connection.cursor() as cursor:
+        if is_partitioned():
+            name = PARTITION.format(month)
+            cursor.execute("SELECT to_regclass(%s)", [name])
+            if cursor.fetchone()[0]:
+                cursor.execute(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{name}"')
+                cursor.execute(f'DROP TABLE "{name}"')
+        # Raw DELETE: the ORM would load every row to send post_delete signals
+        bounds = [connection.ops.adapt_datetimefield_value(month), connection.ops.adapt_datetimefield_value(end)]
+        for table in (TABLE, AuditFieldChange._meta.db_table):
+            cursor.execute(f'DELETE FROM "{table}" WHERE "timestamp" >= %s AND "timestamp" < %s', bounds)
+
+
+def _blocks(rows, size):
+    block = []
+    for row in rows:
+        block.append(row)
+        if len(block) >= size:
+            yield block
+            block = []
+    if block:
+        yield block
+
+
+def archive_month(month):
+    """Move the audit entries of ``month`` into a segment file; returns the segment (None when empty or done)."""
+    month = month_start(month)
+    if AuditArchiveSegment.objects.filter(month=month.date()).exists():
+        return None
+    logs = AuditLog.objects.filter(timestamp__gte=month, timestamp__lt=next_month(month)).values(*FIELDS)
+    encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(",", ":"))
+    count, first_id, last_id, entities, index = 0, None, None, set(), []
+    with tempfile.TemporaryFile() as fh:
+        # One gzip member per block: the file stays a plain .jsonl.gz, and a block can be read on its own
+        for block in _blocks(iter_keyset(logs, ORDERING, chunk_size=ARCHIVE_CHUNK), BLOCK_ROWS):
+            index.append([fh.tell(), encoder.default(block[0]["timestamp"]), block[0]["id"]])
+            fh.write(gzip.compress(b"".join(encoder.encode(row).encode() + b"\n" for row in block), mtime=0))
+            count += len(block)
+            first_id = block[0]["id"] if first_id is None else first_id
+            last_id = block[-1]["id"]
+            entities.update(row["entity"] for row in block)
+        if not count:
+            return None
+        fh.seek(0)
+        digest = hashlib.sha256()
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(chunk)
+        fh.seek(0)
+        segment = AuditArchiveSegment(
+            month=month.date(), row_count=count, first_id=first_id, last_id=last_id,
+            entities=sorted(entities), blocks=index, sha256=digest.hexdigest(),
+        )
+        try:
+            with transaction.atomic():
+                segment.file.save(f"auditlog-{month:%Y-%m}.jsonl.gz", File(fh), save=False)
+                segment.save()
+                _drop_month(month)
+                bump_table_version(AuditLog)
+        except Exception:
+            # The rows stay in the hot table; do not leave a file the next run would save beside
+            if segment.file:
+                segment.file.delete(save=False)
+            raise
+    return segment
+
+
+def archive_audit_logs(hot_months=None):
+    """Archive every month older than the last ``hot_months`` (AUDIT_HOT_MONTHS); returns the new segments."""
+    hot_months = settings.AUDIT_HOT_MONTHS if hot_months is None else hot_months
+    ensure_partitions()
+    cutoff = shift_month(month_start(timezone.now()), -hot_months)
+    oldest = AuditLog.objects.filter(timestamp__lt=cutoff).order_by("timestamp").values_list("timestamp", flat=True).first()
+    segments = []
+    month = month_start(oldest) if oldest else cutoff
+    while month < cutoff:
+        segment = archive_month(month)
+        if segment:
+            segments.append(segment)
+        month = next_month(month)
+    return segments
+
+
+def _parse(line):
+    row = json.loads(line)
+    row["timestamp"] = parse_datetime(row["timestamp"])
+    return row
+
+
+def read_segment(segment):
+    """Entries of one segment, oldest first, with ``timestamp`` parsed; streamed, never held whole."""
+    with segment.file.open("rb") as fh, gzip.GzipFile(fileobj=fh) as gz:
+        for line in gz:
+            yield _parse(line)
+
+
+def _read_blocks(segment, start=None, end=None, descending=False, after=None):
+    """
+    Lists of entries of ``segment``, one block at a time in order (or each
+    reversed, last block first), opening only the blocks that can hold
+    entries in ``[start, end)`` beyond position ``after``.
+    """
+    if not segment.blocks:
+        # Written before the block index existed
+        if descending:
+            yield list(read_segment(segment))[::-1]
+        else:
+            yield from _blocks(read_segment(segment), BLOCK_ROWS)
+        return
+    offsets = [offset for offset, _, _ in segment.blocks] + [None]
+    firsts = [parse_datetime(timestamp) for _, timestamp, _ in segment.blocks]
+    upper, lower = end, start
+    if after and descending:
+        upper = after[0] if upper is None else min(upper, after[0])
+    elif after:
+        lower = after[0] if lower is None else max(lower, after[0])
+    # Block i holds timestamps from firsts[i] to firsts[i + 1]; skip blocks wholly outside the range
+    wanted = [
+        i for i, first in enumerate(firsts)
+        if not (upper and first > upper or lower and i + 1 < len(firsts) and firsts[i + 1] < lower)
+    ]
+    with segment.file.open("rb") as fh:
+        for i in (reversed(wanted) if descending else wanted):
+            fh.seek(offsets[i])
+            data = fh.read(offsets[i + 1] - offsets[i]) if offsets[i + 1] is not None else fh.read()
+            lines = gzip.decompress(data).splitlines()
+            yield [_parse(line) for line in (reversed(lines) if descending else lines)]
+
+
+def _segments(start, end, filters):
+    segments = AuditArchiveSegment.objects.order_by("month")
+    if start:
+        segments = segments.filter(month__gte=month_start(start).date())
+    if end:
+        segments = segments.filter(month__lt=end.astimezone(dt_timezone.utc).date() if isinstance(end, datetime) else end)
+    entity = filters.get("entity")
+    return [s for s in segments if not entity or entity in s.entities]
+
+
+def _matches(row, start, end, filters, search):
+    if start and row["timestamp"] < start or end and row["timestamp"] >= end:
+        return False
+    if not all(row.get(name) == value for name, value in filters.items()):
+        return False
+    return search is None or search.matches(row)
+
+
+def _with_emails(rows, fields):
+    if "user__email" in fields:
+        emails = dict(User.objects.filter(pk__in={r["user_id"] for r in rows if r["user_id"]}).values_list("pk", "email"))
+        for row in rows:
+            row["user__email"] = emails.get(row["user_id"])
+    return [{name: row.get(name) for name in fields} for row in rows]
+
+
+def iter_archived(start=None, end=None, filters=None, fields=FIELDS, descending=False, after=None, search=None):
+    """
+    Archived entries in ``[start, end)`` matching ``filters`` (exact values
+    keyed by FIELDS names), in ``(timestamp, id)`` order or its reverse, strictly
+    after the ``after`` position when given. ``fields`` may include
+    ``user__email``. Rows are streamed block by block, so a consumer that stops
+    early decompresses only the blocks it used.
+    """
+    filters = filters or {}
+    segments = _segments(start, end, filters)
+    position = tuple(after) if after else None
+    if after:
+        bound = month_start(after[0]).date()
+        segments = [s for s in segments if (s.month <= bound if descending else s.month >= bound)]
+    for segment in (reversed(segments) if descending else segments):
+        for block in _read_blocks(segment, start, end, descending, after):
+            matched = []
+            for row in block:
+                key = (row["timestamp"], row["id"])
+                if position and (key >= position if descending else key <= position):
+                    continue
+                if _matches(row, start, end, filters, search):
+                    matched.append(row)
+            if matched:
+                yield from _with_emails(matched, fields)
+
+
+def iter_entries(start=None, end=None, filters=None, fields=FIELDS, chunk_size=ARCHIVE_CHUNK, search=None):
+    """Every matching entry oldest first: archived segments, then the hot table."""
+    filters = filters or {}
+    yield from iter_archived(start, end, filters, fields, search=search)
+    logs = AuditLog.objects.filter(**filters)
+    if search is not None:
+        logs = search.filter(logs)
+    if start:
+        logs = logs.filter(timestamp__gte=start)
+    if end:
+        logs = logs.filter(timestamp__lt=end)
+    yield from iter_keyset(logs.values(*fields), ORDERING, chunk_size=chunk_size)
+
+
+def archived_rows(after, limit, start=None, end=None, filters=None, fields=None, search=None):
+    """
+    Up to ``limit`` archived entries older than position ``after`` (newest
+    first), for continuing a keyset page past the hot table. Returns AuditLog
+    instances with ``user`` attached, or dicts of ``fields`` when given.
+    """
+    if not AuditArchiveSegment.objects.exists():
+        return []
+    rows = []
+    fields_with_email = FIELDS + ("user__email",)
+    for row in iter_archived(start, end, filters, fields_with_email, descending=True, after=after, search=search):
+        rows.append(row)
+        if len(rows) >= limit:
+            break
+    if fields:
+        return [{name: row.get(name) for name in fields} for row in rows]
+    users = User.objects.in_bulk({r["user_id"] for r in rows if r["user_id"]})
+    entries = []
+    for row in rows:
+        row.pop("user__email")
+        entry = AuditLog(**row)
+        entry._state.adding = False
+        entry.user = users.get(row["user_id"])
+        entries.append(entry)
+    return entries
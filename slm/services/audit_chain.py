@@ -0,0 +1,196 @@
+"""
+Tamper-evident hash chain over the audit trail.
+
+Every AuditLog entry stores ``row_hash``, the SHA-256 of the previous entry's
+hash followed by this entry's content as canonical JSON, so entries are
+chained in id order and editing, removing or reordering one breaks every
+later link. :func:`seal` runs in the transaction that inserts a batch, after
+:func:`lock` has taken the AuditChain head, so concurrent writers extend the
+chain one batch at a time.
+
+:func:`verify_chain` checks everything after the last AuditChainCheckpoint
+(or from the start). The range is split into units, archived months and
+fixed-width id ranges of the hot table, that are verified independently,
+optionally in a process pool: a unit streams its rows in keyset chunks,
+checks its internal links and hands back its first payload and last hash.
+The caller stitches units together in id order and records a checkpoint
+after each one, so an interrupted run resumes where it stopped and a nightly
+run only reads entries written since the last one.
+"""
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Min
+
+from slm.models import AuditLog, AuditChain, AuditChainCheckpoint, AuditArchiveSegment
+from slm.services.keyset import iter_keyset
+
+GENESIS = ""
+# Entry content covered by the hash; datetimes are encoded to the millisecond as in the archive files
+CHAINED_FIELDS = (
+    "id", "timestamp", "entity", "object_id", "content_type_id", "change_type", "old_value", "new_value",
+    "changes", "user_id", "ip_address", "user_agent", "extra",
+)
+SEGMENT_SIZE = 100_000
+CHUNK_SIZE = 5000
+
+_encoder = DjangoJSONEncoder(sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def payload(row):
+    """Canonical JSON of a stored entry: a ``values()`` or archived row dict."""
+    return _encoder.encode([row[name] for name in CHAINED_FIELDS])
+
+
+def link(previous, text):
+    return hashlib.sha256((previous + text).encode()).hexdigest()
+
+
+def head(lock=False):
+    """The chain head; with ``lock`` it stays locked until the current transaction ends."""
+    heads = AuditChain.objects.select_for_update() if lock else AuditChain.objects
+    return heads.get_or_create(pk=1)[0]
+
+
+def lock():
+    """Take the chain head before inserting entries so their ids follow the chain order."""
+    return head(lock=True)
+
+
+def seal(chain, entries):
+    """
+    Hash freshly inserted ``entries`` onto ``chain`` (from :func:`lock`) and
+    advance the head. Rows are read back so the hash covers the values as
+    stored (the database normalizes some, e.g. IPv6 addresses).
+    """
+    by_pk = {entry.pk: entry for entry in entries}
+    stored = AuditLog.objects.filter(pk__in=by_pk).order_by("id").values(*CHAINED_FIELDS)
+    previous = chain.last_hash
+    for row in stored:
+        by_pk[row["id"]].row_hash = previous = link(previous, payload(row))
+    entries = sorted(entries, key=lambda entry: entry.pk)
+    AuditLog.objects.bulk_update(entries, ["row_hash"], batch_size=1000)
+    chain.first_id = chain.first_id or entries[0].pk
+    chain.last_id, chain.last_hash = entries[-1].pk, previous
+    AuditChain.objects.filter(pk=chain.pk).update(
+        first_id=chain.first_id, last_id=chain.last_id, last_hash=chain.last_hash
+    )
+
+
+def plan(after, upto, segment_size=SEGMENT_SIZE):
+    """
+    Units covering entries with ``after < id <= upto``: ``("archive",
+    segment_pk, after, upto)`` for archived months, then ``("hot", None, lo,
+    hi)`` id ranges of at most ``segment_size`` ids.
+    """
+    units, hot_after = [], after
+    segments = AuditArchiveSegment.objects.filter(last_id__gt=after, first_id__lte=upto).order_by("first_id")
+    for segment in segments:
+        units.append(("archive", segment.pk, after, upto))
+        hot_after = max(hot_after, segment.last_id)
+    first = AuditLog.objects.filter(id__gt=hot_after, id__lte=upto).aggregate(first=Min("id"))["first"]
+    low = first - 1 if first else upto
+    while low < upto:
+        units.append(("hot", None, low, min(low + segment_size, upto)))
+        low += segment_size
+    return units
+
+
+def _rows(unit):
+    kind, segment_pk, after, upto = unit
+    if kind == "archive":
+        from slm.services.audit_archive import read_segment
+
+        segment = AuditArchiveSegment.objects.get(pk=segment_pk)
+        return (row for row in read_segment(segment) if after < row["id"] <= upto)
+    logs = AuditLog.objects.filter(id__gt=after, id__lte=upto).values(*CHAINED_FIELDS, "row_hash")
+    return iter_keyset(logs, ("id",), chunk_size=CHUNK_SIZE)
+
+
+def verify_unit(unit):
+    """
+    Check the links inside one unit from :func:`plan`. Returns its row
+    ``count``, ``first_id``, ``first_payload``, ``first_hash``, ``last_id``,
+    ``last_hash`` and ``broken``, the id of the first entry that does not
+    follow from its predecessor (None when intact).
+    """
+    result = {
+        "count": 0, "first_id": None, "first_payload": None, "first_hash": None,
+        "last_id": None, "last_hash": None, "broken": None,
+    }
+    for row in _rows(unit):
+        text = payload(row)
+        if not result["count"]:
+            result.update(first_id=row["id"], first_payload=text, first_hash=row["row_hash"])
+        elif row["id"] <= result["last_id"] or link(result["last_hash"], text) != row["row_hash"]:
+            result["broken"] = row["id"]
+            break
+        result.update(count=result["count"] + 1, last_id=row["id"], last_hash=row["row_hash"])
+    return result
+
+
+def _stitch(results, previous, report, written):
+    """Join unit results in order from hash ``previous``, checkpointing each intact unit into ``written``."""
+    for result in results:
+        if not result["count"]:
+            continue
+        if link(previous, result["first_payload"]) != result["first_hash"]:
+            report["broken"] = result["first_id"]
+            return previous
+        if result["broken"] is not None:
+            report["broken"] = result["broken"]
+            return previous
+        previous = result["last_hash"]
+        checkpoint, _ = AuditChainCheckpoint.objects.update_or_create(
+            last_id=result["last_id"],
+            defaults=dict(first_id=result["first_id"], last_hash=previous, row_count=result["count"]),
+        )
+        written.append(checkpoint.pk)
+        report["verified"] += result["count"]
+        report["to_id"] = result["last_id"]
+    return previous
+
+
+def verify_chain(workers=1, segment_size=SEGMENT_SIZE, full=False):
+    """
+    Verify the chain after the last checkpoint, or from its first entry when
+    ``full``. A full run replaces the existing checkpoints only once it ends:
+    all of them when the chain is intact, those at or after the break when
+    not, and none when it is interrupted, so resume points survive a failed
+    run. Entries written while it runs are left for the next run.
+
+    Returns ``{"from_id", "to_id", "verified", "broken"}``: ``broken`` is the
+    id of the first entry that fails (the head's last id when entries at the
+    end are missing), None when the chain is intact.
+    """
+    chain = head()
+    checkpoint = None if full else AuditChainCheckpoint.objects.order_by("-last_id").first()
+    if checkpoint:
+        after, previous = checkpoint.last_id, checkpoint.last_hash
+    else:
+        after, previous = (chain.first_id or 1) - 1, GENESIS
+    upto = chain.last_id or 0
+    report = {"from_id": after + 1, "to_id": after, "verified": 0, "broken": None}
+    if upto <= after:
+        return report
+    units, written = plan(after, upto, segment_size), []
+    if workers > 1:
+        # Forked workers must open their own connections
+        connections.close_all()
+        pool = ProcessPoolExecutor(max_workers=workers)
+        try:
+            previous = _stitch(pool.map(verify_unit, units), previous, report, written)
+        finally:
+            pool.shutdown(cancel_futures=True)
+    else:
+        previous = _stitch(map(verify_unit, units), previous, report, written)
+    if report["broken"] is None and (report["to_id"] != upto or previous != chain.last_hash):
+        report["broken"] = upto
+    if full:
+        stale = AuditChainCheckpoint.objects.exclude(pk__in=written)
+        if report["broken"] is not None:
+            stale = stale.filter(last_id__gte=report["broken"])
+        stale.delete()
+    return report
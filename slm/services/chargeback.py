@@ -0,0 +1,112 @@
+"""
+Chargeback: apportion invoiced license spend to departments by seat-days.
+
+Seat-days come from one vectorized pass over bulk-fetched allocation intervals
+(see slm.services.utilization.allocation_intervals). Each asset's invoice
+total for the period, per currency, is split across departments in proportion
+to their seat-days on that asset. Amounts are handled in integer cents and the
+rounding remainder goes to the largest consumer, so lines always add up to the
+invoiced total.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Sum
+
+from slm.models import Invoice, Department, ChargebackLine
+from slm.services.utilization import allocation_intervals
+
+GROUPS = {
+    "department": ("department", "department__code", "department__name"),
+    "branch": ("branch", "branch__code", "branch__name"),
+}
+
+
+def seat_days(start, end):
+    """Return ``(asset_ids, department_ids, days)`` arrays of seat-days held in ``[start, end]``."""
+    assets, depts, starts, ends = allocation_intervals(start, end)
+    if not len(assets):
+        return assets, depts, np.array([], dtype=np.int64)
+    first = np.datetime64(start, "D")
+    stop = np.datetime64(end + timedelta(days=1), "D")
+    s = np.maximum(starts, first)
+    e = np.minimum(np.where(np.isnat(ends), stop, ends), stop)
+    days = np.maximum((e - s).astype(np.int64), 0)
+
+    keys, inverse = np.unique((assets << 32) | depts, return_inverse=True)
+    totals = np.bincount(inverse, weights=days).astype(np.int64)
+    keep = totals > 0
+    return (keys >> 32)[keep], (keys & 0xFFFFFFFF)[keep], totals[keep]
+
+
+def compute_chargeback(start, end):
+    """Build unsaved ChargebackLine rows for invoices dated within ``[start, end]``."""
+    pair_assets, pair_depts, pair_days = seat_days(start, end)
+    spend = (
+        Invoice.objects.filter(invoice_date__gte=start, invoice_date__lte=end)
+        .order_by()
+        .values_list("license_contract__software_asset", "currency")
+        .annotate(total=Sum("total"))
+    )
+    branches = dict(Department.objects.values_list("pk", "branch_id"))
+
+    asset_ids, asset_index = np.unique(pair_assets, return_inverse=True)
+    asset_days = np.bincount(asset_index, weights=pair_days).astype(np.int64) if len(asset_ids) else asset_ids
+    # Largest consumer of each asset absorbs the rounding remainder
+    order = np.lexsort((-pair_days, asset_index))
+    largest = order[np.r_[True, asset_index[order][1:] != asset_index[order][:-1]]] if len(order) else order
+
+    by_currency = {}
+    lines = []
+    for asset_id, currency, total in spend:
+        cents = int((total or Decimal("0")) * 100)
+        pos = int(np.searchsorted(asset_ids, asset_id)) if asset_id is not None else len(asset_ids)
+        if pos < len(asset_ids) and asset_ids[pos] == asset_id:
+            by_currency.setdefault(currency, np.zeros(len(asset_ids), dtype=np.int64))[pos] += cents
+        else:
+            lines.append(ChargebackLine(
+                period_start=start, period_end=end, software_asset_id=asset_id,
+                currency=currency, amount=Decimal(cents) / 100,
+            ))
+
+    for currency, asset_cents in by_currency.items():
+        pair_cents = asset_cents[asset_index] * pair_days // asset_days[asset_index]
+        remainder = asset_cents - np.bincount(asset_index, weights=pair_cents, minlength=len(asset_ids)).astype(np.int64)
+        pair_cents[largest] += remainder
+        for i in np.flatnonzero(asset_cents[asset_index]):
+            lines.append(ChargebackLine(
+                period_start=start, period_end=end,
+                department_id=int(pair_depts[i]), branch_id=branches.get(int(pair_depts[i])),
+                software_asset_id=int(pair_assets[i]), currency=currency,
+                seat_days=int(pair_days[i]), amount=Decimal(int(pair_cents[i])) / 100,
+            ))
+    return lines
+
+
+def rebuild_chargeback(start, end):
+    """Recompute and store the chargeback for a period, replacing earlier results."""
+    lines = compute_chargeback(start, end)
+    with transaction.atomic():
+        ChargebackLine.objects.filter(period_start=start, period_end=end).delete()
+        ChargebackLine.objects.bulk_create(lines, batch_size=5000)
+    return lines
+
+
+def chargeback_summary(start, end, group_by="department", recompute=False):
+    """Stored chargeback for a period totalled per department or branch and currency, computing it first if needed."""
+    lines = ChargebackLine.objects.filter(period_start=start, period_end=end)
+    if recompute or not lines.exists():
+        rebuild_chargeback(start, end)
+    key, code, name = GROUPS[group_by]
+    return [
+        {
+            "id": r[key], "code": r[code], "name": r[name] or "Unallocated",
+            "currency": r["currency"], "seat_days": r["seat_days"],
+            "amount": str(r["amount"].quantize(Decimal("0.01"))),
+        }
+        for r in lines.order_by(code, "currency").values(key, code, name, "currency").annotate(
+            seat_days=Sum("seat_days"), amount=Sum("amount")
+        )
+    ]
@@ -0,0 +1,46 @@
+"""Dashboard counters: one aggregate query per table, cached until a relevant model changes."""
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Sum, Q
+from django.utils import timezone
+
+from slm.models import SoftwareAsset, LicenseContract, Invoice, Vendor
+
+CACHE_KEY = "slm:dashboard-stats"
+CACHE_TIMEOUT = 60 * 60
+
+
+def compute_dashboard_stats(today=None):
+    today = today or timezone.now().date()
+    next_30 = today + timedelta(days=30)
+    next_90 = today + timedelta(days=90)
+    active = Q(status="active")
+    contracts = LicenseContract.objects.aggregate(
+        active_contracts=Count("id", filter=active),
+        expiring_in_30_days=Count("id", filter=active & Q(expiry_date__gte=today, expiry_date__lte=next_30)),
+        expiring_in_90_days=Count("id", filter=active & Q(expiry_date__gt=next_30, expiry_date__lte=next_90)),
+        expired_pending=Count("id", filter=active & Q(expiry_date__lt=today)),
+    )
+    return {
+        "total_assets": SoftwareAsset.objects.filter(is_deleted=False).count(),
+        **contracts,
+        "total_spend": Invoice.objects.aggregate(s=Sum("total"))["s"] or 0,
+        "total_vendors": Vendor.objects.filter(is_active=True).count(),
+    }
+
+
+def get_dashboard_stats():
+    """Cached dashboard counters; recomputed when stale, invalidated or the day rolls over."""
+    today = timezone.now().date()
+    cached = cache.get(CACHE_KEY)
+    if cached and cached["date"] == today:
+        return cached["stats"]
+    stats = compute_dashboard_stats(today)
+    cache.set(CACHE_KEY, {"date": today, "stats": stats}, CACHE_TIMEOUT)
+    return stats
+
+
+def invalidate_dashboard_stats():
+    transaction.on_commit(lambda: cache.delete(CACHE_KEY))
@@ -0,0 +1,272 @@
+"""
+Renewal spend forecast.
+
+Contracts, their invoice history and current seat holdings are bulk-loaded
+into NumPy arrays and every renewal in the horizon is projected in one pass:
+
+* a contract's price series is its first invoice followed by the invoices
+  of its renewals (RenewalHistory -> Invoice);
+* the base price is the last renewal invoice, else the latest invoice;
+* the per-cycle price change is the geometric mean of consecutive ratios in
+  the series; contracts never renewed use the portfolio median;
+* a contract renews at ``expiry_date`` and then every ``duration_months``,
+  compounding the price change each cycle;
+* a right-sized figure scales each renewal by the asset's current seat use.
+
+Amounts are converted to the reporting currency at the latest known rate and
+aggregated by month, vendor and department (split by active allocations).
+"""
+import hashlib
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils import timezone
+
+from slm.models import (
+    LicenseContract, Invoice, RenewalHistory, Allocation, SoftwareAsset, Vendor, Department, ExchangeRate,
+)
+from slm.services.spend import RateTable, CENT
+from slm.services.versions import table_versions
+
+FORECAST_STATUSES = ("active", "pending_renewal")
+MAX_MONTHS = 36
+MAX_CYCLE_GROWTH = 1.0  # per-cycle price changes are clipped to [-50%, +100%]
+MIN_CYCLE_GROWTH = -0.5
+CACHE_TIMEOUT = 60 * 60
+
+
+def _month_index(days):
+    """``datetime64[D]`` -> months since 1970-01."""
+    return days.astype("datetime64[M]").astype(np.int64)
+
+
+def _month_label(index):
+    return str(np.datetime64(int(index), "M"))
+
+
+def _money(value):
+    return Decimal(str(round(float(value), 2))).quantize(CENT)
+
+
+def load_contracts():
+    """Forecastable contracts as arrays: ids, asset ids, vendor ids (-1 for none), expiry days, durations."""
+    rows = list(
+        LicenseContract.objects.filter(status__in=FORECAST_STATUSES, expiry_date__isnull=False)
+        .order_by("pk").values_list("pk", "software_asset_id", "vendor_id", "expiry_date", "duration_months")
+    )
+    if not rows:
+        return None
+    ids, assets, vendors, expiry, duration = zip(*rows)
+    return {
+        "id": np.array(ids, dtype=np.int64),
+        "asset": np.array(assets, dtype=np.int64),
+        "vendor": np.array([v if v is not None else -1 for v in vendors], dtype=np.int64),
+        "expiry": np.array(expiry, dtype="datetime64[D]"),
+        "duration": np.maximum(np.array(duration, dtype=np.int64), 1),
+    }
+
+
+def load_prices(contract_ids):
+    """
+    Invoice history as parallel arrays sorted by contract then invoice date.
+
+    Renewal invoices are flagged so one-off purchases on a contract (extra
+    seats, services) don't read as price changes.
+    """
+    renewal_invoices = set(
+        RenewalHistory.objects.filter(license_contract_id__in=contract_ids, invoice__isnull=False)
+        .values_list("invoice_id", flat=True)
+    )
+    rows = list(
+        Invoice.objects.filter(license_contract_id__in=contract_ids).order_by("license_contract_id", "invoice_date", "pk")
+        .values_list("pk", "license_contract_id", "total", "currency")
+    )
+    if not rows:
+        return None
+    pks, contracts, totals, currencies = zip(*rows)
+    return {
+        "contract": np.array(contracts, dtype=np.int64),
+        "amount": np.array(totals, dtype=np.float64),
+        "currency": np.array(currencies, dtype=object),
+        "renewal": np.array([pk in renewal_invoices for pk in pks], dtype=bool),
+    }
+
+
+def price_model(contracts, prices, to_target):
+    """
+    Return ``(base, growth, priced)`` per contract.
+
+    ``base`` is the last price in the reporting currency, ``growth`` the
+    per-cycle change and ``priced`` whether a convertible price exists.
+    ``to_target`` maps currency codes to a conversion factor (None when there
+    is no rate).
+    """
+    n = len(contracts["id"])
+    base, growth, priced = np.zeros(n), np.full(n, np.nan), np.zeros(n, dtype=bool)
+    if prices is None:
+        return base, np.zeros(n), priced
+    idx = np.searchsorted(contracts["id"], prices["contract"])
+    factors = [to_target(c) for c in prices["currency"]]
+    convertible = np.array([f is not None for f in factors], dtype=bool)
+    amount = prices["amount"] * np.array([f if f is not None else np.nan for f in factors], dtype=np.float64)
+
+    # The renewal price series: the original purchase followed by each renewal invoice
+    first_row = np.r_[True, idx[1:] != idx[:-1]]
+    series = (first_row | prices["renewal"]) & convertible
+
+    # Base: last invoice of the series once renewed, else the contract's last invoice
+    for mask in (convertible, series & ~first_row):
+        rows = np.flatnonzero(mask)[::-1]
+        owners, last = np.unique(idx[rows], return_index=True)
+        base[owners] = amount[rows[last]]
+        priced[owners] = True
+
+    # Growth: geometric mean of consecutive ratios along each contract's series
+    rows = np.flatnonzero(series)
+    step = (idx[rows[1:]] == idx[rows[:-1]]) & (amount[rows[:-1]] > 0) & (amount[rows[1:]] > 0)
+    owners = idx[rows[1:]][step]
+    log_ratio = np.log(amount[rows[1:]][step] / amount[rows[:-1]][step])
+    counts = np.bincount(owners, minlength=n)
+    sums = np.bincount(owners, weights=log_ratio, minlength=n)
+    has_history = counts > 0
+    growth[has_history] = np.expm1(sums[has_history] / counts[has_history])
+    fallback = float(np.median(growth[has_history])) if has_history.any() else 0.0
+    growth = np.where(has_history, growth, fallback)
+    return base, np.clip(growth, MIN_CYCLE_GROWTH, MAX_CYCLE_GROWTH), priced
+
+
+def seat_shares(asset_ids):
+    """Active allocations per (asset, department) plus each asset's capacity and current use."""
+    pairs = list(
+        Allocation.objects.filter(software_asset_id__in=asset_ids, active_flag=True).order_by()
+        .values_list("software_asset_id", "department_id").annotate(seats=Count("id"))
+    )
+    capacity = dict(
+        (pk, (total, used))
+        for pk, total, used in SoftwareAsset.objects.filter(pk__in=asset_ids).values_list("pk", "total_licenses", "used_seats")
+    )
+    return pairs, capacity
+
+
+def forecast_renewals(months=12, currency=None, today=None):
+    """
+    Project renewal spend for ``months`` calendar months starting this month.
+
+    Returns totals plus ``by_month``, ``by_vendor`` and ``by_department``
+    rows, each with ``amount`` (renewing every seat) and ``rightsized``
+    (renewing only seats in use), and ``unpriced_contracts`` for contracts
+    with no convertible invoice history.
+    """
+    currency = currency or settings.FX_BASE_CURRENCY
+    today = today or timezone.now().date()
+    versions = table_versions(
+        [LicenseContract, Invoice, RenewalHistory, Allocation, SoftwareAsset, Vendor, Department, ExchangeRate]
+    )
+    key = "slm:renewal-forecast:" + hashlib.md5(f"{months}|{currency}|{today}|{versions}".encode()).hexdigest()
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    start = _month_index(np.array([today], dtype="datetime64[D]"))[0]
+    result = {
+        "currency": currency, "start": _month_label(start), "months": months,
+        "amount": Decimal("0.00"), "rightsized": Decimal("0.00"), "renewals": 0, "unpriced_contracts": 0,
+        "by_month": [], "by_vendor": [], "by_department": [],
+    }
+    contracts = load_contracts()
+    if contracts is None:
+        result["by_month"] = [
+            {"month": _month_label(start + i), "amount": Decimal("0.00"), "rightsized": Decimal("0.00"), "renewals": 0}
+            for i in range(months)
+        ]
+        cache.set(key, result, CACHE_TIMEOUT)
+        return result
+
+    prices = load_prices(contracts["id"].tolist())
+    rates = RateTable(set(prices["currency"]) | {currency} if prices is not None else {currency})
+    target = rates.to_base(currency, today)
+
+    def to_target(code):
+        source = rates.to_base(code, today)
+        return float(source / target) if source is not None and target else None
+
+    base, growth, priced = price_model(contracts, prices, to_target)
+    pairs, capacity = seat_shares(np.unique(contracts["asset"]).tolist())
+    total_seats = np.array([capacity.get(int(a), (0, 0))[0] for a in contracts["asset"]], dtype=np.float64)
+    used_seats = np.array([capacity.get(int(a), (0, 0))[1] for a in contracts["asset"]], dtype=np.float64)
+    rightsize = np.where(total_seats > 0, np.minimum(used_seats / np.maximum(total_seats, 1), 1.0), 1.0)
+
+    # Every renewal in the horizon: overdue contracts renew this month, then every duration_months
+    first = np.maximum(_month_index(contracts["expiry"]), start)
+    cycles = int(np.ceil(months / contracts["duration"].min())) + 1
+    k = np.arange(cycles)
+    due = first[:, None] + k[None, :] * contracts["duration"][:, None]
+    amounts = base[:, None] * np.power(1 + growth[:, None], k[None, :] + 1)
+    in_horizon = (due < start + months) & priced[:, None]
+    row, cycle = np.nonzero(in_horizon)
+    renewal_month = due[row, cycle] - start
+    renewal_amount = amounts[row, cycle]
+    renewal_rightsized = renewal_amount * rightsize[row]
+
+    by_month = np.bincount(renewal_month, weights=renewal_amount, minlength=months)
+    by_month_rs = np.bincount(renewal_month, weights=renewal_rightsized, minlength=months)
+    by_month_n = np.bincount(renewal_month, minlength=months)
+    result["by_month"] = [
+        {"month": _month_label(start + i), "amount": _money(by_month[i]),
+         "rightsized": _money(by_month_rs[i]), "renewals": int(by_month_n[i])}
+        for i in range(months)
+    ]
+
+    vendor_keys, vendor_idx = np.unique(contracts["vendor"][row], return_inverse=True)
+    vendor_amount = np.bincount(vendor_idx, weights=renewal_amount, minlength=len(vendor_keys))
+    vendor_rs = np.bincount(vendor_idx, weights=renewal_rightsized, minlength=len(vendor_keys))
+    names = dict(Vendor.objects.filter(pk__in=vendor_keys.tolist()).values_list("pk", "company_name"))
+    result["by_vendor"] = sorted(
+        (
+            {"vendor_id": int(v) if v >= 0 else None, "vendor_name": names.get(int(v), "N/A"),
+             "amount": _money(a), "rightsized": _money(r)}
+            for v, a, r in zip(vendor_keys, vendor_amount, vendor_rs)
+        ),
+        key=lambda r: -r["amount"],
+    )
+
+    # Departments: each asset's projected spend split by its active allocations
+    asset_keys, asset_idx = np.unique(contracts["asset"][row], return_inverse=True)
+    asset_amount = np.bincount(asset_idx, weights=renewal_amount, minlength=len(asset_keys))
+    asset_rs = np.bincount(asset_idx, weights=renewal_rightsized, minlength=len(asset_keys))
+    dept_amount, dept_rs = {}, {}
+    if pairs and len(asset_keys):
+        pair_asset, pair_dept, pair_seats = (np.array(c, dtype=np.int64) for c in zip(*pairs))
+        pos = np.searchsorted(asset_keys, pair_asset)
+        known = (pos < len(asset_keys)) & (asset_keys[np.minimum(pos, len(asset_keys) - 1)] == pair_asset)
+        pair_asset, pair_dept, pair_seats, pos = pair_asset[known], pair_dept[known], pair_seats[known], pos[known]
+        held = np.bincount(pos, weights=pair_seats, minlength=len(asset_keys))
+        share = pair_seats / held[pos]
+        for dept, amount, rs in zip(pair_dept, asset_amount[pos] * share, asset_rs[pos] * share):
+            dept_amount[int(dept)] = dept_amount.get(int(dept), 0.0) + amount
+            dept_rs[int(dept)] = dept_rs.get(int(dept), 0.0) + rs
+        unallocated = held == 0
+    else:
+        unallocated = np.ones(len(asset_keys), dtype=bool)
+    if unallocated.any():
+        dept_amount[None] = float(asset_amount[unallocated].sum())
+        dept_rs[None] = float(asset_rs[unallocated].sum())
+    dept_names = dict(Department.objects.filter(pk__in=[d for d in dept_amount if d]).values_list("pk", "name"))
+    result["by_department"] = sorted(
+        (
+            {"department_id": d, "department_name": dept_names.get(d, "Unallocated"),
+             "amount": _money(dept_amount[d]), "rightsized": _money(dept_rs[d])}
+            for d in dept_amount
+        ),
+        key=lambda r: -r["amount"],
+    )
+
+    result.update(
+        amount=_money(renewal_amount.sum()), rightsized=_money(renewal_rightsized.sum()),
+        renewals=int(len(row)), unpriced_contracts=int((~priced).sum()),
+    )
+    cache.set(key, result, CACHE_TIMEOUT)
+    return result
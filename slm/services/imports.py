@@ -0,0 +1,360 @@
+"""
+Chunked bulk import of vendors, assets, contracts and allocations from CSV/XLSX.
+
+Files are read as a row stream (csv.reader / openpyxl read-only mode) and
+processed in chunks: every row is cleaned with the model fields' own
+validators, references (vendor names, asset names, department codes, user
+emails) are resolved with one query per chunk, rows matching an existing
+record by natural key are updated and the rest created, each with one
+``bulk_update`` / ``bulk_create``. Progress and rejected rows are recorded on
+the ImportJob after every chunk.
+"""
+import csv
+import io
+import logging
+
+from dateutil.relativedelta import relativedelta
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from slm.models import Vendor, SoftwareAsset, LicenseContract, Allocation, Department, User
+from slm.services import audit
+from slm.services.allocation import bulk_allocate
+from slm.services.dashboard import invalidate_dashboard_stats
+from slm.services.renewals import invalidate_renewal_calendar
+from slm.services.versions import bump_table_version
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 2000
+FILE_TYPES = (".csv", ".xlsx")
+
+
+class ImportFileError(Exception):
+    """The file as a whole cannot be imported (unreadable, wrong type, missing columns)."""
+
+
+def _column(name):
+    return str(name or "").strip().lower().replace(" ", "_")
+
+
+def read_table(fileobj, filename):
+    """Return ``(columns, rows)``; ``rows`` lazily yields ``(line_number, {column: value})``."""
+    if filename.lower().endswith(".xlsx"):
+        import openpyxl
+
+        try:
+            workbook = openpyxl.load_workbook(fileobj, read_only=True, data_only=True)
+        except Exception as exc:
+            raise ImportFileError(f"Unreadable XLSX file: {exc}")
+        values = workbook.active.iter_rows(values_only=True)
+    elif filename.lower().endswith(".csv"):
+        workbook = None
+        values = csv.reader(io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline=""))
+    else:
+        raise ImportFileError("Only .csv and .xlsx files can be imported.")
+
+    columns = [_column(c) for c in next(values, None) or ()]
+
+    def rows():
+        try:
+            for line, row in enumerate(values, start=2):
+                if any(v not in (None, "") for v in row):
+                    yield line, dict(zip(columns, row))
+        finally:
+            if workbook is not None:
+                workbook.close()
+
+    return columns, rows()
+
+
+def estimate_rows(fileobj, filename):
+    """Cheap data-row count for progress reporting (line count for CSV, sheet dimension for XLSX)."""
+    if filename.lower().endswith(".xlsx"):
+        import openpyxl
+
+        workbook = openpyxl.load_workbook(fileobj, read_only=True)
+        try:
+            return max((workbook.active.max_row or 1) - 1, 0)
+        finally:
+            workbook.close()
+    lines = sum(block.count(b"\n") for block in iter(lambda: fileobj.read(1 << 20), b""))
+    return max(lines - 1, 0)
+
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _text(raw, column):
+    value = raw.get(column)
+    return str(value).strip() if value not in (None, "") else ""
+
+
+class Importer:
+    """Turns one chunk of raw rows into created/updated records of ``model``."""
+    model = None
+    fields = ()      # model fields read from same-named columns
+    required = ()    # columns every row must fill
+    key = ()         # natural key matched against existing rows; empty means always create
+
+    def __init__(self, job):
+        self.job = job
+        self.now = timezone.now()
+
+    def check_columns(self, columns):
+        missing = [c for c in self.required if c not in columns]
+        if missing:
+            raise ImportFileError(f"Missing required column(s): {', '.join(missing)}.")
+
+    def clean(self, raw):
+        """Return ``(values, errors)`` for the model fields present in the row."""
+        values, errors = {}, {}
+        for name in self.required:
+            if raw.get(name) in (None, "") or not str(raw[name]).strip():
+                errors[name] = "This field is required."
+        for name in self.fields:
+            value = raw.get(name)
+            if isinstance(value, str):
+                value = value.strip()
+            if value in (None, "") or name in errors:
+                continue
+            try:
+                values[name] = self.model._meta.get_field(name).clean(value, None)
+            except ValidationError as exc:
+                errors[name] = "; ".join(exc.messages)
+        return values, errors
+
+    def key_of(self, values):
+        return tuple(values.get(k, "") for k in self.key)
+
+    def existing(self, keys):
+        """Map natural keys in this chunk to existing instances."""
+        return {}
+
+    def resolve(self, rows):
+        """Resolve references for the chunk; may add errors. ``rows`` is ``[(line, raw, values, errors)]``."""
+
+    def build(self, values):
+        return self.model(**values)
+
+    def finish(self):
+        """Called once after the last chunk to refresh caches bulk writes bypass."""
+
+    def import_chunk(self, chunk):
+        """Returns ``(created, updated, errors)`` where errors is ``[{"row", "errors"}]``."""
+        rows = [(line, raw) + self.clean(raw) for line, raw in chunk]
+        self.resolve(rows)
+        errors = [{"row": line, "errors": err} for line, _, _, err in rows if err]
+        valid = [values for _, _, values, err in rows if not err]
+
+        existing = self.existing({self.key_of(v) for v in valid}) if self.key else {}
+        to_create, to_update, changed = {}, {}, {"updated_at"}
+        for i, values in enumerate(valid):
+            key = self.key_of(values) if self.key else i
+            obj = existing.get(key)
+            if obj is not None:
+                for name, value in values.items():
+                    setattr(obj, name, value)
+                obj.updated_at = self.now
+                to_update[obj.pk] = obj
+                changed.update(values)
+            elif key in to_create:
+                # Repeated key within the chunk: later rows win
+                for name, value in values.items():
+                    setattr(to_create[key], name, value)
+            else:
+                to_create[key] = self.build(values)
+
+        self.model.objects.bulk_create(list(to_create.values()), batch_size=1000)
+        if to_update:
+            self.model.objects.bulk_update(list(to_update.values()), sorted(changed), batch_size=1000)
+        if audit.is_audited(self.model):
+            # bulk writes skip the signals that capture audit entries
+            for obj in to_create.values():
+                audit.capture_save(obj, created=True)
+            for obj in to_update.values():
+                audit.capture_save(obj, created=False, update_fields=sorted(changed))
+        return len(to_create), len(to_update), errors
+
+
+class VendorImporter(Importer):
+    model = Vendor
+    fields = ("company_name", "contact_person", "email", "phone", "rating", "address", "is_active")
+    required = ("company_name",)
+    key = ("company_name",)
+
+    def existing(self, keys):
+        return {
+            (v.company_name,): v
+            for v in Vendor.objects.filter(company_name__in=[k[0] for k in keys]).order_by("pk")
+        }
+
+
+class AssetImporter(Importer):
+    model = SoftwareAsset
+    fields = ("name", "category", "version", "license_type", "total_licenses", "description", "tags")
+    required = ("name",)
+    key = ("name", "version")
+
+    def existing(self, keys):
+        assets = SoftwareAsset.objects.filter(name__in={k[0] for k in keys}, is_deleted=False).order_by("pk")
+        return {(a.name, a.version): a for a in assets}
+
+    def build(self, values):
+        return SoftwareAsset(created_by=self.job.created_by, **values)
+
+
+class ContractImporter(Importer):
+    model = LicenseContract
+    fields = (
+        "purchase_date", "duration_months", "expiry_date", "renewal_due_date",
+        "status", "support_level", "notes",
+    )
+    required = ("software_asset", "purchase_date")
+
+    def __init__(self, job):
+        super().__init__(job)
+        self.expiry_months = set()
+
+    def resolve(self, rows):
+        names = {_text(raw, "software_asset") for _, raw, _, _ in rows}
+        vendors = {_text(raw, "vendor") for _, raw, _, _ in rows} - {""}
+        assets = {}
+        for pk, name, version in SoftwareAsset.objects.filter(name__in=names, is_deleted=False).values_list(
+            "pk", "name", "version"
+        ):
+            assets.setdefault(name, {})[version] = pk
+        vendor_ids = dict(Vendor.objects.filter(company_name__in=vendors).values_list("company_name", "pk"))
+
+        for _, raw, values, errors in rows:
+            versions = assets.get(_text(raw, "software_asset"), {})
+            version = _text(raw, "version")
+            if version or len(versions) == 1:
+                asset_id = versions.get(version) if version else next(iter(versions.values()))
+            else:
+                asset_id = None
+            if asset_id is None and "software_asset" not in errors:
+                errors["software_asset"] = (
+                    "Several assets have this name; add a version column." if len(versions) > 1
+                    else "Unknown software asset."
+                )
+            values["software_asset_id"] = asset_id
+            vendor = _text(raw, "vendor")
+            if vendor and vendor not in vendor_ids:
+                errors["vendor"] = "Unknown vendor."
+            values["vendor_id"] = vendor_ids.get(vendor)
+
+    def build(self, values):
+        # Same defaults as LicenseContract.save(), which bulk_create bypasses
+        contract = LicenseContract(**values)
+        if not contract.expiry_date and contract.purchase_date and contract.duration_months:
+            contract.expiry_date = contract.purchase_date + relativedelta(months=contract.duration_months)
+        if not contract.renewal_due_date and contract.expiry_date:
+            contract.renewal_due_date = contract.expiry_date - relativedelta(days=30)
+        self.expiry_months.add(contract.expiry_date.replace(day=1) if contract.expiry_date else None)
+        return contract
+
+    def finish(self):
+        months = self.expiry_months - {None}
+        if months:
+            invalidate_renewal_calendar(*months)
+
+
+class AllocationImporter(Importer):
+    """Allocations go through bulk_allocate so seat capacity is still enforced."""
+    model = Allocation
+    fields = ("notes",)
+    required = ("software_asset", "department")
+
+    def resolve(self, rows):
+        names = {_text(raw, "software_asset") for _, raw, _, _ in rows}
+        assets = {}
+        for pk, name in SoftwareAsset.objects.filter(name__in=names, is_deleted=False).values_list("pk", "name"):
+            assets.setdefault(name, []).append(pk)
+        departments = dict(Department.objects.filter(
+            code__in={_text(raw, "department") for _, raw, _, _ in rows}
+        ).values_list("code", "pk"))
+        users = dict(User.objects.filter(
+            email__in={_text(raw, "user") for _, raw, _, _ in rows} - {""}
+        ).values_list("email", "pk"))
+
+        for _, raw, values, errors in rows:
+            matches = assets.get(_text(raw, "software_asset"), [])
+            if len(matches) != 1 and "software_asset" not in errors:
+                errors["software_asset"] = "Several assets have this name." if matches else "Unknown software asset."
+            if _text(raw, "department") not in departments and "department" not in errors:
+                errors["department"] = "Unknown department."
+            if _text(raw, "user") and _text(raw, "user") not in users:
+                errors["user"] = "Unknown user."
+            values.update(
+                software_asset=matches[0] if len(matches) == 1 else None,
+                department=departments.get(_text(raw, "department")),
+                user=users.get(_text(raw, "user")),
+            )
+
+    def import_chunk(self, chunk):
+        rows = [(line, raw) + self.clean(raw) for line, raw in chunk]
+        self.resolve(rows)
+        errors = [{"row": line, "errors": err} for line, _, _, err in rows if err]
+        valid = [(line, values) for line, _, values, err in rows if not err]
+        results = bulk_allocate([values for _, values in valid])
+        for (line, _), result in zip(valid, results):
+            if result["status"] == "error":
+                errors.append({"row": line, "errors": {"software_asset": result["error"]}})
+        return sum(r["status"] == "created" for r in results), 0, sorted(errors, key=lambda e: e["row"])
+
+
+IMPORTERS = {
+    "vendors": VendorImporter,
+    "assets": AssetImporter,
+    "contracts": ContractImporter,
+    "allocations": AllocationImporter,
+}
+
+
+def run_import(job, chunk_size=CHUNK_SIZE):
+    """Import ``job.file`` chunk by chunk, saving progress on the job after each chunk."""
+    importer = IMPORTERS[job.kind](job)
+    job.status, job.started_at = "running", timezone.now()
+    job.save(update_fields=["status", "started_at"])
+    progress = ["processed_rows", "created_count", "updated_count", "error_count", "errors"]
+    try:
+        with job.file.open("rb") as fh:
+            job.total_rows = estimate_rows(fh, job.file.name)
+            fh.seek(0)
+            columns, rows = read_table(fh, job.file.name)
+            importer.check_columns(columns)
+            job.save(update_fields=["total_rows"])
+            for chunk in _chunks(rows, chunk_size):
+                with audit.batch(), transaction.atomic():
+                    created, updated, errors = importer.import_chunk(chunk)
+                job.processed_rows += len(chunk)
+                job.created_count += created
+                job.updated_count += updated
+                job.error_count += len(errors)
+                job.errors.extend(errors[:max(job.MAX_STORED_ERRORS - len(job.errors), 0)])
+                job.save(update_fields=progress)
+    except ImportFileError as exc:
+        job.status, job.message = "failed", str(exc)
+    except Exception as exc:
+        logger.exception("Import job %s failed", job.pk)
+        job.status, job.message = "failed", f"Import stopped after {job.processed_rows} rows: {exc}"
+    else:
+        job.status = "completed"
+        job.total_rows = job.processed_rows
+    job.finished_at = timezone.now()
+    job.save(update_fields=progress + ["status", "message", "total_rows", "finished_at"])
+    # bulk_create/bulk_update skip the model signals that normally refresh these
+    bump_table_version(importer.model)
+    importer.finish()
+    invalidate_dashboard_stats()
+    return job
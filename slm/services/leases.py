@@ -0,0 +1,268 @@
+"""
+Short-lived leases for concurrent (floating) licenses.
+
+Checkouts never touch the database: lease state lives in Redis (one sorted set
+per asset, scored by expiry) or, for the minimal settings, in process memory.
+Expired leases are reclaimed lazily on every operation against the asset and by
+the periodic ``summarize_lease_usage`` task, which also drains the per-asset
+counters into LeaseUsage rows.
+"""
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from slm.models import SoftwareAsset
+
+STAT_FIELDS = ("checkouts", "checkins", "denied", "expired", "peak", "lease_seconds")
+
+
+class LeaseError(Exception):
+    """Raised for unknown or non-concurrent assets and malformed lease ids."""
+
+
+def make_lease_id(asset_id):
+    return f"{asset_id}.{uuid.uuid4().hex}"
+
+
+def parse_lease_id(lease_id):
+    asset_id, _, token = str(lease_id).partition(".")
+    if not asset_id.isdigit() or not token:
+        raise LeaseError("Malformed lease id.")
+    return int(asset_id)
+
+
+class MemoryLeaseStore:
+    """In-process lease store; correct within one process only (minimal settings, tests)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._leases = defaultdict(dict)  # asset_id -> {lease_id: (started, expires)}
+        self._stats = defaultdict(lambda: dict.fromkeys(STAT_FIELDS, 0))
+
+    def _reclaim(self, asset_id, now):
+        leases = self._leases[asset_id]
+        for lease_id, (started, expires) in list(leases.items()):
+            if expires <= now:
+                del leases[lease_id]
+                self._stats[asset_id]["expired"] += 1
+                self._stats[asset_id]["lease_seconds"] += expires - started
+        return leases
+
+    def checkout(self, asset_id, capacity, lease_id, ttl, now):
+        with self._lock:
+            leases = self._reclaim(asset_id, now)
+            stats = self._stats[asset_id]
+            if len(leases) >= capacity:
+                stats["denied"] += 1
+                return None
+            leases[lease_id] = (now, now + ttl)
+            stats["checkouts"] += 1
+            stats["peak"] = max(stats["peak"], len(leases))
+            return len(leases)
+
+    def renew(self, asset_id, lease_id, ttl, now):
+        with self._lock:
+            leases = self._reclaim(asset_id, now)
+            if lease_id not in leases:
+                return False
+            leases[lease_id] = (leases[lease_id][0], now + ttl)
+            return True
+
+    def checkin(self, asset_id, lease_id, now):
+        with self._lock:
+            lease = self._reclaim(asset_id, now).pop(lease_id, None)
+            if lease is None:
+                return False
+            self._stats[asset_id]["checkins"] += 1
+            self._stats[asset_id]["lease_seconds"] += now - lease[0]
+            return True
+
+    def active(self, asset_id, now):
+        with self._lock:
+            return len(self._reclaim(asset_id, now))
+
+    def drain(self, now):
+        """Reclaim expired leases everywhere and return-and-reset per-asset counters."""
+        with self._lock:
+            drained = {}
+            for asset_id in list(self._leases):
+                leases = self._reclaim(asset_id, now)
+                stats = self._stats.pop(asset_id, None)
+                if stats and any(stats.values()):
+                    drained[asset_id] = stats
+                self._stats[asset_id]["peak"] = len(leases)
+            return drained
+
+
+# Every script first reclaims expired leases of the asset (KEYS[1..3]) and books their held time
+_RECLAIM = """
+local now = tonumber(ARGV[1])
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', now, 'WITHSCORES')
+for i = 1, #expired, 2 do
+  local started = tonumber(redis.call('HGET', KEYS[2], expired[i]) or expired[i + 1])
+  redis.call('HINCRBYFLOAT', KEYS[3], 'lease_seconds', tonumber(expired[i + 1]) - started)
+  redis.call('HINCRBY', KEYS[3], 'expired', 1)
+  redis.call('HDEL', KEYS[2], expired[i])
+end
+if #expired > 0 then redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now) end
+"""
+
+_CHECKOUT = _RECLAIM + """
+local active = redis.call('ZCARD', KEYS[1])
+if active >= tonumber(ARGV[4]) then
+  redis.call('HINCRBY', KEYS[3], 'denied', 1)
+  return -1
+end
+redis.call('ZADD', KEYS[1], ARGV[2], ARGV[3])
+redis.call('HSET', KEYS[2], ARGV[3], now)
+redis.call('HINCRBY', KEYS[3], 'checkouts', 1)
+if active + 1 > tonumber(redis.call('HGET', KEYS[3], 'peak') or '0') then
+  redis.call('HSET', KEYS[3], 'peak', active + 1)
+end
+redis.call('SADD', KEYS[4], ARGV[5])
+return active + 1
+"""
+
+_RENEW = _RECLAIM + """
+if not redis.call('ZSCORE', KEYS[1], ARGV[3]) then return 0 end
+redis.call('ZADD', KEYS[1], 'XX', ARGV[2], ARGV[3])
+return 1
+"""
+
+_CHECKIN = _RECLAIM + """
+if redis.call('ZREM', KEYS[1], ARGV[2]) == 0 then return 0 end
+local started = tonumber(redis.call('HGET', KEYS[2], ARGV[2]) or now)
+redis.call('HDEL', KEYS[2], ARGV[2])
+redis.call('HINCRBYFLOAT', KEYS[3], 'lease_seconds', now - started)
+redis.call('HINCRBY', KEYS[3], 'checkins', 1)
+return 1
+"""
+
+_ACTIVE = _RECLAIM + """
+return redis.call('ZCARD', KEYS[1])
+"""
+
+_DRAIN = _RECLAIM + """
+local stats = redis.call('HGETALL', KEYS[3])
+redis.call('DEL', KEYS[3])
+local active = redis.call('ZCARD', KEYS[1])
+if active > 0 then redis.call('HSET', KEYS[3], 'peak', active) end
+return stats
+"""
+
+
+class RedisLeaseStore:
+    """Lease store backed by Redis; every operation is one atomic Lua script call."""
+    ASSETS_KEY = "slm:lease-assets"
+
+    def __init__(self, url):
+        import redis
+
+        self._redis = redis.Redis.from_url(url)
+        self._checkout = self._redis.register_script(_CHECKOUT)
+        self._renew = self._redis.register_script(_RENEW)
+        self._checkin = self._redis.register_script(_CHECKIN)
+        self._active = self._redis.register_script(_ACTIVE)
+        self._drain = self._redis.register_script(_DRAIN)
+
+    @staticmethod
+    def _keys(asset_id):
+        return [f"slm:leases:{asset_id}", f"slm:lease-start:{asset_id}", f"slm:lease-stats:{asset_id}"]
+
+    def checkout(self, asset_id, capacity, lease_id, ttl, now):
+        active = self._checkout(
+            keys=self._keys(asset_id) + [self.ASSETS_KEY], args=[now, now + ttl, lease_id, capacity, asset_id]
+        )
+        return None if active < 0 else active
+
+    def renew(self, asset_id, lease_id, ttl, now):
+        return bool(self._renew(keys=self._keys(asset_id), args=[now, now + ttl, lease_id]))
+
+    def checkin(self, asset_id, lease_id, now):
+        return bool(self._checkin(keys=self._keys(asset_id), args=[now, lease_id]))
+
+    def active(self, asset_id, now):
+        return int(self._active(keys=self._keys(asset_id), args=[now]))
+
+    def drain(self, now):
+        drained = {}
+        for raw in self._redis.smembers(self.ASSETS_KEY):
+            asset_id = int(raw)
+            flat = self._drain(keys=self._keys(asset_id), args=[now])
+            stats = dict.fromkeys(STAT_FIELDS, 0)
+            for field, value in zip(flat[::2], flat[1::2]):
+                stats[field.decode()] = float(value)
+            if any(stats.values()):
+                drained[asset_id] = stats
+        return drained
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_lease_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if getattr(settings, "LEASE_STORE", "memory") == "redis":
+                    _store = RedisLeaseStore(settings.LEASE_REDIS_URL)
+                else:
+                    _store = MemoryLeaseStore()
+    return _store
+
+
+def lease_capacity(asset_id):
+    """Seat capacity of a concurrent asset, cached briefly so checkouts stay off the database."""
+    key = f"slm:lease-capacity:{asset_id}"
+    capacity = cache.get(key)
+    if capacity is None:
+        asset = SoftwareAsset.objects.filter(pk=asset_id, is_deleted=False).values_list(
+            "license_type", "total_licenses"
+        ).first()
+        if asset is None or asset[0] != "concurrent":
+            raise LeaseError("Leases are only available for concurrent-type assets.")
+        capacity = asset[1]
+        cache.set(key, capacity, 60)
+    return capacity
+
+
+def clamp_ttl(ttl):
+    try:
+        ttl = int(ttl) if ttl not in (None, "") else settings.LEASE_DEFAULT_TTL
+    except (TypeError, ValueError):
+        raise LeaseError("ttl must be a number of seconds.")
+    return max(1, min(ttl, settings.LEASE_MAX_TTL))
+
+
+def checkout(asset_id, ttl=None):
+    """Return ``(lease_id, expires_at)`` or ``None`` when every seat is leased."""
+    capacity = lease_capacity(asset_id)
+    ttl = clamp_ttl(ttl)
+    lease_id = make_lease_id(asset_id)
+    now = time.time()
+    if get_lease_store().checkout(asset_id, capacity, lease_id, ttl, now) is None:
+        return None
+    return lease_id, now + ttl
+
+
+def renew(lease_id, ttl=None):
+    """Extend a live lease; returns the new expiry or ``None`` if it already lapsed."""
+    ttl = clamp_ttl(ttl)
+    now = time.time()
+    if not get_lease_store().renew(parse_lease_id(lease_id), lease_id, ttl, now):
+        return None
+    return now + ttl
+
+
+def checkin(lease_id):
+    return get_lease_store().checkin(parse_lease_id(lease_id), lease_id, time.time())
+
+
+def active_leases(asset_id):
+    return get_lease_store().active(asset_id, time.time())
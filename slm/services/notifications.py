@@ -0,0 +1,64 @@
+"""Per-user unread notification counters kept in the cache, and WebSocket pushes."""
+import logging
+
+from django.core.cache import cache
+from django.db import transaction
+
+from slm.models import Notification
+from slm.services.versions import bump_table_version
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY = "slm:unread-notifications:{}"
+GROUP_NAME = "user_{}"
+CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def get_unread_count(user):
+    """Unread notifications for ``user``; one COUNT per user until the next change."""
+    key = CACHE_KEY.format(user.pk)
+    count = cache.get(key)
+    if count is None:
+        count = Notification.objects.filter(user=user, is_read=False).count()
+        cache.set(key, count, CACHE_TIMEOUT)
+    return count
+
+
+def invalidate_unread_count(*user_ids):
+    keys = [CACHE_KEY.format(pk) for pk in set(user_ids)]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def mark_all_read(user):
+    Notification.objects.filter(user=user, is_read=False).update(is_read=True)
+    bump_table_version(Notification)
+    transaction.on_commit(lambda: cache.set(CACHE_KEY.format(user.pk), 0, CACHE_TIMEOUT))
+
+
+def push(user_ids, data):
+    """
+    Send ``data`` to the users' NotificationConsumer groups once the transaction commits.
+
+    Best effort: the Notification row is the record, so a missing or unreachable
+    channel layer only costs the live update.
+    """
+    user_ids = set(user_ids)
+
+    def send():
+        try:
+            from asgiref.sync import async_to_sync
+            from channels.layers import get_channel_layer
+        except ImportError:
+            return
+        layer = get_channel_layer()
+        if layer is None:
+            return
+        for pk in user_ids:
+            try:
+                async_to_sync(layer.group_send)(GROUP_NAME.format(pk), {"type": "notification.message", "data": data})
+            except Exception:
+                logger.warning("Could not push notification to user %s", pk, exc_info=True)
+
+    if user_ids:
+        transaction.on_commit(send)
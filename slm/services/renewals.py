@@ -0,0 +1,194 @@
+"""
+Renewal calendar: ranged, keyset-paginated contract listings and iCalendar feeds.
+
+Listings page on ``(expiry_date, id)`` so deep pages cost the same as the first.
+Feeds are cached per range and audience. The cache key embeds a version for
+every calendar month in the range; contract and renewal-history writes bump
+only the months of the expiry dates they touch, so a feed is rebuilt only
+when something inside its window changed.
+"""
+import hashlib
+from datetime import date, timedelta, timezone as dt_timezone
+
+from django.core import signing
+from django.core.cache import cache
+from django.db.models import F, Q, OuterRef, Subquery
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from slm.models import LicenseContract, Invoice, User
+from slm.services.versions import get_versions, bump_versions
+
+DEFAULT_RANGE_DAYS = 365
+MAX_RANGE_DAYS = 3 * 366
+FEED_STATUSES = ("active", "pending_renewal")
+FEED_TIMEOUT = 60 * 60 * 24 * 7
+FEED_SALT = "slm.renewal-calendar-feed"
+MONTH_KEY = "slm:renewal-calendar:month:{}"
+FEED_KEY = "slm:renewal-calendar:ics:{}"
+ALL_MONTHS = "*"
+
+
+def parse_range(params):
+    """Return ``(start, end)`` from ``start``/``end`` query params; raises ValueError when invalid."""
+    today = timezone.now().date()
+    try:
+        start = parse_date(params["start"]) if params.get("start") else today
+        end = parse_date(params["end"]) if params.get("end") else (start or today) + timedelta(days=DEFAULT_RANGE_DAYS)
+    except ValueError:
+        start = end = None
+    if not start or not end or start > end:
+        raise ValueError("start/end must be YYYY-MM-DD with start <= end.")
+    if (end - start).days > MAX_RANGE_DAYS:
+        raise ValueError(f"The range may span at most {MAX_RANGE_DAYS} days.")
+    return start, end
+
+
+def renewal_window(start, end, statuses=None):
+    contracts = LicenseContract.objects.filter(expiry_date__gte=start, expiry_date__lte=end)
+    if statuses:
+        contracts = contracts.filter(status__in=statuses)
+    return contracts
+
+
+def encode_cursor(expiry_date, pk):
+    return f"{expiry_date.isoformat()}.{pk}"
+
+
+def decode_cursor(cursor):
+    day, _, pk = str(cursor).partition(".")
+    try:
+        return date.fromisoformat(day), int(pk)
+    except ValueError:
+        raise ValueError("Malformed cursor.")
+
+
+def keyset_page(queryset, after=None, limit=50):
+    """
+    Return ``(rows, next_cursor)`` for the page following cursor ``after``.
+
+    ``queryset`` may yield model instances or ``values()`` dicts; either way it
+    must include ``id`` and ``expiry_date``.
+    """
+    if after:
+        day, pk = decode_cursor(after)
+        queryset = queryset.filter(Q(expiry_date__gt=day) | Q(expiry_date=day, pk__gt=pk))
+    rows = list(queryset.order_by("expiry_date", "pk")[:limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+    last = rows[limit - 1]
+    if isinstance(last, dict):
+        return rows[:limit], encode_cursor(last["expiry_date"], last["id"])
+    return rows[:limit], encode_cursor(last.expiry_date, last.pk)
+
+
+def _months(start, end):
+    month = start.replace(day=1)
+    while month <= end:
+        yield month.strftime("%Y-%m")
+        month = (month + timedelta(days=32)).replace(day=1)
+
+
+def invalidate_renewal_calendar(*days):
+    """Mark feeds covering any of ``days`` stale on commit; with no days every feed is invalidated."""
+    if not days:
+        bump_versions([MONTH_KEY.format(ALL_MONTHS)])
+        return
+    bump_versions(MONTH_KEY.format(d.strftime("%Y-%m")) for d in days if d)
+
+
+def feed_audience(user):
+    """Feeds differ only by whether the role may see spend, so roles with equal visibility share a cache entry."""
+    return "finance" if user.can_edit_finance or user.can_view_all else "standard"
+
+
+def feed_token(user):
+    return signing.dumps([user.pk, user.feed_token_version], salt=FEED_SALT)
+
+
+def feed_token_user(token):
+    """The active user a feed token was issued to, or None when it is forged or revoked."""
+    try:
+        pk, version = signing.loads(token, salt=FEED_SALT)
+    except (signing.BadSignature, TypeError, ValueError):
+        return None
+    return User.objects.filter(pk=pk, feed_token_version=version, is_active=True).first()
+
+
+def revoke_feed_tokens(user):
+    """Invalidate every feed URL issued to ``user``; later feed_token() calls issue new ones."""
+    User.objects.filter(pk=user.pk).update(feed_token_version=F("feed_token_version") + 1)
+    user.refresh_from_db(fields=["feed_token_version"])
+
+
+def _escape(text):
+    return (
+        str(text).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\r\n", "\\n").replace("\n", "\\n")
+    )
+
+
+def _fold(line):
+    """Fold a content line at 75 octets as RFC 5545 requires."""
+    raw = line.encode()
+    if len(raw) <= 75:
+        return line + "\r\n"
+    parts, chunk = [], b""
+    for ch in line:
+        encoded = ch.encode()
+        if len(chunk) + len(encoded) > (75 if not parts else 74):
+            parts.append(chunk.decode())
+            chunk = b""
+        chunk += encoded
+    parts.append(chunk.decode())
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def build_ics(start, end, audience):
+    """Render the iCalendar feed: one all-day event on each contract's expiry date."""
+    contracts = renewal_window(start, end, FEED_STATUSES).order_by("expiry_date", "pk")
+    fields = ["id", "expiry_date", "renewal_due_date", "status", "software_asset__name", "vendor__company_name"]
+    if audience == "finance":
+        latest = Invoice.objects.filter(license_contract=OuterRef("pk")).order_by("-invoice_date", "-pk")
+        contracts = contracts.annotate(
+            last_total=Subquery(latest.values("total")[:1]), last_currency=Subquery(latest.values("currency")[:1])
+        )
+        fields += ["last_total", "last_currency"]
+    stamp = timezone.now().astimezone(dt_timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+    lines = [
+        "BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//SLM//Renewal Calendar//EN",
+        "CALSCALE:GREGORIAN", "METHOD:PUBLISH", "X-WR-CALNAME:License Renewals",
+    ]
+    for row in contracts.values(*fields).iterator(chunk_size=2000):
+        vendor = row["vendor__company_name"]
+        summary = f"Renewal: {row['software_asset__name']}" + (f" ({vendor})" if vendor else "")
+        details = [f"Status: {row['status']}"]
+        if row["renewal_due_date"]:
+            details.append(f"Renewal due: {row['renewal_due_date'].isoformat()}")
+        if row.get("last_total") is not None:
+            details.append(f"Last invoice: {row['last_total']} {row['last_currency']}")
+        lines += [
+            "BEGIN:VEVENT",
+            f"UID:contract-{row['id']}-expiry@slm",
+            f"DTSTAMP:{stamp}",
+            f"DTSTART;VALUE=DATE:{row['expiry_date']:%Y%m%d}",
+            f"DTEND;VALUE=DATE:{row['expiry_date'] + timedelta(days=1):%Y%m%d}",
+            f"SUMMARY:{_escape(summary)}",
+            f"DESCRIPTION:{_escape(chr(10).join(details))}",
+            "END:VEVENT",
+        ]
+    lines.append("END:VCALENDAR")
+    return "".join(_fold(line) for line in lines)
+
+
+def get_renewal_ics(start, end, audience):
+    """Cached feed for the range; rebuilt only after a change inside one of its months."""
+    keys = [MONTH_KEY.format(ALL_MONTHS)] + [MONTH_KEY.format(m) for m in _months(start, end)]
+    versions = get_versions(keys)
+    digest = hashlib.md5(f"{start}|{end}|{audience}|{versions}".encode()).hexdigest()
+    key = FEED_KEY.format(digest)
+    feed = cache.get(key)
+    if feed is None:
+        feed = build_ics(start, end, audience)
+        cache.set(key, feed, FEED_TIMEOUT)
+    return feed
@@ -0,0 +1,384 @@
+"""
+Background report jobs.
+
+A request cleans the report parameters and hashes them together with the
+report, file type and the table versions of every model the report reads. A
+live job with the same hash is reused, whether it is still running or already
+has a stored file, so asking again over unchanged data costs nothing. Workers
+stream rows straight into a temporary file, store it with the job, and tell
+every requester through a Notification that is also pushed over the
+NotificationConsumer WebSocket.
+"""
+import hashlib
+import io
+import json
+import logging
+import tempfile
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from slm.models import (
+    SoftwareAsset, Allocation, LicenseContract, Vendor, VendorSpendRollup, ExchangeRate, UtilizationSnapshot,
+    ChargebackLine, Invoice, Department, Branch, AuditLog, AuditArchiveSegment, User, Notification, ReportJob,
+)
+from slm.services import renewals, audit, audit_archive
+from slm.services.chargeback import chargeback_summary, GROUPS
+from slm.services.exports import stream_csv, ROWS_PER_CHUNK
+from slm.services.notifications import invalidate_unread_count, push
+from slm.services.spend import vendor_spend, parse_month
+from slm.services.utilization import utilization_trend
+from slm.services.versions import table_versions, bump_table_version
+
+logger = logging.getLogger(__name__)
+
+FILE_TYPES = ("csv", "json")
+
+
+def _date(params, name, default=None):
+    value = params.get(name)
+    if not value:
+        return default
+    try:
+        day = parse_date(str(value))
+    except ValueError:
+        day = None
+    if day is None:
+        raise ValueError(f"{name} must be YYYY-MM-DD.")
+    return day
+
+
+def _int(params, name):
+    value = params.get(name)
+    if value in (None, ""):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be an id.")
+
+
+def _midnight(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _range(start, end):
+    if start > end:
+        raise ValueError("start must be on or before end.")
+    return {"start": start.isoformat(), "end": end.isoformat()}
+
+
+class Report:
+    """One report kind: how to clean its parameters, which models it reads and its rows."""
+    models = ()
+    fields = ()
+
+    def clean(self, params):
+        """JSON-safe canonical parameters; raises ValueError when invalid."""
+        return {}
+
+    def get_fields(self, params):
+        return self.fields
+
+    def rows(self, params):
+        """Iterable of row dicts keyed by ``get_fields(params)``."""
+        raise NotImplementedError
+
+
+class InventoryReport(Report):
+    models = (SoftwareAsset, Allocation)
+    fields = ("id", "name", "category", "version", "license_type", "total_licenses", "used", "available")
+
+    def rows(self, params):
+        return (
+            SoftwareAsset.objects.filter(is_deleted=False).with_usage(live=True).order_by("name")
+            .values(*self.fields[:6], used=F("used_count"), available=F("available_count"))
+        )
+
+
+class RenewalCalendarReport(Report):
+    models = (LicenseContract, SoftwareAsset, Vendor)
+    fields = ("id", "software_asset__name", "vendor__company_name", "expiry_date", "renewal_due_date")
+
+    def clean(self, params):
+        return _range(*renewals.parse_range(params))
+
+    def rows(self, params):
+        window = renewals.renewal_window(parse_date(params["start"]), parse_date(params["end"]), ["active"])
+        return window.order_by("expiry_date", "pk").values(*self.fields).iterator(chunk_size=2000)
+
+
+class VendorSpendReport(Report):
+    models = (VendorSpendRollup, ExchangeRate, Vendor)
+    fields = ("vendor_id", "vendor_name", "total", "paid", "invoice_count", "unconverted")
+
+    def clean(self, params):
+        from slm.models.invoice import CURRENCY_CHOICES
+
+        currency = str(params.get("currency") or settings.FX_BASE_CURRENCY).upper()
+        if currency not in dict(CURRENCY_CHOICES) or currency == "OTHER":
+            raise ValueError("Unsupported reporting currency.")
+        start, end = parse_month(params.get("start")), parse_month(params.get("end"))
+        return {
+            "currency": currency,
+            "start": start.isoformat() if start else None,
+            "end": end.isoformat() if end else None,
+        }
+
+    def rows(self, params):
+        start = parse_date(params["start"]) if params["start"] else None
+        end = parse_date(params["end"]) if params["end"] else None
+        return vendor_spend(params["currency"], start, end)
+
+
+class UtilizationReport(Report):
+    models = (UtilizationSnapshot, SoftwareAsset)
+
+    def clean(self, params):
+        end = _date(params, "end", timezone.now().date())
+        start = _date(params, "start", end - timedelta(days=89))
+        asset = _int(params, "asset")
+        if asset is not None and not SoftwareAsset.objects.filter(pk=asset).exists():
+            raise ValueError("Unknown asset.")
+        return {**_range(start, end), "asset": asset, "department": _int(params, "department"), "branch": _int(params, "branch")}
+
+    def get_fields(self, params):
+        return ("date", "used", "available") if params["asset"] else ("date", "used")
+
+    def rows(self, params):
+        asset = SoftwareAsset.objects.get(pk=params["asset"]) if params["asset"] else None
+        return utilization_trend(
+            parse_date(params["start"]), parse_date(params["end"]), asset, params["department"], params["branch"]
+        )
+
+
+class ChargebackReport(Report):
+    models = (ChargebackLine, Invoice, Allocation, Department, Branch)
+    fields = ("id", "code", "name", "currency", "seat_days", "amount")
+
+    def clean(self, params):
+        first_of_month = timezone.now().date().replace(day=1)
+        end = _date(params, "end", first_of_month - timedelta(days=1))
+        start = _date(params, "start", end.replace(day=1))
+        group = params.get("group_by") or "department"
+        if group not in GROUPS:
+            raise ValueError("group_by must be department or branch.")
+        return {**_range(start, end), "group_by": group}
+
+    def rows(self, params):
+        return chargeback_summary(parse_date(params["start"]), parse_date(params["end"]), params["group_by"])
+
+
+class AuditTrailReport(Report):
+    models = (AuditLog, AuditArchiveSegment, User)
+    fields = (
+        "id", "timestamp", "entity", "object_id", "change_type", "old_value", "new_value",
+        "user_id", "user__email", "ip_address",
+    )
+
+    def clean(self, params):
+        start, end = _date(params, "start"), _date(params, "end")
+        if start and end and start > end:
+            raise ValueError("start must be on or before end.")
+        return {
+            "entity": params.get("entity") or None,
+            "change_type": params.get("change_type") or None,
+            "user": _int(params, "user"),
+            "start": start.isoformat() if start else None,
+            "end": end.isoformat() if end else None,
+        }
+
+    def rows(self, params):
+        filters = {
+            lookup: params[name]
+            for name, lookup in (("entity", "entity"), ("change_type", "change_type"), ("user", "user_id"))
+            if params[name] is not None
+        }
+        # Whole-day bounds as timestamps so the timestamp index stays usable
+        start = _midnight(parse_date(params["start"])) if params["start"] else None
+        end = _midnight(parse_date(params["end"]) + timedelta(days=1)) if params["end"] else None
+        return map(audit.expand_row, audit_archive.iter_entries(start, end, filters, self.fields + ("changes",)))
+
+
+REPORTS = {
+    "inventory": InventoryReport,
+    "renewal_calendar": RenewalCalendarReport,
+    "vendor_spend": VendorSpendReport,
+    "utilization": UtilizationReport,
+    "chargeback": ChargebackReport,
+    "audit_trail": AuditTrailReport,
+}
+
+
+def params_hash(name, file_type, params):
+    report = REPORTS[name]()
+    payload = {
+        "report": name, "file_type": file_type, "params": params,
+        "versions": table_versions(report.models),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, cls=DjangoJSONEncoder).encode()).hexdigest()
+
+
+def request_report(user, name, file_type="csv", params=None):
+    """
+    Return ``(job, created)`` for a report request; raises ValueError for bad input.
+
+    A live job for the same parameters over unchanged data is reused and
+    ``user`` is added to its requesters; ``created`` tells the caller to queue it.
+    """
+    if name not in REPORTS:
+        raise ValueError(f"report must be one of: {', '.join(REPORTS)}.")
+    if file_type not in FILE_TYPES:
+        raise ValueError("file_type must be csv or json.")
+    params = REPORTS[name]().clean(params or {})
+    digest = params_hash(name, file_type, params)
+    _fail_stale(digest)
+    live = ReportJob.objects.filter(~Q(status="failed"), params_hash=digest)
+    job, created = live.first(), False
+    if job is None:
+        try:
+            with transaction.atomic():
+                job = ReportJob.objects.create(
+                    report=name, file_type=file_type, params=params, params_hash=digest, created_by=user
+                )
+            created = True
+        except IntegrityError:
+            # A concurrent request created it first
+            job = live.get()
+    job.requested_by.add(user)
+    return job, created
+
+
+def _fail_stale(digest):
+    """
+    Mark jobs for ``digest`` that have been pending or running for longer than
+    REPORT_JOB_TIMEOUT_MINUTES as failed (a lost task or a dead worker), so
+    they stop blocking a new job for the same result.
+    """
+    cutoff = timezone.now() - timedelta(minutes=settings.REPORT_JOB_TIMEOUT_MINUTES)
+    stale = ReportJob.objects.filter(
+        Q(status="pending", created_at__lt=cutoff) | Q(status="running", started_at__lt=cutoff),
+        params_hash=digest,
+    )
+    for job in stale:
+        failed = ReportJob.objects.filter(pk=job.pk, status=job.status).update(
+            status="failed", message="Timed out before the report was generated.", finished_at=timezone.now()
+        )
+        if failed:
+            job.refresh_from_db()
+            notify_requesters(job)
+
+
+def _csv_value(value):
+    return json.dumps(value, cls=DjangoJSONEncoder) if isinstance(value, (dict, list)) else value
+
+
+def _stream_json(job, fields, rows):
+    """Yield ``{"report": ..., "params": ..., "fields": [...], "rows": [...]}`` one batch of rows at a time."""
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    yield (
+        f'{{"report":{encoder.encode(job.report)},"params":{encoder.encode(job.params)},'
+        f'"fields":{encoder.encode(list(fields))},"rows":['
+    ).encode()
+    buffer, first = io.StringIO(), True
+    for n, row in enumerate(rows, start=1):
+        buffer.write(("" if first else ",") + encoder.encode({f: row.get(f) for f in fields}))
+        first = False
+        if n % ROWS_PER_CHUNK == 0:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield (buffer.getvalue() + "]}").encode()
+
+
+def _counted(rows, job):
+    for row in rows:
+        job.row_count += 1
+        yield row
+
+
+def run_report(job):
+    """Render ``job`` into its file, then notify everyone who requested it."""
+    report = REPORTS[job.report]()
+    job.status, job.started_at, job.row_count = "running", timezone.now(), 0
+    if not ReportJob.objects.filter(pk=job.pk, status="pending").update(
+        status=job.status, started_at=job.started_at, row_count=0
+    ):
+        # Already picked up, or timed out by request_report before a worker got to it
+        job.refresh_from_db()
+        return job
+    try:
+        fields = report.get_fields(job.params)
+        rows = _counted(report.rows(job.params), job)
+        if job.file_type == "json":
+            chunks = _stream_json(job, fields, rows)
+        else:
+            chunks = stream_csv(fields, (tuple(_csv_value(row.get(f)) for f in fields) for row in rows))
+        with tempfile.TemporaryFile() as fh:
+            for chunk in chunks:
+                fh.write(chunk)
+            fh.seek(0)
+            job.file.save(f"{job.report}_{job.pk}.{job.file_type}", File(fh), save=False)
+    except Exception as exc:
+        logger.exception("Report job %s failed", job.pk)
+        job.status, job.message = "failed", str(exc)
+    else:
+        job.status = "completed"
+    job.finished_at = timezone.now()
+    finished = ReportJob.objects.filter(pk=job.pk, status="running").update(
+        status=job.status, file=job.file.name or "", row_count=job.row_count, message=job.message,
+        finished_at=job.finished_at,
+    )
+    if not finished:
+        # Timed out while running; a newer job may already hold this result
+        if job.file:
+            job.file.delete(save=False)
+        job.refresh_from_db()
+        return job
+    notify_requesters(job)
+    return job
+
+
+def notify_requesters(job):
+    """One Notification per requester, pushed live over the WebSocket."""
+    user_ids = list(job.requested_by.values_list("pk", flat=True))
+    label = job.get_report_display()
+    if job.status == "completed":
+        title = f"Report ready: {label}"
+        message = f"{label} ({job.row_count} rows, {job.file_type.upper()}) is ready to download."
+        link = reverse("report-job-download", args=[job.pk])
+    else:
+        title = f"Report failed: {label}"
+        message = job.message or f"{label} could not be generated."
+        link = reverse("report-job-detail", args=[job.pk])
+    Notification.objects.bulk_create([
+        Notification(user_id=pk, title=title, message=message, link=link, notification_type="report_ready")
+        for pk in user_ids
+    ])
+    # bulk_create skips the signals that normally refresh these
+    invalidate_unread_count(*user_ids)
+    bump_table_version(Notification)
+    push(user_ids, {
+        "title": title, "message": message, "link": link, "notification_type": "report_ready",
+        "report_job": {"id": job.pk, "report": job.report, "status": job.status},
+    })
+
+
+def purge_report_jobs(days=None):
+    """Delete finished jobs and their files older than REPORT_JOB_RETENTION_DAYS; returns the number removed."""
+    days = settings.REPORT_JOB_RETENTION_DAYS if days is None else days
+    stale = ReportJob.objects.filter(finished_at__lt=timezone.now() - timedelta(days=days))
+    removed = 0
+    for job in stale.iterator():
+        if job.file:
+            job.file.delete(save=False)
+        job.delete()
+        removed += 1
+    return removed
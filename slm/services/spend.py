@@ -0,0 +1,254 @@
+"""
+Currency-normalized vendor spend.
+
+Invoice and payment writes adjust VendorSpendRollup rows with SQL increments,
+so the spend report reads a table whose size grows with vendors x months x
+currencies rather than with invoices. Totals are converted to the reporting
+currency per month using the latest ExchangeRate dated on or before the end
+of that month; amounts with no usable rate are reported as unconverted.
+"""
+import csv
+import hashlib
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum, Count
+from django.db.models.functions import TruncMonth
+from django.utils.dateparse import parse_date
+
+from slm.models import Invoice, Payment, Vendor, ExchangeRate, VendorSpendRollup
+from slm.services.versions import table_versions, bump_table_version
+
+CENT = Decimal("0.01")
+CACHE_TIMEOUT = 60 * 60
+
+
+def _month(day):
+    return day.replace(day=1) if day else None
+
+
+def adjust_rollup(vendor_id, month, currency, invoiced=0, invoice_count=0, paid=0, payment_count=0):
+    """Add the given deltas to one rollup row, creating it on first use."""
+    if month is None or not any((invoiced, invoice_count, paid, payment_count)):
+        return
+    deltas = dict(invoiced=invoiced, invoice_count=invoice_count, paid=paid, payment_count=payment_count)
+    rows = VendorSpendRollup.objects.filter(vendor_id=vendor_id, month=month, currency=currency)
+    increments = {k: F(k) + v for k, v in deltas.items() if v}
+    if not rows.update(**increments):
+        try:
+            with transaction.atomic():
+                VendorSpendRollup.objects.create(vendor_id=vendor_id, month=month, currency=currency, **deltas)
+        except IntegrityError:
+            # Another writer created the row first
+            rows.update(**increments)
+    bump_table_version(VendorSpendRollup)
+
+
+def fold_vendor(vendor_id):
+    """Move a vendor's rollup rows into the vendor-less ones before the vendor is deleted."""
+    rows = VendorSpendRollup.objects.filter(vendor_id=vendor_id)
+    for row in rows.values("month", "currency", "invoiced", "invoice_count", "paid", "payment_count"):
+        adjust_rollup(None, **row)
+    rows.delete()
+
+
+def invoice_state(invoice_id):
+    """``(vendor_id, invoice_date, currency, total)`` as stored, or None."""
+    return Invoice.objects.filter(pk=invoice_id).values_list("vendor_id", "invoice_date", "currency", "total").first()
+
+
+def payment_state(payment_id):
+    """``(invoice_id, paid_on, amount)`` as stored, or None."""
+    return Payment.objects.filter(pk=payment_id).values_list("invoice_id", "paid_on", "amount").first()
+
+
+def record_invoice(previous, invoice):
+    """Move an invoice's contribution from its ``previous`` state to its current one (None when deleted)."""
+    if previous:
+        vendor_id, invoice_date, currency, total = previous
+        adjust_rollup(vendor_id, _month(invoice_date), currency, invoiced=-total, invoice_count=-1)
+    if invoice is not None:
+        adjust_rollup(invoice.vendor_id, _month(invoice.invoice_date), invoice.currency, invoiced=invoice.total, invoice_count=1)
+        if previous and (previous[0], previous[2]) != (invoice.vendor_id, invoice.currency):
+            # Payments are keyed by the invoice's vendor and currency too
+            paid = (
+                Payment.objects.filter(invoice=invoice).order_by()
+                .annotate(month=TruncMonth("paid_on")).values("month")
+                .annotate(amount=Sum("amount"), n=Count("id"))
+            )
+            for row in paid:
+                adjust_rollup(previous[0], row["month"], previous[2], paid=-row["amount"], payment_count=-row["n"])
+                adjust_rollup(invoice.vendor_id, row["month"], invoice.currency, paid=row["amount"], payment_count=row["n"])
+
+
+def record_payment(previous, payment):
+    """Move a payment's contribution from its ``previous`` state to its current one (None when deleted)."""
+    for state, sign in ((previous, -1), ((payment.invoice_id, payment.paid_on, payment.amount) if payment else None, 1)):
+        if not state:
+            continue
+        invoice_id, paid_on, amount = state
+        invoice = Invoice.objects.filter(pk=invoice_id).values_list("vendor_id", "currency").first()
+        if invoice:
+            adjust_rollup(invoice[0], _month(paid_on), invoice[1], paid=sign * amount, payment_count=sign)
+
+
+def rebuild_spend_rollup():
+    """Recompute every rollup row from Invoice and Payment; returns the number of rows written."""
+    rows = defaultdict(lambda: dict(invoiced=Decimal("0"), invoice_count=0, paid=Decimal("0"), payment_count=0))
+    invoiced = (
+        Invoice.objects.order_by().annotate(month=TruncMonth("invoice_date"))
+        .values_list("vendor_id", "month", "currency").annotate(total=Sum("total"), n=Count("id"))
+    )
+    for vendor_id, month, currency, total, n in invoiced:
+        rows[vendor_id, month, currency].update(invoiced=total or Decimal("0"), invoice_count=n)
+    paid = (
+        Payment.objects.order_by().annotate(month=TruncMonth("paid_on"))
+        .values_list("invoice__vendor_id", "month", "invoice__currency").annotate(total=Sum("amount"), n=Count("id"))
+    )
+    for vendor_id, month, currency, total, n in paid:
+        rows[vendor_id, month, currency].update(paid=total or Decimal("0"), payment_count=n)
+
+    with transaction.atomic():
+        VendorSpendRollup.objects.all().delete()
+        VendorSpendRollup.objects.bulk_create(
+            [VendorSpendRollup(vendor_id=v, month=m, currency=c, **totals) for (v, m, c), totals in rows.items()],
+            batch_size=5000,
+        )
+        bump_table_version(VendorSpendRollup)
+    return len(rows)
+
+
+def load_rates(path):
+    """
+    Upsert exchange rates from a CSV with ``date,currency,rate`` columns.
+
+    ``rate`` is the value of one unit of ``currency`` in FX_BASE_CURRENCY.
+    Returns ``(loaded, errors)``.
+    """
+    loaded, errors = {}, []
+    with open(path, newline="", encoding="utf-8-sig") as fh:
+        for line, row in enumerate(csv.DictReader(fh), start=2):
+            row = {(k or "").strip().lower(): (v or "").strip() for k, v in row.items()}
+            try:
+                day, currency, rate = parse_date(row["date"]), row["currency"].upper(), Decimal(row["rate"])
+            except (KeyError, ValueError, InvalidOperation):
+                day = None
+            if not day or not currency or not rate > 0:
+                errors.append(f"line {line}: expected date,currency,rate with a positive rate")
+                continue
+            loaded[currency, day] = rate
+    with transaction.atomic():
+        existing = {
+            (r.currency, r.date): r
+            for r in ExchangeRate.objects.filter(currency__in={c for c, _ in loaded}, date__in={d for _, d in loaded})
+        }
+        updated = []
+        for key, rate in loaded.items():
+            if key in existing:
+                existing[key].rate = rate
+                updated.append(existing[key])
+        ExchangeRate.objects.bulk_update(updated, ["rate"], batch_size=1000)
+        ExchangeRate.objects.bulk_create(
+            [ExchangeRate(currency=c, date=d, rate=r) for (c, d), r in loaded.items() if (c, d) not in existing],
+            batch_size=1000,
+        )
+        bump_table_version(ExchangeRate)
+    return len(loaded), errors
+
+
+class RateTable:
+    """Latest rate on or before a day, per currency, from one query."""
+
+    def __init__(self, currencies, until=None):
+        self.base = settings.FX_BASE_CURRENCY
+        self._dates, self._rates = defaultdict(list), defaultdict(list)
+        rates = ExchangeRate.objects.filter(currency__in=set(currencies) - {self.base}).order_by("currency", "date")
+        if until:
+            rates = rates.filter(date__lte=until)
+        for currency, day, rate in rates.values_list("currency", "date", "rate"):
+            self._dates[currency].append(day)
+            self._rates[currency].append(rate)
+
+    def to_base(self, currency, day):
+        if currency == self.base:
+            return Decimal("1")
+        i = bisect_right(self._dates[currency], day)
+        return self._rates[currency][i - 1] if i else None
+
+
+def _month_end(month):
+    return (month + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+
+def vendor_spend(currency, start=None, end=None):
+    """
+    Per-vendor spend between months ``start`` and ``end`` (inclusive) in ``currency``.
+
+    Returns rows sorted by converted total, each with ``vendor_id``,
+    ``vendor_name``, ``total``, ``paid``, ``invoice_count`` and ``unconverted``
+    (``{currency: amount}`` for months without a usable rate).
+    """
+    versions = table_versions([VendorSpendRollup, ExchangeRate, Vendor])
+    key = "slm:vendor-spend:" + hashlib.md5(f"{currency}|{start}|{end}|{versions}".encode()).hexdigest()
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    rollups = VendorSpendRollup.objects.order_by()
+    if start:
+        rollups = rollups.filter(month__gte=_month(start))
+    if end:
+        rollups = rollups.filter(month__lte=_month(end))
+    rows = list(
+        rollups.values_list("vendor_id", "month", "currency")
+        .annotate(invoiced=Sum("invoiced"), paid=Sum("paid"), n=Sum("invoice_count"))
+    )
+    last_month = max((r[1] for r in rows), default=None)
+    rates = RateTable({r[2] for r in rows} | {currency}, until=_month_end(last_month) if last_month else None)
+
+    totals = defaultdict(lambda: {"total": Decimal("0"), "paid": Decimal("0"), "invoice_count": 0, "unconverted": {}})
+    for vendor_id, month, row_currency, invoiced, paid, n in rows:
+        if not (invoiced or paid or n):
+            continue  # emptied by later edits/deletes
+        out = totals[vendor_id]
+        out["invoice_count"] += n
+        day = _month_end(month)
+        source, target = rates.to_base(row_currency, day), rates.to_base(currency, day)
+        if source is None or target is None:
+            out["unconverted"][row_currency] = out["unconverted"].get(row_currency, Decimal("0")) + invoiced
+            continue
+        out["total"] += invoiced * source / target
+        out["paid"] += paid * source / target
+
+    names = dict(Vendor.objects.filter(pk__in=[v for v in totals if v]).values_list("pk", "company_name"))
+    result = sorted(
+        (
+            {
+                "vendor_id": vendor_id,
+                "vendor_name": names.get(vendor_id, "N/A"),
+                "total": out["total"].quantize(CENT),
+                "paid": out["paid"].quantize(CENT),
+                "invoice_count": out["invoice_count"],
+                "unconverted": {c: a.quantize(CENT) for c, a in out["unconverted"].items()},
+            }
+            for vendor_id, out in totals.items()
+        ),
+        key=lambda r: (-r["total"], r["vendor_name"]),
+    )
+    cache.set(key, result, CACHE_TIMEOUT)
+    return result
+
+
+def parse_month(value):
+    """``YYYY-MM`` or ``YYYY-MM-DD`` to the first of that month; None for empty, ValueError when invalid."""
+    if not value:
+        return None
+    day = parse_date(value if len(value) > 7 else f"{value}-01")
+    if day is None:
+        raise ValueError("Months must be given as YYYY-MM.")
+    return date(day.year, day.month, 1)
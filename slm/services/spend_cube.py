@@ -0,0 +1,272 @@
+"""
+Spend cube: invoiced and paid spend by vendor, department, branch, asset,
+month and currency.
+
+SpendFact holds each invoice split across the departments holding seats of
+its contract's asset on the invoice date (see the model). Invoice, payment,
+allocation and contract writes re-derive the facts of just the invoices they
+affect once the transaction commits, so slices never re-aggregate raw
+invoices: a query is one GROUP BY over the fact table, cached until the cube
+or the names it joins change.
+"""
+import hashlib
+from collections import defaultdict
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum, Count
+
+from slm.models import (
+    Invoice, Payment, Allocation, SpendFact, Vendor, Department, Branch, SoftwareAsset, ExchangeRate,
+)
+from slm.services.spend import RateTable, CENT, _month, _month_end
+from slm.services.utilization import allocation_intervals
+from slm.services.versions import table_versions, bump_table_version
+
+CACHE_TIMEOUT = 60 * 60
+REBUILD_BATCH = 5000
+
+# Dimension -> (output key, lookup) pairs; the first pair is the grouping key
+DIMENSIONS = {
+    "vendor": (("vendor", "vendor_id"), ("vendor_name", "vendor__company_name")),
+    "department": (("department", "department_id"), ("department_name", "department__name")),
+    "branch": (("branch", "department__branch_id"), ("branch_name", "department__branch__name")),
+    "asset": (("asset", "software_asset_id"), ("asset_name", "software_asset__name")),
+    "month": (("month", "month"),),
+    "currency": (("currency", "currency"),),
+}
+FILTERS = {
+    "vendor": "vendor_id__in",
+    "department": "department_id__in",
+    "branch": "department__branch_id__in",
+    "asset": "software_asset_id__in",
+    "currency": "currency__in",
+}
+
+
+def _split(cents, weights):
+    """Integer shares of ``cents`` in proportion to ``weights``; the largest weight absorbs the remainder."""
+    shares = cents * weights // int(weights.sum())
+    shares[int(np.argmax(weights))] += cents - int(shares.sum())
+    return shares
+
+
+def _seat_holders(asset_ids, start, end):
+    """``{asset_id: (department_ids, start_days, end_days)}`` for allocations overlapping ``[start, end]``."""
+    if not asset_ids:
+        return {}
+    assets, depts, starts, ends = allocation_intervals(
+        start, end, queryset=Allocation.objects.filter(software_asset_id__in=asset_ids)
+    )
+    order = np.argsort(assets, kind="stable")
+    assets, depts, starts, ends = assets[order], depts[order], starts[order], ends[order]
+    keys, first = np.unique(assets, return_index=True)
+    bounds = np.r_[first, len(assets)]
+    return {int(a): (depts[b0:b1], starts[b0:b1], ends[b0:b1]) for a, b0, b1 in zip(keys, bounds[:-1], bounds[1:])}
+
+
+def build_facts(invoices):
+    """Unsaved SpendFact rows for ``invoices``, using one query each for invoices, payments and allocations."""
+    rows = list(
+        invoices.order_by().values_list(
+            "pk", "vendor_id", "license_contract__software_asset_id", "invoice_date", "currency", "total"
+        )
+    )
+    if not rows:
+        return []
+    paid = dict(
+        Payment.objects.filter(invoice_id__in=[r[0] for r in rows]).order_by()
+        .values("invoice_id").annotate(total=Sum("amount")).values_list("invoice_id", "total")
+    )
+    days = [r[3] for r in rows]
+    holders = _seat_holders({r[2] for r in rows if r[2] is not None}, min(days), max(days))
+
+    facts = []
+    for pk, vendor_id, asset_id, day, currency, total in rows:
+        common = dict(invoice_id=pk, vendor_id=vendor_id, software_asset_id=asset_id, month=_month(day), currency=currency)
+        cents, paid_cents = int((total or 0) * 100), int((paid.get(pk) or 0) * 100)
+        depts = counts = ()
+        if asset_id in holders:
+            h_depts, h_starts, h_ends = holders[asset_id]
+            d = np.datetime64(day, "D")
+            depts, counts = np.unique(h_depts[(h_starts <= d) & (np.isnat(h_ends) | (h_ends > d))], return_counts=True)
+        if not len(depts):
+            facts.append(SpendFact(**common, amount=Decimal(cents) / 100, paid=Decimal(paid_cents) / 100))
+            continue
+        for dept, seats, amount, paid_share in zip(depts, counts, _split(cents, counts), _split(paid_cents, counts)):
+            facts.append(SpendFact(
+                **common, department_id=int(dept), seats=int(seats),
+                amount=Decimal(int(amount)) / 100, paid=Decimal(int(paid_share)) / 100,
+            ))
+    return facts
+
+
+def refresh_invoices(*invoice_ids):
+    """Re-derive the facts of ``invoice_ids`` once the current transaction commits."""
+    ids = {pk for pk in invoice_ids if pk}
+    if not ids:
+        return
+
+    def refresh():
+        with transaction.atomic():
+            SpendFact.objects.filter(invoice_id__in=ids).delete()
+            SpendFact.objects.bulk_create(build_facts(Invoice.objects.filter(pk__in=ids)))
+            bump_table_version(SpendFact)
+
+    transaction.on_commit(refresh)
+
+
+def refresh_assets(asset_ids, since=None):
+    """
+    Re-derive facts for the assets' contract invoices dated on or after ``since`` (all when None).
+
+    A datetime ``since`` (an allocation time) is widened by a day because
+    seat intervals are bucketed by local date.
+    """
+    asset_ids = {pk for pk in asset_ids if pk}
+    if not asset_ids:
+        return
+    if isinstance(since, datetime):
+        since = since.date() - timedelta(days=1)
+    invoices = Invoice.objects.filter(license_contract__software_asset_id__in=asset_ids)
+    if since:
+        invoices = invoices.filter(invoice_date__gte=since)
+    refresh_invoices(*invoices.values_list("pk", flat=True))
+
+
+def _released(state):
+    """When an allocation stopped holding its seat, as utilization.released_at() derives it; None while held."""
+    if state["returned_on"]:
+        return state["returned_on"]
+    return None if state["active_flag"] else state["updated_at"]
+
+
+def refresh_for_allocation(allocation, previous=None):
+    """
+    Seat changes move spend between departments for invoices dated from the
+    earliest day the seat interval changed.
+
+    ``previous`` is the stored state before a save (see Allocation.save); a
+    new or deleted allocation (None) affects its whole interval. Saves that
+    leave the asset, department and interval alone refresh nothing.
+    """
+    asset_ids = {allocation.software_asset_id}
+    if previous is None:
+        since = allocation.allocated_on
+    elif (previous["software_asset_id"], previous["department_id"]) != (
+        allocation.software_asset_id, allocation.department_id
+    ):
+        asset_ids.add(previous["software_asset_id"])
+        since = min(previous["allocated_on"], allocation.allocated_on)
+    else:
+        changed = []
+        if previous["allocated_on"] != allocation.allocated_on:
+            changed += [previous["allocated_on"], allocation.allocated_on]
+        ends = _released(previous), _released({field: getattr(allocation, field) for field in previous})
+        if ends[0] != ends[1]:
+            changed += [end for end in ends if end]
+        if not changed:
+            return
+        since = min(changed)
+    refresh_assets(asset_ids, since)
+
+
+def rebuild_spend_cube(batch_size=REBUILD_BATCH):
+    """Recompute every fact from invoices, payments and allocations; returns the number of rows written."""
+    written, after = 0, 0
+    with transaction.atomic():
+        SpendFact.objects.all().delete()
+        while True:
+            ids = list(Invoice.objects.filter(pk__gt=after).order_by("pk").values_list("pk", flat=True)[:batch_size])
+            if not ids:
+                break
+            facts = build_facts(Invoice.objects.filter(pk__in=ids))
+            SpendFact.objects.bulk_create(facts, batch_size=batch_size)
+            written += len(facts)
+            after = ids[-1]
+        bump_table_version(SpendFact)
+    return written
+
+
+def _sort_key(row, dims):
+    return tuple((row[d] is None, row[d] or 0) if d != "currency" else (False, row[d]) for d in dims)
+
+
+def spend_cube(group_by, filters=None, start=None, end=None, convert_to=None):
+    """
+    Spend summed over the ``group_by`` dimensions (keys of DIMENSIONS).
+
+    ``filters`` maps dimensions to lists of ids (currency codes for
+    ``currency``); ``start``/``end`` bound invoice months. Without
+    ``convert_to`` amounts stay in invoice currency and rows are always split
+    by currency. With it, each month is converted at that month's closing rate
+    (as in slm.services.spend) and amounts without a rate are listed under
+    ``unconverted``. Each row has its dimension keys (plus names), ``amount``,
+    ``paid`` and ``invoice_count``.
+    """
+    dims = list(dict.fromkeys(group_by))
+    filters = {k: sorted(v) for k, v in (filters or {}).items() if v}
+    versions = table_versions([SpendFact, ExchangeRate, Vendor, Department, Branch, SoftwareAsset])
+    key = "slm:spend-cube:" + hashlib.md5(
+        f"{dims}|{sorted(filters.items())}|{start}|{end}|{convert_to}|{versions}".encode()
+    ).hexdigest()
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    facts = SpendFact.objects.order_by()
+    for name, values in filters.items():
+        facts = facts.filter(**{FILTERS[name]: values})
+    if start:
+        facts = facts.filter(month__gte=_month(start))
+    if end:
+        facts = facts.filter(month__lte=_month(end))
+
+    shown = dims if convert_to else dims + [d for d in ("currency",) if d not in dims]
+    # Conversion needs month and currency; they are folded away afterwards unless asked for
+    grouping = shown + [d for d in ("month", "currency") if convert_to and d not in shown]
+    pairs = [pair for d in grouping for pair in DIMENSIONS[d]]
+    shown_pairs = [pair for d in shown for pair in DIMENSIONS[d]]
+    aggregated = facts.values(*[lookup for _, lookup in pairs]).annotate(
+        total_amount=Sum("amount"), total_paid=Sum("paid"), invoice_count=Count("invoice", distinct=True)
+    )
+
+    def out(row):
+        return {name: row[lookup] for name, lookup in shown_pairs}
+
+    if not convert_to:
+        result = [
+            {**out(r), "amount": r["total_amount"], "paid": r["total_paid"], "invoice_count": r["invoice_count"]}
+            for r in aggregated
+        ]
+    else:
+        aggregated = list(aggregated)
+        last = max((r["month"] for r in aggregated), default=None)
+        rates = RateTable({r["currency"] for r in aggregated} | {convert_to}, until=_month_end(last) if last else None)
+        folded = {}
+        for r in aggregated:
+            row = out(r)
+            group = folded.setdefault(
+                tuple(row.items()),
+                {**row, "amount": Decimal("0"), "paid": Decimal("0"), "invoice_count": 0, "unconverted": defaultdict(Decimal)},
+            )
+            group["invoice_count"] += r["invoice_count"]
+            day = _month_end(r["month"])
+            source, target = rates.to_base(r["currency"], day), rates.to_base(convert_to, day)
+            if source is None or target is None:
+                group["unconverted"][r["currency"]] += r["total_amount"]
+                continue
+            group["amount"] += r["total_amount"] * source / target
+            group["paid"] += r["total_paid"] * source / target
+        result = [{**g, "unconverted": dict(g["unconverted"])} for g in folded.values()]
+
+    for row in result:
+        row["amount"], row["paid"] = row["amount"].quantize(CENT), row["paid"].quantize(CENT)
+        if "unconverted" in row:
+            row["unconverted"] = {c: a.quantize(CENT) for c, a in row["unconverted"].items()}
+    result.sort(key=lambda r: _sort_key(r, shown))
+    cache.set(key, result, CACHE_TIMEOUT)
+    return result
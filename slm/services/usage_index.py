@@ -0,0 +1,134 @@
+"""
+Point-in-time and peak seat usage over allocation history.
+
+Each asset's allocations are turned into a time-sorted event array (+1 when a
+seat is taken, -1 when it is released) whose prefix sum is the number of seats
+in use after every event. Point lookups are a binary search; peak-over-range
+uses a max segment tree over the prefix sums, so both are O(log n) in the
+number of historical allocations. Indexes are kept in each process and
+validated per query against a small per-asset version in the shared cache,
+which allocation changes bump; only the version crosses the network, and an
+index is rebuilt only after one of its asset's allocations changed.
+"""
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone as dt_timezone
+
+import numpy as np
+
+from slm.models import Allocation
+from slm.services.utilization import released_at
+from slm.services.versions import get_versions, bump_versions
+
+VERSION_KEY = "slm:usage-index:{}"
+# Indexes kept per process, least recently used dropped first
+MAX_INDEXES = 256
+
+_indexes = OrderedDict()
+_lock = threading.Lock()
+
+
+def _to_micros(value):
+    return int(value.timestamp() * 1_000_000)
+
+
+def _from_micros(value):
+    return datetime.fromtimestamp(value / 1_000_000, tz=dt_timezone.utc)
+
+
+class UsageIndex:
+    """Sorted event times with running seat counts for one asset."""
+
+    def __init__(self, times, levels):
+        self.times = times
+        self.levels = levels
+        n = len(levels)
+        size = 1 << max(0, (n - 1).bit_length())
+        # Index n is a sentinel leaf that loses every comparison
+        self._values = np.append(levels, -1)
+        tree = np.full(2 * size, n, dtype=np.int64)
+        tree[size:size + n] = np.arange(n)
+        k = size
+        while k > 1:
+            k //= 2
+            left, right = tree[2 * k:4 * k:2], tree[2 * k + 1:4 * k:2]
+            tree[k:2 * k] = np.where(self._values[right] > self._values[left], right, left)
+        self._tree, self._size = tree, size
+
+    @classmethod
+    def build(cls, asset_id):
+        rows = (
+            Allocation.objects.filter(software_asset_id=asset_id)
+            .order_by()
+            .annotate(released=released_at())
+            .values_list("allocated_on", "released")
+            .iterator(chunk_size=10000)
+        )
+        times, deltas = [], []
+        for start, end in rows:
+            times.append(_to_micros(start))
+            deltas.append(1)
+            if end is not None:
+                times.append(_to_micros(end))
+                deltas.append(-1)
+        times = np.array(times, dtype=np.int64)
+        deltas = np.array(deltas, dtype=np.int64)
+        # Releases sort before grants at the same instant so hand-overs do not show a false peak
+        order = np.lexsort((deltas, times))
+        return cls(times[order], np.cumsum(deltas[order]))
+
+    def at(self, when):
+        """Seats in use at ``when`` (aware datetime)."""
+        i = int(np.searchsorted(self.times, _to_micros(when), side="right"))
+        return int(self.levels[i - 1]) if i else 0
+
+    def peak(self, start, end):
+        """Return ``(seats, when)`` for the highest usage in ``[start, end]``."""
+        peak, peak_at = self.at(start), start
+        lo = int(np.searchsorted(self.times, _to_micros(start), side="right"))
+        hi = int(np.searchsorted(self.times, _to_micros(end), side="right"))
+        best = self._argmax(lo, hi)
+        if best < len(self.levels) and self.levels[best] > peak:
+            peak, peak_at = int(self.levels[best]), _from_micros(int(self.times[best]))
+        return peak, peak_at
+
+    def _argmax(self, lo, hi):
+        tree = self._tree
+        best = len(self.levels)
+        lo, hi = lo + self._size, hi + self._size
+        while lo < hi:
+            if lo & 1:
+                best = self._better(best, tree[lo])
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                best = self._better(best, tree[hi])
+            lo >>= 1
+            hi >>= 1
+        return best
+
+    def _better(self, a, b):
+        va, vb = self._values[a], self._values[b]
+        return b if vb > va or (vb == va and b < a) else a
+
+
+def get_usage_index(asset_id):
+    """The asset's index, rebuilt only when its allocations changed since this process built it."""
+    version = get_versions([VERSION_KEY.format(asset_id)])[0]
+    with _lock:
+        held = _indexes.get(asset_id)
+        if held and held[0] == version:
+            _indexes.move_to_end(asset_id)
+            return held[1]
+    index = UsageIndex.build(asset_id)
+    with _lock:
+        _indexes[asset_id] = (version, index)
+        _indexes.move_to_end(asset_id)
+        while len(_indexes) > MAX_INDEXES:
+            _indexes.popitem(last=False)
+    return index
+
+
+def invalidate_usage_index(*asset_ids):
+    """Mark the assets' indexes stale in every process once the current transaction commits."""
+    bump_versions(VERSION_KEY.format(a) for a in set(asset_ids) if a)
@@ -0,0 +1,156 @@
+"""Daily utilization snapshots computed from allocation intervals."""
+from datetime import timedelta
+from itertools import islice
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Case, When, F, Q, Max, Sum, DateTimeField
+from django.db.models.functions import TruncDate
+
+from slm.models import Allocation, SoftwareAsset, UtilizationSnapshot
+
+
+def released_at():
+    """When an allocation stopped holding its seat: returned_on, else updated_at for deactivated rows."""
+    return Case(
+        When(returned_on__isnull=False, then=F("returned_on")),
+        When(active_flag=False, then=F("updated_at")),
+        default=None,
+        output_field=DateTimeField(),
+    )
+
+
+def allocation_intervals(start=None, end=None, queryset=None):
+    """
+    Bulk-fetch allocation intervals as NumPy columns.
+
+    Returns ``(asset_ids, department_ids, start_days, end_days)`` where the day
+    arrays are ``datetime64[D]``; ``end_days`` is the first day the seat was no
+    longer held (NaT while still allocated). Only intervals overlapping
+    ``[start, end]`` are fetched when bounds are given.
+    """
+    qs = (queryset if queryset is not None else Allocation.objects.all()).order_by().annotate(
+        start_day=TruncDate("allocated_on"), end_day=TruncDate(released_at())
+    )
+    if end is not None:
+        qs = qs.filter(start_day__lte=end)
+    if start is not None:
+        qs = qs.filter(Q(end_day__isnull=True) | Q(end_day__gt=start))
+    rows = list(qs.values_list("software_asset_id", "department_id", "start_day", "end_day").iterator(chunk_size=10000))
+    if not rows:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, np.array([], dtype="datetime64[D]"), np.array([], dtype="datetime64[D]")
+    assets, depts, starts, ends = zip(*rows)
+    return (
+        np.array(assets, dtype=np.int64),
+        np.array(depts, dtype=np.int64),
+        np.array(starts, dtype="datetime64[D]"),
+        np.array(ends, dtype="datetime64[D]"),
+    )
+
+
+def _day_index(days, origin, n_days):
+    idx = np.where(np.isnat(days), n_days, (days - origin).astype(np.int64))
+    return np.clip(idx, 0, n_days)
+
+
+def iter_snapshots(start, end, block_keys=512):
+    """
+    Yield unsaved UtilizationSnapshot rows for every day in ``[start, end]``.
+
+    One sweep over the allocation intervals: each (asset, department) pair gets
+    +1 on the day a seat was taken and -1 on the day it was released, and a
+    cumulative sum along the day axis gives seats in use per day. Pairs are
+    processed in blocks of whole assets to bound memory.
+    """
+    n_days = (end - start).days + 1
+    if n_days <= 0:
+        return
+    assets, depts, starts, ends = allocation_intervals(start, end)
+    if not len(assets):
+        return
+    origin = np.datetime64(start, "D")
+    s_idx = _day_index(starts, origin, n_days)
+    e_idx = _day_index(ends, origin, n_days)
+
+    keys, inverse = np.unique((assets << 32) | depts, return_inverse=True)
+    order = np.argsort(inverse, kind="stable")
+    inverse, s_idx, e_idx = inverse[order], s_idx[order], e_idx[order]
+    key_assets, key_depts = keys >> 32, keys & 0xFFFFFFFF
+    totals = dict(SoftwareAsset.objects.filter(pk__in=np.unique(key_assets).tolist()).values_list("pk", "total_licenses"))
+
+    # Key offsets where a new asset starts; blocks always end on one of them
+    asset_starts = np.flatnonzero(np.r_[True, key_assets[1:] != key_assets[:-1]])
+    bounds = np.r_[asset_starts, len(keys)]
+    g = 0
+    while g < len(asset_starts):
+        g_end = g + 1
+        while g_end < len(asset_starts) and bounds[g_end + 1] - bounds[g] <= block_keys:
+            g_end += 1
+        k0, k1 = bounds[g], bounds[g_end]
+        r0, r1 = np.searchsorted(inverse, [k0, k1])
+        rows = inverse[r0:r1] - k0
+
+        diff = np.zeros((k1 - k0, n_days + 1), dtype=np.int32)
+        np.add.at(diff, (rows, s_idx[r0:r1]), 1)
+        np.add.at(diff, (rows, e_idx[r0:r1]), -1)
+        used = np.maximum(np.cumsum(diff[:, :n_days], axis=1), 0)
+
+        group_offsets = bounds[g:g_end] - k0
+        asset_used = np.add.reduceat(used, group_offsets, axis=0)
+        capacity = np.array([totals.get(int(a), 0) for a in key_assets[bounds[g:g_end]]], dtype=np.int64)
+        available = np.maximum(capacity[:, None] - asset_used, 0)
+        key_group = np.repeat(np.arange(g_end - g), np.diff(bounds[g:g_end + 1]))
+
+        for ki, di in zip(*np.nonzero(used)):
+            yield UtilizationSnapshot(
+                date=start + timedelta(days=int(di)),
+                software_asset_id=int(key_assets[k0 + ki]),
+                department_id=int(key_depts[k0 + ki]),
+                used_seats=int(used[ki, di]),
+                available_seats=int(available[key_group[ki], di]),
+            )
+        g = g_end
+
+
+def rebuild_snapshots(start, end, batch_size=5000):
+    """Replace all snapshot rows in ``[start, end]``; returns the number of rows written."""
+    written = 0
+    with transaction.atomic():
+        UtilizationSnapshot.objects.filter(date__gte=start, date__lte=end).delete()
+        rows = iter_snapshots(start, end)
+        while batch := list(islice(rows, batch_size)):
+            UtilizationSnapshot.objects.bulk_create(batch)
+            written += len(batch)
+    return written
+
+
+def utilization_trend(start, end, asset=None, department=None, branch=None):
+    """
+    Daily seats in use over ``[start, end]`` from UtilizationSnapshot.
+
+    Each point has ``date`` and ``used``; ``available`` is included only when
+    ``asset`` is given, because it is an asset-wide figure.
+    """
+    rows = UtilizationSnapshot.objects.filter(date__gte=start, date__lte=end)
+    if asset is not None:
+        rows = rows.filter(software_asset=asset)
+    if department:
+        rows = rows.filter(department_id=department)
+    if branch:
+        rows = rows.filter(department__branch_id=branch)
+
+    by_day = {
+        r["date"]: r
+        for r in rows.order_by().values("date").annotate(used=Sum("used_seats"), available=Max("available_seats"))
+    }
+    series = []
+    day = start
+    while day <= end:
+        r = by_day.get(day)
+        point = {"date": day, "used": r["used"] if r else 0}
+        if asset is not None:
+            point["available"] = r["available"] if r else asset.total_licenses
+        series.append(point)
+        day += timedelta(days=1)
+    return series
@@ -0,0 +1,39 @@
+"""Change versions kept in the cache, used to validate HTTP and derived-data caches cheaply."""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+CACHE_KEY = "slm:table-version:{}"
+
+
+def _key(model):
+    return CACHE_KEY.format(model._meta.label_lower)
+
+
+def get_versions(keys):
+    """Return the current version (ns timestamp of the last change) stored under each key."""
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            # Unknown (evicted or first use): start a fresh version so old validators stop matching
+            cache.add(key, time.time_ns(), None)
+            found[key] = cache.get(key) or time.time_ns()
+    return [found[k] for k in keys]
+
+
+def bump_versions(keys):
+    """Advance the given version keys once the current transaction commits."""
+    keys = set(keys)
+    if keys:
+        transaction.on_commit(lambda: cache.set_many(dict.fromkeys(keys, time.time_ns()), None))
+
+
+def table_versions(models):
+    """Return the current version of each model's table."""
+    return get_versions([_key(m) for m in models])
+
+
+def bump_table_version(*models):
+    """Record a change to the given models' tables once the current transaction commits."""
+    bump_versions(_key(m) for m in models)
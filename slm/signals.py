@@ -0,0 +1,170 @@
+"""Model signal receivers for SLM."""
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, post_init, post_migrate
+from django.dispatch import receiver
+
+from slm.models import (
+    Allocation, SoftwareAsset, LicenseContract, RenewalHistory, Invoice, Payment, Vendor, Notification,
+)
+from slm.services.usage_index import invalidate_usage_index
+from slm.services.dashboard import invalidate_dashboard_stats
+from slm.services.notifications import invalidate_unread_count
+from slm.services.versions import bump_table_version
+from slm.services.renewals import invalidate_renewal_calendar
+from slm.services import audit, spend, spend_cube
+
+
+@receiver(post_delete, sender=Allocation)
+def release_seat_on_delete(sender, instance, **kwargs):
+    """Keep SoftwareAsset.used_seats in step when an active allocation row is removed (incl. cascades)."""
+    if instance.active_flag:
+        SoftwareAsset.adjust_used_seats(instance.software_asset_id, -1)
+    invalidate_usage_index(instance.software_asset_id)
+
+
+@receiver(post_save, sender=Allocation)
+def refresh_usage_index(sender, instance, **kwargs):
+    invalidate_usage_index(instance.software_asset_id, getattr(instance, "_previous_asset_id", None))
+
+
+@receiver(post_save, sender=Allocation)
+def refresh_spend_cube_seats(sender, instance, **kwargs):
+    spend_cube.refresh_for_allocation(instance, getattr(instance, "_previous_state", None))
+
+
+@receiver(post_delete, sender=Allocation)
+def refresh_spend_cube_seats_on_delete(sender, instance, **kwargs):
+    spend_cube.refresh_for_allocation(instance)
+
+
+@receiver([post_save, post_delete], sender=SoftwareAsset)
+@receiver([post_save, post_delete], sender=LicenseContract)
+@receiver([post_save, post_delete], sender=Invoice)
+@receiver([post_save, post_delete], sender=Vendor)
+def refresh_dashboard_stats(sender, **kwargs):
+    invalidate_dashboard_stats()
+
+
+@receiver(pre_save, sender=LicenseContract)
+def remember_previous_expiry(sender, instance, **kwargs):
+    previous = (
+        LicenseContract.objects.filter(pk=instance.pk).values_list("expiry_date", "software_asset_id").first()
+        if instance.pk else None
+    )
+    instance._previous_expiry, instance._previous_asset_id = previous or (None, None)
+
+
+@receiver(post_save, sender=LicenseContract)
+def refresh_spend_cube_contract(sender, instance, created, **kwargs):
+    previous_asset_id = getattr(instance, "_previous_asset_id", None)
+    if not created and previous_asset_id != instance.software_asset_id:
+        spend_cube.refresh_invoices(*instance.invoices.values_list("pk", flat=True))
+
+
+@receiver([post_save, post_delete], sender=LicenseContract)
+def refresh_renewal_calendar(sender, instance, **kwargs):
+    invalidate_renewal_calendar(instance.expiry_date, getattr(instance, "_previous_expiry", None))
+
+
+@receiver([post_save, post_delete], sender=RenewalHistory)
+def refresh_renewal_calendar_history(sender, instance, **kwargs):
+    invalidate_renewal_calendar(instance.previous_expiry, instance.new_expiry)
+
+
+@receiver(pre_save, sender=Invoice)
+def remember_invoice_state(sender, instance, **kwargs):
+    instance._previous_spend = spend.invoice_state(instance.pk) if instance.pk else None
+    instance._previous_contract_id = (
+        Invoice.objects.filter(pk=instance.pk).values_list("license_contract_id", flat=True).first()
+        if instance.pk else None
+    )
+
+
+@receiver([post_save, post_delete], sender=Invoice)
+def refresh_renewal_calendar_invoice(sender, instance, **kwargs):
+    """The finance feed shows each contract's last invoice total."""
+    contract_ids = {instance.license_contract_id, getattr(instance, "_previous_contract_id", None)} - {None}
+    if contract_ids:
+        invalidate_renewal_calendar(
+            *LicenseContract.objects.filter(pk__in=contract_ids).values_list("expiry_date", flat=True)
+        )
+
+
+@receiver(post_save, sender=Invoice)
+def update_spend_on_invoice_save(sender, instance, **kwargs):
+    spend.record_invoice(getattr(instance, "_previous_spend", None), instance)
+    spend_cube.refresh_invoices(instance.pk)
+
+
+@receiver(post_delete, sender=Invoice)
+def update_spend_on_invoice_delete(sender, instance, **kwargs):
+    spend.record_invoice((instance.vendor_id, instance.invoice_date, instance.currency, instance.total), None)
+
+
+@receiver(pre_delete, sender=Vendor)
+def fold_spend_on_vendor_delete(sender, instance, **kwargs):
+    spend.fold_vendor(instance.pk)
+
+
+@receiver(pre_save, sender=Payment)
+def remember_payment_state(sender, instance, **kwargs):
+    instance._previous_spend = spend.payment_state(instance.pk) if instance.pk else None
+
+
+@receiver(post_save, sender=Payment)
+def update_spend_on_payment_save(sender, instance, **kwargs):
+    previous = getattr(instance, "_previous_spend", None)
+    spend.record_payment(previous, instance)
+    spend_cube.refresh_invoices(instance.invoice_id, previous[0] if previous else None)
+
+
+@receiver(post_delete, sender=Payment)
+def update_spend_on_payment_delete(sender, instance, **kwargs):
+    spend.record_payment((instance.invoice_id, instance.paid_on, instance.amount), None)
+    spend_cube.refresh_invoices(instance.invoice_id)
+
+
+@receiver([post_save, post_delete], sender=Notification)
+def refresh_unread_count(sender, instance, **kwargs):
+    invalidate_unread_count(instance.user_id)
+
+
+@receiver(post_init, sender=SoftwareAsset)
+@receiver(post_init, sender=LicenseContract)
+@receiver(post_init, sender=Invoice)
+@receiver(post_init, sender=Allocation)
+@receiver(post_init, sender=Vendor)
+def remember_audit_state(sender, instance, **kwargs):
+    audit.remember(instance)
+
+
+@receiver(post_save, sender=SoftwareAsset)
+@receiver(post_save, sender=LicenseContract)
+@receiver(post_save, sender=Invoice)
+@receiver(post_save, sender=Allocation)
+@receiver(post_save, sender=Vendor)
+def audit_save(sender, instance, created, update_fields=None, **kwargs):
+    audit.capture_save(instance, created, update_fields)
+
+
+@receiver(post_delete, sender=SoftwareAsset)
+@receiver(post_delete, sender=LicenseContract)
+@receiver(post_delete, sender=Invoice)
+@receiver(post_delete, sender=Allocation)
+@receiver(post_delete, sender=Vendor)
+def audit_delete(sender, instance, **kwargs):
+    audit.capture_delete(instance)
+
+
+@receiver(post_migrate)
+def register_audit_fields(sender, **kwargs):
+    if sender.label == "slm":
+        audit.ensure_fields()
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def bump_version_on_write(sender, update_fields=None, **kwargs):
+    """Invalidate conditional-GET validators for any SLM table that was written."""
+    if sender._meta.app_label != "slm" or (update_fields and set(update_fields) <= {"last_login"}):
+        return
+    bump_table_version(sender)
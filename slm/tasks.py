@@ -1,12 +1,33 @@
 """Celery tasks for renewal automation and notifications."""
+import logging
+import time
+
 from celery import shared_task
 from django.utils import timezone
 from datetime import timedelta
-from django.core.mail import send_mail
+from django.core.mail import send_mass_mail
 from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Max
+from django.db.models.functions import Greatest
 
 from slm.models import LicenseContract, RenewalHistory, Notification, ReminderSchedule
-from slm.models import User
+from slm.models import User, UtilizationSnapshot, LeaseUsage, ImportJob, ReportJob
+from slm.services.utilization import rebuild_snapshots
+from slm.services.leases import get_lease_store
+from slm.services.chargeback import rebuild_chargeback
+from slm.services.dashboard import invalidate_dashboard_stats
+from slm.services.versions import bump_table_version
+from slm.services.imports import run_import
+from slm.services.renewals import invalidate_renewal_calendar
+from slm.services.notifications import invalidate_unread_count
+from slm.services import reports, audit, audit_archive, audit_chain
+
+logger = logging.getLogger(__name__)
+
+REMINDER_ROLES = ("it_manager", "finance_manager", "super_admin")
+# Notifications per INSERT when fanning reminders out to managers
+REMINDER_BATCH = 2000
 
 
 @shared_task
@@ -14,11 +35,19 @@ def check_renewals_due():
     """Mark contracts as pending_renewal when renewal_due_date is near."""
     today = timezone.now().date()
     due_soon = today + timedelta(days=30)
-    LicenseContract.objects.filter(
+    contracts = LicenseContract.objects.filter(
         status="active",
         renewal_due_date__lte=due_soon,
         renewal_due_date__gte=today,
-    ).update(status="pending_renewal")
+    )
+    invalidate_renewal_calendar(*contracts.dates("expiry_date", "month"))
+    with audit.batch(), transaction.atomic():
+        due = list(contracts.select_for_update().values_list("pk", "status"))
+        contracts.filter(pk__in=[pk for pk, _ in due]).update(status="pending_renewal")
+        # update() skips the signals that capture audit entries
+        audit.capture_update(LicenseContract, [(pk, {"status": (status, "pending_renewal")}) for pk, status in due])
+    invalidate_dashboard_stats()
+    bump_table_version(LicenseContract)
     return "Renewals due check completed"
 
 
@@ -26,46 +55,153 @@ def check_renewals_due():
 def update_expired_contracts():
     """Set status to expired for contracts past expiry_date."""
     today = timezone.now().date()
-    LicenseContract.objects.filter(
+    contracts = LicenseContract.objects.filter(
         status__in=("active", "pending_renewal"),
         expiry_date__lt=today,
-    ).update(status="expired")
+    )
+    invalidate_renewal_calendar(*contracts.dates("expiry_date", "month"))
+    with audit.batch(), transaction.atomic():
+        expired = list(contracts.select_for_update().values_list("pk", "status"))
+        contracts.filter(pk__in=[pk for pk, _ in expired]).update(status="expired")
+        # update() skips the signals that capture audit entries
+        audit.capture_update(LicenseContract, [(pk, {"status": (status, "expired")}) for pk, status in expired])
+    invalidate_dashboard_stats()
+    bump_table_version(LicenseContract)
     return "Expired contracts updated"
 
 
 @shared_task
 def send_renewal_reminders():
-    """Create in-app notifications and send emails for upcoming renewals."""
+    """
+    Create in-app notifications and send emails for upcoming renewals.
+
+    Set-based: the due dates of every active schedule, the contracts due on
+    any of them and the managers are read once each; notifications are
+    written with chunked ``bulk_create`` and the emails share one connection.
+    """
     today = timezone.now().date()
-    schedules = ReminderSchedule.objects.filter(is_active=True)
+    days = set(ReminderSchedule.objects.filter(is_active=True).values_list("days_before_due", flat=True))
+    if not days:
+        return "Created 0 reminders"
+    contracts = (
+        LicenseContract.objects.filter(status="active", renewal_due_date__in=[today + timedelta(days=d) for d in days])
+        .order_by("renewal_due_date", "pk")
+        .values_list("pk", "software_asset__name", "renewal_due_date")
+    )
+    reminders = [
+        (
+            f"Renewal due: {name}",
+            f"License for {name} is due for renewal on {due}.",
+            f"/contracts/?id={pk}",
+        )
+        for pk, name, due in contracts
+    ]
+    managers = list(User.objects.filter(role__in=REMINDER_ROLES).values_list("pk", "email"))
+    if not reminders or not managers:
+        return "Created 0 reminders"
+
+    user_ids = [pk for pk, _ in managers]
+    per_chunk = max(1, REMINDER_BATCH // len(user_ids))
     created = 0
-    for schedule in schedules:
-        target_date = today + timedelta(days=schedule.days_before_due)
-        contracts = LicenseContract.objects.filter(
-            status="active",
-            renewal_due_date=target_date,
-        ).select_related("software_asset")
-        managers = User.objects.filter(role__in=("it_manager", "finance_manager", "super_admin"))
-        for contract in contracts:
-            title = f"Renewal due: {contract.software_asset.name}"
-            message = f"License for {contract.software_asset.name} is due for renewal on {contract.renewal_due_date}."
-            for user in managers:
-                Notification.objects.create(
-                    user=user,
-                    title=title,
-                    message=message,
-                    notification_type="renewal_due",
-                    link=f"/contracts/?id={contract.id}",
-                )
-                created += 1
-            try:
-                send_mail(
-                    subject=f"[SLM] {title}",
-                    message=message,
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=[e for e in [u.email for u in managers] if e],
-                    fail_silently=True,
-                )
-            except Exception:
-                pass
+    with transaction.atomic():
+        for start in range(0, len(reminders), per_chunk):
+            batch = [
+                Notification(user_id=user_id, title=title, message=message, link=link, notification_type="renewal_due")
+                for title, message, link in reminders[start:start + per_chunk]
+                for user_id in user_ids
+            ]
+            Notification.objects.bulk_create(batch)
+            created += len(batch)
+    # bulk_create skips the signals that normally refresh these
+    invalidate_unread_count(*user_ids)
+    bump_table_version(Notification)
+
+    recipients = [email for _, email in managers if email]
+    if recipients:
+        try:
+            send_mass_mail(
+                [(f"[SLM] {title}", message, settings.DEFAULT_FROM_EMAIL, recipients) for title, message, _ in reminders],
+                fail_silently=True,
+            )
+        except Exception:
+            pass
     return f"Created {created} reminders"
+
+
+@shared_task
+def snapshot_utilization():
+    """
+    Record today's seat usage per asset and department, catching up any missed
+    days. The last day already recorded is rewritten too: it was taken before
+    that day ended, so later allocation changes would otherwise be missed.
+    """
+    today = timezone.now().date()
+    last = UtilizationSnapshot.objects.aggregate(d=Max("date"))["d"]
+    start = min(last, today) if last else today
+    written = rebuild_snapshots(start, today)
+    return f"Wrote {written} utilization snapshot rows for {start}..{today}"
+
+
+@shared_task
+def summarize_lease_usage():
+    """Reclaim expired floating-license leases and fold lease counters into hourly LeaseUsage rows."""
+    period = timezone.now().replace(minute=0, second=0, microsecond=0)
+    drained = get_lease_store().drain(time.time())
+    for asset_id, stats in drained.items():
+        row, _ = LeaseUsage.objects.get_or_create(software_asset_id=asset_id, period_start=period)
+        LeaseUsage.objects.filter(pk=row.pk).update(
+            checkouts=F("checkouts") + int(stats["checkouts"]),
+            checkins=F("checkins") + int(stats["checkins"]),
+            denied=F("denied") + int(stats["denied"]),
+            expired=F("expired") + int(stats["expired"]),
+            lease_seconds=F("lease_seconds") + int(stats["lease_seconds"]),
+            peak_concurrent=Greatest(F("peak_concurrent"), int(stats["peak"])),
+        )
+    return f"Summarized lease usage for {len(drained)} assets"
+
+
+@shared_task
+def compute_monthly_chargeback():
+    """Store last month's department/branch chargeback."""
+    first_of_month = timezone.now().date().replace(day=1)
+    end = first_of_month - timedelta(days=1)
+    start = end.replace(day=1)
+    lines = rebuild_chargeback(start, end)
+    return f"Stored {len(lines)} chargeback lines for {start}..{end}"
+
+
+@shared_task
+def import_file(job_id):
+    """Run a queued bulk import job."""
+    job = run_import(ImportJob.objects.get(pk=job_id))
+    return f"Import {job.pk} {job.status}: {job.created_count} created, {job.updated_count} updated, {job.error_count} errors"
+
+
+@shared_task
+def generate_report(job_id):
+    """Render a queued report job to file storage and notify its requesters."""
+    job = reports.run_report(ReportJob.objects.get(pk=job_id))
+    return f"Report {job.pk} {job.status}: {job.row_count} rows"
+
+
+@shared_task
+def purge_report_jobs():
+    """Delete report results older than REPORT_JOB_RETENTION_DAYS."""
+    return f"Removed {reports.purge_report_jobs()} report jobs"
+
+
+@shared_task
+def archive_audit_logs():
+    """Create upcoming audit partitions and archive months older than AUDIT_HOT_MONTHS."""
+    segments = audit_archive.archive_audit_logs()
+    return f"Archived {sum(s.row_count for s in segments)} audit entries in {len(segments)} months"
+
+
+@shared_task
+def verify_audit_chain():
+    """Verify the audit hash chain from the last checkpoint (entries written since the previous run)."""
+    report = audit_chain.verify_chain()
+    if report["broken"] is not None:
+        logger.error("Audit hash chain broken at entry %s", report["broken"])
+        return f"Audit chain broken at entry {report['broken']}"
+    return f"Verified {report['verified']} audit entries"
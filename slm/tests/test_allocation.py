@@ -0,0 +1,138 @@
+"""Tests for the seat reservation service and allocation endpoints."""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from django.db import connection, close_old_connections
+from rest_framework import status
+from rest_framework.test import APIClient
+from django.contrib.auth import get_user_model
+
+from slm.models import Department, SoftwareAsset, Allocation
+from slm.services.allocation import allocate, SeatsUnavailable
+
+User = get_user_model()
+
+
+@pytest.fixture
+def dept(db):
+    return Department.objects.create(name="IT", code="IT")
+
+
+@pytest.fixture
+def manager_client(dept):
+    user = User.objects.create_user(email="alloc@test.com", password="pass", role="it_manager", department=dept)
+    client = APIClient()
+    client.force_authenticate(user=user)
+    return client
+
+
+@pytest.mark.django_db
+def test_allocate_rejects_when_full(dept):
+    asset = SoftwareAsset.objects.create(name="One Seat", total_licenses=1)
+    allocate(Allocation(software_asset=asset, department=dept))
+    with pytest.raises(SeatsUnavailable):
+        allocate(Allocation(software_asset=asset, department=dept))
+    asset.refresh_from_db()
+    assert asset.used_seats == 1
+    assert Allocation.objects.filter(software_asset=asset).count() == 1
+
+
+@pytest.mark.django_db
+def test_api_create_returns_conflict_when_full(manager_client, dept):
+    asset = SoftwareAsset.objects.create(name="Full", total_licenses=1)
+    payload = {"software_asset": asset.pk, "department": dept.pk}
+    assert manager_client.post("/api/allocations/", payload, format="json").status_code == status.HTTP_201_CREATED
+    response = manager_client.post("/api/allocations/", payload, format="json")
+    assert response.status_code == status.HTTP_409_CONFLICT
+    assert response.data["software_asset"] == asset.pk
+
+
+@pytest.mark.django_db
+def test_updates_that_take_a_seat_respect_capacity(manager_client, dept):
+    from django.test import Client
+    from django.urls import reverse
+
+    full = SoftwareAsset.objects.create(name="Full", total_licenses=1)
+    spare = SoftwareAsset.objects.create(name="Spare", total_licenses=1)
+    allocate(Allocation(software_asset=full, department=dept))
+    idle = allocate(Allocation(software_asset=full, department=dept, active_flag=False))
+    moved = allocate(Allocation(software_asset=spare, department=dept))
+
+    url = f"/api/allocations/{idle.pk}/"
+    assert manager_client.patch(url, {"active_flag": True}, format="json").status_code == status.HTTP_409_CONFLICT
+    response = manager_client.patch(f"/api/allocations/{moved.pk}/", {"software_asset": full.pk}, format="json")
+    assert response.status_code == status.HTTP_409_CONFLICT
+    response = manager_client.patch(url, {"software_asset": spare.pk, "active_flag": False}, format="json")
+    assert response.status_code == status.HTTP_200_OK
+
+    web = Client()
+    web.force_login(User.objects.get(email="alloc@test.com"))
+    form = {"software_asset": full.pk, "department": dept.pk, "notes": "", "returned_on": "", "active_flag": "on"}
+    response = web.post(reverse("slm:allocation_edit", args=[idle.pk]), form)
+    assert response.status_code == 200 and "No available licenses" in response.content.decode()
+    full.refresh_from_db()
+    spare.refresh_from_db()
+    assert (full.used_seats, spare.used_seats) == (1, 1)
+    assert not Allocation.objects.get(pk=idle.pk).active_flag
+
+    # Returning the spare seat frees it for the reactivation
+    Allocation.objects.filter(pk=moved.pk).first().delete()
+    form["software_asset"] = spare.pk
+    assert web.post(reverse("slm:allocation_edit", args=[idle.pk]), form).status_code == 302
+    spare.refresh_from_db()
+    assert spare.used_seats == 1 and Allocation.objects.get(pk=idle.pk).active_flag
+
+
+@pytest.mark.django_db(transaction=True)
+def test_parallel_allocations_never_over_allocate():
+    if connection.vendor == "sqlite" and connection.is_in_memory_db():
+        pytest.skip("Shared-cache in-memory SQLite locks whole tables; needs a file-backed or server database.")
+    dept = Department.objects.create(name="Burst", code="BURST")
+    seats, attempts = 50, 300
+    asset = SoftwareAsset.objects.create(name="Contended", total_licenses=seats)
+
+    def attempt(_):
+        try:
+            allocate(Allocation(software_asset_id=asset.pk, department_id=dept.pk))
+            return True
+        except SeatsUnavailable:
+            return False
+        finally:
+            close_old_connections()
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(attempt, range(attempts)))
+
+    asset.refresh_from_db()
+    active = Allocation.objects.filter(software_asset=asset, active_flag=True).count()
+    assert results.count(True) == seats
+    assert active == seats
+    assert asset.used_seats == seats
+
+
+@pytest.mark.django_db
+def test_bulk_allocate_and_return(manager_client, dept):
+    asset = SoftwareAsset.objects.create(name="Rollout", total_licenses=3)
+    users = [User.objects.create_user(email=f"hire{i}@test.com", password="pass") for i in range(4)]
+    rows = [{"software_asset": asset.pk, "department": dept.pk, "user": u.pk} for u in users]
+    rows.append({"software_asset": 999999, "department": dept.pk})
+
+    response = manager_client.post("/api/allocations/bulk_allocate/", {"rows": rows}, format="json")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["succeeded"] == 3
+    assert [r["status"] for r in response.data["results"]] == ["created"] * 3 + ["error"] * 2
+    asset.refresh_from_db()
+    assert asset.used_seats == 3
+
+    first_id = response.data["results"][0]["id"]
+    response = manager_client.post(
+        "/api/allocations/bulk_return/",
+        {"rows": [{"id": first_id}, {"software_asset": asset.pk, "user": users[1].pk}, {"id": first_id}]},
+        format="json",
+    )
+    assert response.data["succeeded"] == 2
+    assert response.data["results"][2]["status"] == "error"
+    asset.refresh_from_db()
+    assert asset.used_seats == 1
+    assert Allocation.objects.filter(software_asset=asset, active_flag=True).count() == 1
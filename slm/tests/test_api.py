@@ -1,4 +1,5 @@
 """Tests for SLM API."""
+import json
 import pytest
 from rest_framework.test import APIClient
 from rest_framework import status
@@ -44,3 +45,361 @@ class TestAssetAPI:
         assert response.status_code == status.HTTP_200_OK
         assert "total_assets" in response.data
         assert "active_contracts" in response.data
+
+
+@pytest.mark.django_db
+def test_inventory_report_query_count_is_constant(authenticated_client, user):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from slm.models import Allocation
+
+    def report_queries():
+        with CaptureQueriesContext(connection) as ctx:
+            response = authenticated_client.get("/api/reports/inventory/")
+        assert response.status_code == status.HTTP_200_OK
+        return len(ctx.captured_queries), response.data["assets"]
+
+    asset = SoftwareAsset.objects.create(name="A0", total_licenses=2)
+    Allocation.objects.create(software_asset=asset, department=user.department, user=user)
+    baseline, rows = report_queries()
+    assert rows[0]["used"] == 1 and rows[0]["available"] == 1
+
+    for i in range(1, 10):
+        SoftwareAsset.objects.create(name=f"A{i}", total_licenses=1)
+    queries, rows = report_queries()
+    assert len(rows) == 10
+    assert queries == baseline
+
+
+@pytest.mark.django_db
+def test_dashboard_stats_are_cached_until_a_model_changes(authenticated_client, django_capture_on_commit_callbacks):
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    cache.clear()
+    assert authenticated_client.get("/api/dashboard/stats/").data["total_assets"] == 0
+    with CaptureQueriesContext(connection) as ctx:
+        authenticated_client.get("/api/dashboard/stats/")
+    assert not [q for q in ctx.captured_queries if "slm_" in q["sql"] and "slm_user" not in q["sql"]]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        SoftwareAsset.objects.create(name="New", total_licenses=1)
+    assert authenticated_client.get("/api/dashboard/stats/").data["total_assets"] == 1
+
+
+@pytest.mark.django_db
+def test_asset_list_supports_conditional_get(authenticated_client, django_capture_on_commit_callbacks):
+    from django.core.cache import cache
+
+    cache.clear()
+    first = authenticated_client.get("/api/assets/")
+    etag = first["ETag"]
+    assert first.has_header("Last-Modified")
+    assert authenticated_client.get("/api/assets/", HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_304_NOT_MODIFIED
+    assert authenticated_client.get("/api/assets/?search=x", HTTP_IF_NONE_MATCH=etag).status_code == status.HTTP_200_OK
+
+    with django_capture_on_commit_callbacks(execute=True):
+        SoftwareAsset.objects.create(name="Changed", total_licenses=1)
+    response = authenticated_client.get("/api/assets/", HTTP_IF_NONE_MATCH=etag)
+    assert response.status_code == status.HTTP_200_OK
+    assert response["ETag"] != etag
+
+
+@pytest.mark.django_db
+def test_audit_log_keyset_pages_and_ndjson_export(api_client, user, django_assert_max_num_queries):
+    import json
+    from datetime import datetime, timezone as dt_timezone
+    from slm.models import AuditLog
+
+    user.role = "super_admin"
+    user.save()
+    api_client.force_authenticate(user=user)
+    logs = AuditLog.objects.bulk_create(
+        [AuditLog(entity="SoftwareAsset" if i % 2 else "Vendor", change_type="update", user=user) for i in range(7)]
+    )
+    # Shared timestamps force the id tie-breaker to decide the order
+    for i, log in enumerate(AuditLog.objects.order_by("id")):
+        AuditLog.objects.filter(pk=log.pk).update(timestamp=datetime(2024, 1, 1 + i // 2, tzinfo=dt_timezone.utc))
+
+    seen, url = [], "/api/audit/?page_size=3"
+    while url:
+        with django_assert_max_num_queries(3):
+            page = api_client.get(url).data
+        assert "count" not in page
+        seen += [row["id"] for row in page["results"]]
+        url = page["next"]
+    assert seen == sorted((log.pk for log in logs), reverse=True)
+    assert api_client.get("/api/audit/?cursor=bogus").status_code == status.HTTP_404_NOT_FOUND
+
+    trail = api_client.get("/api/reports/audit-trail/?page_size=5").data
+    assert len(trail["audit_logs"]) == 5 and trail["next"]
+    assert len(api_client.get(trail["next"]).data["audit_logs"]) == 2
+
+    response = api_client.get("/api/audit/export/?entity=SoftwareAsset&timestamp__gte=2024-01-02&timestamp__lt=2024-01-04")
+    assert response["Content-Type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+    assert [r["id"] for r in rows] == [logs[3].pk, logs[5].pk]
+    assert {r["entity"] for r in rows} == {"SoftwareAsset"} and rows[0]["user__email"] == "api@test.com"
+
+
+@pytest.mark.django_db
+def test_changes_are_audited_with_diffs_and_request_context(
+    authenticated_client, user, django_capture_on_commit_callbacks
+):
+    from django.db import connection, transaction
+    from django.test.utils import CaptureQueriesContext
+    from slm.models import AuditLog
+    from slm.services import audit
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = authenticated_client.post(
+            "/api/assets/", {"name": "Suite", "total_licenses": 5}, format="json",
+            HTTP_USER_AGENT="pytest", REMOTE_ADDR="10.0.0.7",
+        )
+        asset_id = response.data["id"]
+        authenticated_client.patch(f"/api/assets/{asset_id}/", {"total_licenses": 8, "name": "Suite"}, format="json")
+        authenticated_client.delete(f"/api/assets/{asset_id}/")
+    created, updated, deleted = AuditLog.objects.filter(entity="SoftwareAsset").order_by("id")
+    created_values = audit.expand(created.change_type, created.changes)[1]
+    assert (created.change_type, created.object_id, created_values["total_licenses"]) == ("create", asset_id, 5)
+    assert (created.user, created.ip_address, created.user_agent) == (user, "10.0.0.7", "pytest")
+    assert (updated.change_type, audit.expand(updated.change_type, updated.changes)) == (
+        "update", ({"total_licenses": 5}, {"total_licenses": 8}),
+    )
+    assert (deleted.change_type, audit.expand(deleted.change_type, deleted.changes)[1]) == (
+        "soft_delete", {"is_deleted": True},
+    )
+    assert updated.old_value is None and len(updated.changes) == 1
+
+    # A forged X-Forwarded-For is kept as text; the entry is still written
+    with django_capture_on_commit_callbacks(execute=True):
+        authenticated_client.post(
+            "/api/assets/", {"name": "Suite 2"}, format="json", HTTP_X_FORWARDED_FOR="evil, 10.0.0.1"
+        )
+    forged = AuditLog.objects.filter(entity="SoftwareAsset").latest("id")
+    assert (forged.ip_address, forged.extra["client_ip"]) == (None, "evil")
+
+    # Rolled-back changes are never logged; a batch is written with one INSERT
+    tool = SoftwareAsset.objects.create(name="Tool", total_licenses=5)
+    with CaptureQueriesContext(connection) as queries, audit.batch():
+        with django_capture_on_commit_callbacks(execute=True):
+            with pytest.raises(ValueError), transaction.atomic():
+                SoftwareAsset.objects.create(name="Discarded")
+                raise ValueError
+            response = authenticated_client.post("/api/allocations/bulk_allocate/", {"rows": [
+                {"software_asset": tool.pk, "department": user.department_id} for _ in range(3)
+            ]}, format="json")
+    assert [r["status"] for r in response.data["results"]] == ["created"] * 3
+    inserts = [q for q in queries.captured_queries if q["sql"].startswith('INSERT INTO "slm_auditlog"')]
+    assert len(inserts) == 1
+    assert not AuditLog.objects.filter(entity="SoftwareAsset", object_id__gt=tool.pk).exists()
+    assert AuditLog.objects.filter(entity="Allocation", change_type="create", user=user).count() == 3
+
+
+@pytest.mark.django_db
+def test_old_audit_months_are_archived_and_still_queryable(api_client, user, settings, tmp_path, monkeypatch):
+    import gzip
+    import json
+    from datetime import datetime, timezone as dt_timezone
+    from unittest import mock
+    from slm.models import AuditLog, AuditArchiveSegment
+    from slm.services import audit_archive
+    from slm.services.audit_archive import archive_audit_logs
+
+    settings.MEDIA_ROOT = tmp_path
+    monkeypatch.setattr(audit_archive, "BLOCK_ROWS", 1)
+    user.role = "super_admin"
+    user.save()
+    api_client.force_authenticate(user=user)
+    logs = AuditLog.objects.bulk_create(
+        [AuditLog(entity="SoftwareAsset" if i % 2 else "Vendor", change_type="update", user=user) for i in range(6)]
+    )
+    for log, month in zip(logs, (1, 1, 2, 2, None, None)):
+        if month:
+            AuditLog.objects.filter(pk=log.pk).update(timestamp=datetime(2024, month, 3, tzinfo=dt_timezone.utc))
+
+    # A failed drop leaves the rows hot and no file behind, so the retry keeps the plain name
+    with mock.patch.object(audit_archive, "_drop_month", side_effect=RuntimeError), pytest.raises(RuntimeError):
+        archive_audit_logs(hot_months=12)
+    assert not list(tmp_path.rglob("*.jsonl.gz")) and AuditLog.objects.count() == 6
+
+    segments = archive_audit_logs(hot_months=12)
+    assert segments[0].file.name.endswith("auditlog-2024-01.jsonl.gz")
+    assert [(s.month.isoformat(), s.row_count, s.entities) for s in segments] == [
+        ("2024-01-01", 2, ["SoftwareAsset", "Vendor"]), ("2024-02-01", 2, ["SoftwareAsset", "Vendor"]),
+    ]
+    assert sorted(AuditLog.objects.values_list("pk", flat=True)) == [logs[4].pk, logs[5].pk]
+    with gzip.open(segments[0].file.path) as fh:
+        assert [json.loads(line)["id"] for line in fh] == [logs[0].pk, logs[1].pk]
+    assert archive_audit_logs(hot_months=12) == [] and AuditArchiveSegment.objects.count() == 2
+    assert [[block[2] for block in s.blocks] for s in segments] == [[logs[0].pk, logs[1].pk], [logs[2].pk, logs[3].pk]]
+
+    # A newest-first page decompresses only the blocks it returns
+    decompress = mock.Mock(wraps=gzip.decompress)
+    monkeypatch.setattr(audit_archive.gzip, "decompress", decompress)
+    page = audit_archive.archived_rows((datetime(2024, 3, 1, tzinfo=dt_timezone.utc), 0), 1)
+    assert [entry.pk for entry in page] == [logs[3].pk] and decompress.call_count == 1
+
+    # Pages run from the hot table into the archive, newest first
+    seen, url = [], "/api/audit/?page_size=4"
+    while url:
+        page = api_client.get(url).data
+        seen += [(row["id"], row["user_email"]) for row in page["results"]]
+        url = page["next"]
+    assert seen == [(log.pk, "api@test.com") for log in reversed(logs)]
+    vendor = api_client.get("/api/audit/?entity=Vendor&timestamp__lt=2024-02-01").data["results"]
+    assert [row["id"] for row in vendor] == [logs[0].pk]
+    trail = api_client.get("/api/reports/audit-trail/?page_size=3").data
+    assert [row["id"] for row in api_client.get(trail["next"]).data["audit_logs"]] == [logs[2].pk, logs[1].pk, logs[0].pk]
+
+    response = api_client.get("/api/audit/export/?entity=SoftwareAsset")
+    rows = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+    assert [r["id"] for r in rows] == [logs[1].pk, logs[3].pk, logs[5].pk]
+    assert rows[0]["user__email"] == "api@test.com"
+
+
+@pytest.mark.django_db
+def test_compact_audit_diffs_rebuild_contract_state(
+    api_client, user, settings, tmp_path, django_capture_on_commit_callbacks
+):
+    from datetime import date, datetime, timezone as dt_timezone
+    from slm.models import AuditLog, LicenseContract
+    from slm.services import audit
+    from slm.services.audit_archive import archive_audit_logs
+    from slm.tasks import update_expired_contracts
+
+    settings.MEDIA_ROOT = tmp_path
+    user.role = "super_admin"
+    user.save()
+    api_client.force_authenticate(user=user)
+    asset = SoftwareAsset.objects.create(name="Suite")
+    acme, beta = Vendor.objects.create(company_name="Acme"), Vendor.objects.create(company_name="Beta")
+
+    def stamp(when):
+        last = AuditLog.objects.filter(entity="LicenseContract").latest("id")
+        AuditLog.objects.filter(pk=last.pk).update(timestamp=when)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        contract = LicenseContract.objects.create(
+            software_asset=asset, vendor=acme, purchase_date=date(2023, 1, 1), expiry_date=date(2024, 1, 1)
+        )
+    stamp(datetime(2023, 1, 1, tzinfo=dt_timezone.utc))
+    with django_capture_on_commit_callbacks(execute=True):
+        contract.vendor = beta
+        contract.save()
+    stamp(datetime(2023, 6, 1, tzinfo=dt_timezone.utc))
+    with django_capture_on_commit_callbacks(execute=True):
+        update_expired_contracts()
+
+    expired = AuditLog.objects.filter(entity="LicenseContract").latest("id")
+    assert expired.old_value is None and expired.new_value is None
+    assert audit.expand(expired.change_type, expired.changes) == ({"status": "active"}, {"status": "expired"})
+    assert len(expired.changes) == 1 and isinstance(expired.changes[0][0], int)
+
+    # Older months are archived; reconstruction reads them transparently
+    archive_audit_logs(hot_months=12)
+    assert audit.state_at(LicenseContract, contract.pk, datetime(2022, 12, 1, tzinfo=dt_timezone.utc)) is None
+    march = audit.state_at(LicenseContract, contract.pk, datetime(2023, 3, 1, tzinfo=dt_timezone.utc))
+    assert (march["vendor_id"], march["status"], march["expiry_date"]) == (acme.pk, "active", "2024-01-01")
+    assert audit.state_at(LicenseContract, contract.pk)["vendor_id"] == beta.pk
+
+    response = api_client.get(
+        "/api/audit/state/", {"entity": "LicenseContract", "object_id": contract.pk, "at": "2023-07-01"}
+    )
+    assert (response.data["exists"], response.data["state"]["vendor_id"], response.data["state"]["status"]) == (
+        True, beta.pk, "active",
+    )
+    assert api_client.get("/api/audit/state/", {"entity": "LicenseContract", "object_id": contract.pk}).data[
+        "state"
+    ]["status"] == "expired"
+    listed = api_client.get("/api/audit/", {"entity": "LicenseContract"}).data["results"]
+    assert (listed[0]["old_value"], listed[0]["new_value"]) == ({"status": "active"}, {"status": "expired"})
+    assert api_client.get("/api/audit/state/", {"entity": "User", "object_id": 1}).status_code == 400
+
+    with django_capture_on_commit_callbacks(execute=True):
+        contract.delete()
+    assert audit.state_at(LicenseContract, contract.pk) is None
+
+
+@pytest.mark.django_db
+def test_renewal_due_flip_is_audited(django_capture_on_commit_callbacks):
+    from datetime import timedelta
+    from django.utils import timezone
+    from slm.models import AuditLog, LicenseContract
+    from slm.services import audit
+    from slm.tasks import check_renewals_due
+
+    today = timezone.now().date()
+    asset = SoftwareAsset.objects.create(name="Suite")
+    with django_capture_on_commit_callbacks(execute=True):
+        contract = LicenseContract.objects.create(
+            software_asset=asset, purchase_date=today - timedelta(days=300), renewal_due_date=today + timedelta(days=10)
+        )
+    with django_capture_on_commit_callbacks(execute=True):
+        check_renewals_due()
+
+    flipped = AuditLog.objects.filter(entity="LicenseContract").latest("id")
+    assert audit.expand(flipped.change_type, flipped.changes) == ({"status": "active"}, {"status": "pending_renewal"})
+    assert audit.state_at(LicenseContract, contract.pk)["status"] == "pending_renewal"
+
+
+@pytest.mark.django_db
+def test_field_changes_are_searchable_through_the_index(
+    api_client, user, settings, tmp_path, django_capture_on_commit_callbacks, django_assert_max_num_queries
+):
+    from datetime import date, datetime, timezone as dt_timezone
+    from slm.models import AuditLog, AuditFieldChange, LicenseContract
+    from slm.services.audit_archive import archive_audit_logs
+
+    settings.MEDIA_ROOT = tmp_path
+    user.role = "super_admin"
+    user.save()
+    api_client.force_authenticate(user=user)
+    asset, vendor = SoftwareAsset.objects.create(name="Suite"), Vendor.objects.create(company_name="Acme")
+    with django_capture_on_commit_callbacks(execute=True):
+        contracts = [
+            LicenseContract.objects.create(
+                software_asset=asset, vendor=vendor, purchase_date=date(2025, 1, 1), expiry_date=date(2030, 1, 1)
+            )
+            for _ in range(3)
+        ]
+    with django_capture_on_commit_callbacks(execute=True):
+        contracts[0].status = "cancelled"
+        contracts[0].save()
+    old_cancel = AuditLog.objects.latest("id")
+    backdated = datetime(2023, 5, 1, tzinfo=dt_timezone.utc)
+    AuditLog.objects.filter(pk=old_cancel.pk).update(timestamp=backdated)
+    AuditFieldChange.objects.filter(audit_log_id=old_cancel.pk).update(timestamp=backdated)
+    with django_capture_on_commit_callbacks(execute=True):
+        contracts[1].status = "cancelled"
+        contracts[1].expiry_date = date(2031, 1, 1)
+        contracts[1].save()
+        contracts[2].notes = "cancelled"
+        contracts[2].save()
+        vendor.email = "billing@acme.test"
+        vendor.save()
+
+    indexed = AuditFieldChange.objects.get(object_id=contracts[1].pk, field__name="expiry_date", old__isnull=False)
+    assert (indexed.entity, indexed.old, indexed.new) == ("LicenseContract", "2030-01-01", "2031-01-01")
+
+    def ids(**params):
+        with django_assert_max_num_queries(8):
+            response = api_client.get("/api/audit/", params)
+        assert response.status_code == 200
+        return [row["object_id"] for row in response.data["results"]]
+
+    assert ids(entity="LicenseContract", field="status", new="cancelled") == [contracts[1].pk, contracts[0].pk]
+    assert ids(field="status", old="active", new="cancelled", timestamp__gte="2024-01-01T00:00:00Z") == [contracts[1].pk]
+    assert ids(field="expiry_date", new="2031-01-01") == [contracts[1].pk]
+    assert ids(field="status", object_id=contracts[2].pk) == [contracts[2].pk]  # its create entry
+    assert ids(field="email", entity="Vendor", object_id=vendor.pk) == [vendor.pk]
+    assert api_client.get("/api/audit/", {"new": "cancelled"}).status_code == 400
+
+    # Archiving drops the month's index rows; archived entries are matched from their diffs
+    archive_audit_logs(hot_months=12)
+    assert not AuditFieldChange.objects.filter(audit_log_id=old_cancel.pk).exists()
+    assert ids(entity="LicenseContract", field="status", new="cancelled") == [contracts[1].pk, contracts[0].pk]
+    exported = api_client.get("/api/audit/export/", {"field": "status", "new": "cancelled"})
+    lines = b"".join(exported.streaming_content).decode().splitlines()
+    assert [json.loads(line)["object_id"] for line in lines] == [contracts[0].pk, contracts[1].pk]
@@ -0,0 +1,104 @@
+"""Tests for the chunked bulk import pipeline."""
+import io
+
+import openpyxl
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from slm.models import Department, SoftwareAsset, LicenseContract, Vendor, Allocation, ImportJob
+from slm.services.imports import run_import
+from slm.tasks import import_file
+
+User = get_user_model()
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+
+
+@pytest.fixture
+def user(db):
+    dept = Department.objects.create(name="IT", code="IT")
+    return User.objects.create_user(email="import@test.com", password="pass", role="super_admin", department=dept)
+
+
+def _job(user, kind, name, content):
+    job = ImportJob(kind=kind, created_by=user)
+    job.file.save(name, ContentFile(content), save=False)
+    job.save()
+    return job
+
+
+@pytest.mark.django_db
+def test_asset_import_creates_updates_and_reports_row_errors(user):
+    SoftwareAsset.objects.create(name="Office", version="2021", total_licenses=5)
+    csv_data = (
+        "Name,Version,License Type,Total Licenses,Category\n"
+        "Office,2021,perpetual,50,productivity\n"
+        "IDE,,subscription,10,dev\n"
+        ",,subscription,1,\n"
+        "Bad,,lifetime,x,\n"
+        "IDE,,subscription,12,dev\n"
+    )
+    job = run_import(_job(user, "assets", "assets.csv", csv_data.encode()), chunk_size=2)
+
+    assert job.status == "completed"
+    assert (job.processed_rows, job.created_count, job.updated_count, job.error_count) == (5, 1, 2, 2)
+    assert [e["row"] for e in job.errors] == [4, 5]
+    assert set(job.errors[1]["errors"]) == {"license_type", "total_licenses"}
+    office = SoftwareAsset.objects.get(name="Office")
+    assert (office.total_licenses, office.license_type, office.category) == (50, "perpetual", "productivity")
+    # The repeated IDE row in the next chunk updates the asset created by the first one
+    assert list(SoftwareAsset.objects.filter(name="IDE").values_list("total_licenses", flat=True)) == [12]
+
+
+@pytest.mark.django_db
+def test_xlsx_contract_import_resolves_references_per_chunk(user, django_assert_max_num_queries):
+    asset = SoftwareAsset.objects.create(name="CAD", total_licenses=5)
+    vendor = Vendor.objects.create(company_name="Acme")
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["software_asset", "vendor", "purchase_date", "duration_months", "support_level"])
+    for i in range(50):
+        sheet.append(["CAD", "Acme", f"2024-01-{i % 28 + 1:02d}", 12, "premium"])
+    sheet.append(["Missing", "Acme", "2024-01-01", 12, "premium"])
+    sheet.append(["CAD", "Nobody", "2024-01-01", 12, "premium"])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    job = _job(user, "contracts", "contracts.xlsx", buffer.getvalue())
+
+    with django_assert_max_num_queries(20):
+        job = run_import(job)
+
+    assert (job.status, job.created_count, job.error_count) == ("completed", 50, 2)
+    assert job.errors[0]["errors"] == {"software_asset": "Unknown software asset."}
+    assert job.errors[1]["errors"] == {"vendor": "Unknown vendor."}
+    contract = LicenseContract.objects.filter(software_asset=asset, vendor=vendor).earliest("purchase_date")
+    assert str(contract.expiry_date) == "2025-01-01"
+    assert str(contract.renewal_due_date) == "2024-12-02"
+
+
+@pytest.mark.django_db
+def test_bulk_import_endpoint_queues_job_and_reports_status(user, monkeypatch, django_capture_on_commit_callbacks):
+    SoftwareAsset.objects.create(name="Viewer", total_licenses=1)
+    monkeypatch.setattr(import_file, "delay", lambda pk: import_file(pk))
+    client = APIClient()
+    client.force_authenticate(user=user)
+    upload = SimpleUploadedFile("alloc.csv", b"software_asset,department,user\nViewer,IT,import@test.com\nViewer,IT,\n")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post("/api/assets/bulk_import/", {"file": upload, "kind": "allocations"}, format="multipart")
+    assert response.status_code == status.HTTP_202_ACCEPTED
+
+    job = client.get(response["Location"]).data
+    assert (job["status"], job["progress"], job["created_count"], job["error_count"]) == ("completed", 100, 1, 1)
+    assert "No available licenses" in job["errors"][0]["errors"]["software_asset"]
+    assert Allocation.objects.filter(software_asset__name="Viewer").count() == 1
+
+    bad = SimpleUploadedFile("notes.txt", b"hello")
+    assert client.post("/api/assets/bulk_import/", {"file": bad}, format="multipart").status_code == 400
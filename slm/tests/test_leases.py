@@ -0,0 +1,75 @@
+"""Tests for floating-license leases."""
+import pytest
+from rest_framework import status
+from rest_framework.test import APIClient
+from django.contrib.auth import get_user_model
+
+from slm.models import SoftwareAsset, LeaseUsage
+from slm.services import leases
+
+User = get_user_model()
+
+
+@pytest.fixture
+def store(monkeypatch):
+    from django.core.cache import cache
+
+    cache.clear()
+    store = leases.MemoryLeaseStore()
+    monkeypatch.setattr(leases, "_store", store)
+    return store
+
+
+@pytest.fixture
+def client(db):
+    user = User.objects.create_user(email="lease@test.com", password="pass", role="it_staff")
+    api = APIClient()
+    api.force_authenticate(user=user)
+    return api
+
+
+@pytest.fixture
+def floating(db):
+    return SoftwareAsset.objects.create(name="Solver", license_type="concurrent", total_licenses=2)
+
+
+@pytest.mark.django_db
+def test_checkout_renew_checkin(client, store, floating):
+    first = client.post("/api/leases/checkout/", {"asset": floating.pk, "ttl": 60}, format="json")
+    second = client.post("/api/leases/checkout/", {"asset": floating.pk}, format="json")
+    assert first.status_code == second.status_code == status.HTTP_201_CREATED
+    full = client.post("/api/leases/checkout/", {"asset": floating.pk}, format="json")
+    assert full.status_code == status.HTTP_409_CONFLICT
+
+    lease_id = first.data["lease_id"]
+    assert client.post(f"/api/leases/{lease_id}/renew/", {"ttl": 120}, format="json").status_code == status.HTTP_200_OK
+    assert client.post(f"/api/leases/{lease_id}/checkin/").status_code == status.HTTP_200_OK
+    assert client.post(f"/api/leases/{lease_id}/checkin/").status_code == status.HTTP_404_NOT_FOUND
+    assert client.get("/api/leases/", {"asset": floating.pk}).data["active"] == 1
+
+
+@pytest.mark.django_db
+def test_named_assets_cannot_be_leased(client, store):
+    asset = SoftwareAsset.objects.create(name="Named", license_type="user", total_licenses=5)
+    response = client.post("/api/leases/checkout/", {"asset": asset.pk}, format="json")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+def test_expired_leases_are_reclaimed_and_summarized(store, floating, monkeypatch):
+    from slm.tasks import summarize_lease_usage
+
+    clock = [1000.0]
+    monkeypatch.setattr(leases.time, "time", lambda: clock[0])
+    assert leases.checkout(floating.pk, ttl=10)
+    assert leases.checkout(floating.pk, ttl=10)
+    assert leases.checkout(floating.pk, ttl=10) is None
+
+    clock[0] += 11
+    assert leases.active_leases(floating.pk) == 0
+    assert leases.checkout(floating.pk, ttl=10)
+
+    summarize_lease_usage()
+    usage = LeaseUsage.objects.get(software_asset=floating)
+    assert (usage.checkouts, usage.denied, usage.expired, usage.peak_concurrent) == (3, 1, 2, 2)
+    assert usage.lease_seconds == 20
@@ -34,3 +34,188 @@ def test_license_contract_expiry():
         purchase_date=date(2024, 1, 1), duration_months=12
     )
     assert contract.expiry_date == date(2025, 1, 1)
+
+
+@pytest.mark.django_db
+def test_used_seats_follow_allocation_lifecycle():
+    dept = Department.objects.create(name="Ops", code="OPS")
+    asset = SoftwareAsset.objects.create(name="Seats", total_licenses=3, license_type="user")
+    first = Allocation.objects.create(software_asset=asset, department=dept)
+    second = Allocation.objects.create(software_asset=asset, department=dept)
+    asset.refresh_from_db()
+    assert asset.used_seats == 2
+
+    first.returned_on = timezone.now()
+    first.save()
+    asset.refresh_from_db()
+    assert asset.used_seats == 1
+    assert asset.available_licenses == 2
+
+    first.save()  # re-saving an inactive row must not double-release
+    second.delete()
+    asset.refresh_from_db()
+    assert asset.used_seats == 0
+
+
+@pytest.mark.django_db
+def test_saving_a_stale_asset_keeps_the_seat_counter():
+    from slm.services.allocation import allocate
+
+    dept = Department.objects.create(name="IT", code="IT")
+    asset = SoftwareAsset.objects.create(name="Stale", total_licenses=1)
+    stale = SoftwareAsset.objects.get(pk=asset.pk)
+    allocate(Allocation(software_asset=asset, department=dept))
+    stale.description = "edited"
+    stale.save()
+    asset.refresh_from_db()
+    assert (asset.description, asset.used_seats) == ("edited", 1)
+
+
+@pytest.mark.django_db
+def test_rebuild_seat_counters_command():
+    from django.core.management import call_command
+    from django.core.management.base import CommandError
+
+    dept = Department.objects.create(name="Ops", code="OPS")
+    asset = SoftwareAsset.objects.create(name="Drift", total_licenses=5, license_type="user")
+    Allocation.objects.create(software_asset=asset, department=dept)
+    SoftwareAsset.objects.filter(pk=asset.pk).update(used_seats=4)
+
+    with pytest.raises(CommandError):
+        call_command("rebuild_seat_counters", "--verify")
+    call_command("rebuild_seat_counters")
+    asset.refresh_from_db()
+    assert asset.used_seats == 1
+    call_command("rebuild_seat_counters", "--verify")
+
+
+@pytest.mark.django_db
+def test_unread_notification_counter(django_capture_on_commit_callbacks):
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from slm.models import Notification
+    from slm.services.notifications import get_unread_count, mark_all_read
+
+    cache.clear()
+    user = User.objects.create_user(email="n@test.com", password="pass")
+    assert get_unread_count(user) == 0
+    with django_capture_on_commit_callbacks(execute=True):
+        note = Notification.objects.create(user=user, title="Hi", message="m")
+        Notification.objects.create(user=user, title="Hi again", message="m")
+    assert get_unread_count(user) == 2
+    with CaptureQueriesContext(connection) as ctx:
+        assert get_unread_count(user) == 2
+    assert not ctx.captured_queries
+
+    with django_capture_on_commit_callbacks(execute=True):
+        note.is_read = True
+        note.save(update_fields=["is_read"])
+    assert get_unread_count(user) == 1
+    with django_capture_on_commit_callbacks(execute=True):
+        mark_all_read(user)
+    assert get_unread_count(user) == 0
+    assert not Notification.objects.filter(user=user, is_read=False).exists()
+
+
+@pytest.mark.django_db
+def test_audit_hash_chain_verifies_incrementally_and_detects_tampering(
+    settings, tmp_path, django_capture_on_commit_callbacks
+):
+    from datetime import date, datetime, timezone as dt_timezone
+    from unittest import mock
+    from django.core.management import call_command
+    from django.core.management.base import CommandError
+    from slm.models import AuditLog, AuditChainCheckpoint
+    from slm.services import audit
+    from slm.services.audit_archive import archive_audit_logs
+    from slm.services import audit_chain
+    from slm.services.audit_chain import verify_chain
+
+    settings.MEDIA_ROOT = tmp_path
+    asset, vendor = SoftwareAsset.objects.create(name="Chain"), Vendor.objects.create(company_name="Acme")
+
+    def contracts(count):
+        with django_capture_on_commit_callbacks(execute=True):
+            for _ in range(count):
+                LicenseContract.objects.create(
+                    software_asset=asset, vendor=vendor, purchase_date=date(2023, 1, 1), duration_months=12
+                )
+
+    with mock.patch("django.utils.timezone.now", return_value=datetime(2023, 3, 1, 12, tzinfo=dt_timezone.utc)):
+        contracts(3)
+    contracts(3)
+    # The database normalizes the address; the chain must hash what it stored
+    audit.write([AuditLog(entity="User", change_type="login", ip_address="2001:DB8:0:0::1")])
+    call_command("verify_audit_chain", "--workers", "1", "--segment-size", "2")
+    assert sum(AuditChainCheckpoint.objects.values_list("row_count", flat=True)) == 7
+
+    # Old months move to the archive; a nightly run only reads what was written since
+    archive_audit_logs(hot_months=12)
+    assert AuditLog.objects.count() == 4
+    contracts(2)
+    assert verify_chain(segment_size=2)["verified"] == 2
+    assert verify_chain()["verified"] == 0
+    # An interrupted full run keeps the existing resume points
+    checkpoints = list(AuditChainCheckpoint.objects.values_list("last_id", flat=True))
+    with mock.patch.object(audit_chain, "verify_unit", side_effect=RuntimeError), pytest.raises(RuntimeError):
+        verify_chain(full=True, segment_size=3)
+    assert list(AuditChainCheckpoint.objects.values_list("last_id", flat=True)) == checkpoints
+    report = verify_chain(full=True, segment_size=3)
+    assert (report["verified"], report["broken"]) == (9, None)
+    assert AuditChainCheckpoint.objects.count() == 3  # the earlier, differently split ones are replaced
+
+    hot = list(AuditLog.objects.order_by("id"))
+    AuditLog.objects.filter(pk=hot[1].pk).update(object_id=999)
+    assert verify_chain(full=True, segment_size=2)["broken"] == hot[1].pk
+    assert not AuditChainCheckpoint.objects.filter(last_id__gte=hot[1].pk).exists()
+    with pytest.raises(CommandError):
+        call_command("verify_audit_chain", "--workers", "1", "--full")
+    AuditLog.objects.filter(pk=hot[1].pk).update(object_id=hot[1].object_id)
+    assert verify_chain(full=True)["broken"] is None
+
+    AuditLog.objects.filter(pk=hot[-1].pk).delete()
+    assert verify_chain(full=True)["broken"] == hot[-1].pk
+
+
+@pytest.mark.django_db
+def test_renewal_reminders_fan_out_in_bulk(
+    monkeypatch, mailoutbox, django_assert_max_num_queries, django_capture_on_commit_callbacks
+):
+    from datetime import timedelta
+    from django.core.cache import cache
+    from slm import tasks
+    from slm.models import Notification, ReminderSchedule
+    from slm.services.notifications import get_unread_count
+
+    cache.clear()
+    monkeypatch.setattr(tasks, "REMINDER_BATCH", 4)
+    today = timezone.now().date()
+    for days in (30, 30, 7):
+        ReminderSchedule.objects.create(name=f"{days} days", days_before_due=days)
+    ReminderSchedule.objects.create(name="Off", days_before_due=10, is_active=False)
+    managers = [
+        User.objects.create_user(email=f"m{i}@test.com", password="pass", role=role)
+        for i, role in enumerate(("it_manager", "finance_manager", "super_admin"))
+    ]
+    User.objects.create_user(email="staff@test.com", password="pass", role="it_staff")
+    vendor = Vendor.objects.create(company_name="Vendor Co")
+    due = {}
+    contracts = (("Due30", 30, "active"), ("Due7", 7, "active"), ("Due10", 10, "active"), ("Gone", 7, "cancelled"))
+    for name, days, status in contracts:
+        asset = SoftwareAsset.objects.create(name=name)
+        due[name] = LicenseContract.objects.create(
+            software_asset=asset, vendor=vendor, purchase_date=today, renewal_due_date=today + timedelta(days=days),
+            status=status,
+        )
+    assert get_unread_count(managers[0]) == 0
+
+    with django_assert_max_num_queries(10), django_capture_on_commit_callbacks(execute=True):
+        assert tasks.send_renewal_reminders() == "Created 6 reminders"
+
+    reminders = Notification.objects.filter(notification_type="renewal_due")
+    assert set(reminders.values_list("link", flat=True)) == {f"/contracts/?id={due[n].pk}" for n in ("Due30", "Due7")}
+    assert set(reminders.values_list("user_id", flat=True)) == {m.pk for m in managers}
+    assert get_unread_count(managers[0]) == 2
+    assert sorted(m.subject for m in mailoutbox) == ["[SLM] Renewal due: Due30", "[SLM] Renewal due: Due7"]
+    assert sorted(mailoutbox[0].to) == ["m0@test.com", "m1@test.com", "m2@test.com"]
@@ -0,0 +1,488 @@
+"""Tests for reporting and analytics services."""
+from datetime import date, datetime, timezone as dt_timezone
+
+import pytest
+from rest_framework.test import APIClient
+from django.contrib.auth import get_user_model
+
+from slm.models import Department, SoftwareAsset, Allocation, UtilizationSnapshot
+
+User = get_user_model()
+
+
+def at(y, m, d):
+    return datetime(y, m, d, 12, tzinfo=dt_timezone.utc)
+
+
+@pytest.fixture
+def manager(db):
+    return User.objects.create_user(email="reports@test.com", password="pass", role="it_manager")
+
+
+@pytest.fixture
+def client(manager):
+    api = APIClient()
+    api.force_authenticate(user=manager)
+    return api
+
+
+@pytest.mark.django_db
+def test_backfill_snapshots_and_trend(client):
+    from django.core.management import call_command
+
+    ops = Department.objects.create(name="Ops", code="OPS")
+    dev = Department.objects.create(name="Dev", code="DEV")
+    asset = SoftwareAsset.objects.create(name="IDE", total_licenses=5)
+    Allocation.objects.create(software_asset=asset, department=ops, allocated_on=at(2025, 1, 1))
+    Allocation.objects.create(software_asset=asset, department=ops, allocated_on=at(2025, 1, 2), returned_on=at(2025, 1, 4))
+    Allocation.objects.create(software_asset=asset, department=dev, allocated_on=at(2025, 1, 3))
+
+    call_command("backfill_utilization", "--start", "2025-01-01", "--end", "2025-01-05")
+    ops_rows = dict(UtilizationSnapshot.objects.filter(department=ops).values_list("date", "used_seats"))
+    assert ops_rows == {
+        date(2025, 1, 1): 1, date(2025, 1, 2): 2, date(2025, 1, 3): 2,
+        date(2025, 1, 4): 1, date(2025, 1, 5): 1,
+    }
+    snap = UtilizationSnapshot.objects.get(department=dev, date=date(2025, 1, 3))
+    assert (snap.used_seats, snap.available_seats) == (1, 2)
+
+    response = client.get("/api/reports/utilization/", {"asset": asset.pk, "start": "2024-12-31", "end": "2025-01-05"})
+    series = response.data["series"]
+    assert [p["used"] for p in series] == [0, 1, 2, 3, 2, 2]
+    assert series[0]["available"] == 5 and series[3]["available"] == 2
+    for bad in ({"start": "2024-02-30"}, {"asset": "abc"}, {"department": "abc"}, {"asset": 999999}):
+        assert client.get("/api/reports/utilization/", bad).status_code == 400
+
+
+@pytest.mark.django_db
+def test_snapshot_task_is_incremental():
+    from slm.tasks import snapshot_utilization
+
+    dept = Department.objects.create(name="Ops", code="OPS")
+    asset = SoftwareAsset.objects.create(name="Mail", total_licenses=2)
+    Allocation.objects.create(software_asset=asset, department=dept)
+    snapshot_utilization()
+    snapshot_utilization()
+    assert UtilizationSnapshot.objects.count() == 1
+    assert UtilizationSnapshot.objects.get().used_seats == 1
+
+    # Changes made after the last run still reach that day's snapshot on the next one
+    Allocation.objects.create(software_asset=asset, department=dept)
+    snapshot_utilization()
+    assert UtilizationSnapshot.objects.get().used_seats == 2
+
+
+@pytest.mark.django_db
+def test_usage_at_and_peak(client, django_capture_on_commit_callbacks, django_assert_num_queries):
+    from django.core.cache import cache
+    from slm.services.usage_index import get_usage_index
+
+    cache.clear()
+    dept = Department.objects.create(name="Ops", code="OPS")
+    asset = SoftwareAsset.objects.create(name="CAD", total_licenses=10)
+    Allocation.objects.create(software_asset=asset, department=dept, allocated_on=at(2025, 7, 1), returned_on=at(2025, 8, 1))
+    Allocation.objects.create(software_asset=asset, department=dept, allocated_on=at(2025, 7, 15), returned_on=at(2025, 9, 15))
+    Allocation.objects.create(software_asset=asset, department=dept, allocated_on=at(2025, 8, 1))
+
+    def usage(day):
+        return client.get("/api/allocations/usage-at/", {"asset": asset.pk, "at": day}).data["used"]
+
+    assert [usage(d) for d in ("2025-06-30", "2025-07-01", "2025-07-20", "2025-08-01", "2025-10-01")] == [0, 1, 2, 2, 1]
+    # The index stays in the process; repeat queries only read its version
+    with django_assert_num_queries(0):
+        assert get_usage_index(asset.pk).at(at(2025, 7, 20)) == 2
+
+    peak = client.get("/api/allocations/usage-peak/", {"asset": asset.pk, "start": "2025-07-01", "end": "2025-09-30"}).data
+    # The hand-over on 1 Aug (one returned, one granted) must not count as 3
+    assert peak["peak"] == 2
+    assert peak["peak_at"] == at(2025, 7, 15)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Allocation.objects.create(
+            software_asset=asset, department=dept, allocated_on=at(2025, 8, 10), returned_on=at(2025, 8, 20)
+        )
+    peak = client.get("/api/allocations/usage-peak/", {"asset": asset.pk, "start": "2025-07-01", "end": "2025-09-30"}).data
+    assert (peak["peak"], peak["peak_at"]) == (3, at(2025, 8, 10))
+
+
+@pytest.mark.django_db
+def test_chargeback_apportions_invoices_by_seat_days(client):
+    from decimal import Decimal
+    from slm.models import Branch, LicenseContract, Invoice, ChargebackLine
+
+    north = Branch.objects.create(name="North", code="N")
+    south = Branch.objects.create(name="South", code="S")
+    ops = Department.objects.create(name="Ops", code="OPS", branch=north)
+    dev = Department.objects.create(name="Dev", code="DEV", branch=south)
+    asset = SoftwareAsset.objects.create(name="Suite", total_licenses=10)
+    contract = LicenseContract.objects.create(software_asset=asset, purchase_date=date(2025, 1, 1))
+    # Ops holds 2 seats all 30 days, Dev 1 seat for the last 10 days of a 30-day period
+    for _ in range(2):
+        Allocation.objects.create(software_asset=asset, department=ops, allocated_on=at(2024, 12, 1))
+    Allocation.objects.create(software_asset=asset, department=dev, allocated_on=at(2025, 4, 21))
+    Invoice.objects.create(invoice_number="I-1", invoice_date=date(2025, 4, 5), license_contract=contract, subtotal=Decimal("100.00"))
+    Invoice.objects.create(invoice_number="I-2", invoice_date=date(2025, 4, 9), subtotal=Decimal("5.00"))
+
+    response = client.get("/api/reports/chargeback/", {"start": "2025-04-01", "end": "2025-04-30"})
+    rows = {r["code"]: r for r in response.data["rows"]}
+    assert rows["OPS"]["seat_days"] == 60 and rows["DEV"]["seat_days"] == 10
+    assert rows["OPS"]["amount"] == "85.72" and rows["DEV"]["amount"] == "14.28"
+    assert rows[None]["amount"] == "5.00"
+    assert sum(ChargebackLine.objects.values_list("amount", flat=True)) == Decimal("105.00")
+
+    branch = client.get("/api/reports/chargeback/", {"start": "2025-04-01", "end": "2025-04-30", "group_by": "branch"})
+    assert {r["code"]: r["amount"] for r in branch.data["rows"]}["S"] == "14.28"
+
+    csv = client.get("/api/reports/chargeback/", {"start": "2025-04-01", "end": "2025-04-30", "export": "csv"})
+    assert csv["Content-Type"] == "text/csv"
+    assert b"OPS,Ops,USD,60,85.72" in csv.content
+
+    assert client.get("/api/reports/chargeback/", {"start": "2025-02-30"}).status_code == 400
+    auditor = User.objects.create_user(email="cb-auditor@test.com", password="pass", role="auditor")
+    client.force_authenticate(user=auditor)
+    period = {"start": "2025-04-01", "end": "2025-04-30"}
+    assert client.get("/api/reports/chargeback/", {**period, "recompute": "1"}).status_code == 403
+    assert client.get("/api/reports/chargeback/", period).status_code == 200
+
+
+@pytest.mark.django_db
+def test_renewal_calendar_keyset_pages_over_range(client):
+    from slm.models import LicenseContract
+
+    asset = SoftwareAsset.objects.create(name="Suite", total_licenses=1)
+    for day in (5, 5, 6, 7, 9):
+        LicenseContract.objects.create(software_asset=asset, purchase_date=date(2024, 3, day), expiry_date=date(2025, 3, day))
+    LicenseContract.objects.create(software_asset=asset, purchase_date=date(2024, 5, 1), expiry_date=date(2025, 5, 1))
+
+    url = "/api/reports/renewal-calendar/?start=2025-03-01&end=2025-03-31&limit=2"
+    seen = []
+    while url:
+        data = client.get(url).data
+        assert len(data["contracts"]) <= 2
+        seen += [(c["expiry_date"], c["id"]) for c in data["contracts"]]
+        url = data["next"]
+    assert len(seen) == 5 and seen == sorted(seen)
+    assert client.get("/api/reports/renewal-calendar/?start=2025-03-02&end=2025-03-01").status_code == 400
+
+
+@pytest.mark.django_db
+def test_renewal_ics_feed_is_cached_until_its_window_changes(client, django_capture_on_commit_callbacks):
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from slm.models import LicenseContract, Invoice
+
+    cache.clear()
+    asset = SoftwareAsset.objects.create(name="Drafting, Pro", total_licenses=1)
+    contract = LicenseContract.objects.create(software_asset=asset, purchase_date=date(2024, 3, 5), expiry_date=date(2025, 3, 5))
+    outside = LicenseContract.objects.create(software_asset=asset, purchase_date=date(2024, 8, 1), expiry_date=date(2025, 8, 1))
+    ics_url = client.get("/api/reports/renewal-calendar/?start=2025-03-01&end=2025-04-30").data["ics_url"]
+
+    def fetch():
+        with CaptureQueriesContext(connection) as ctx:
+            response = APIClient().get(ics_url)
+        assert response.status_code == 200
+        return response.content.decode(), [q for q in ctx.captured_queries if "slm_licensecontract" in q["sql"]]
+
+    feed, queries = fetch()
+    assert queries and "SUMMARY:Renewal: Drafting\\, Pro" in feed and "DTSTART;VALUE=DATE:20250305" in feed
+    assert fetch()[1] == []
+
+    with django_capture_on_commit_callbacks(execute=True):
+        outside.notes = "outside the window"
+        outside.save()
+    assert fetch()[1] == []
+
+    with django_capture_on_commit_callbacks(execute=True):
+        contract.expiry_date = date(2025, 4, 20)
+        contract.save()
+    feed, queries = fetch()
+    assert queries and "DTSTART;VALUE=DATE:20250420" in feed
+
+    # The finance feed shows the contract's last invoice total
+    with django_capture_on_commit_callbacks(execute=True):
+        invoice = Invoice.objects.create(
+            invoice_number="INV-1", invoice_date=date(2025, 1, 10), license_contract=contract, subtotal=100
+        )
+    assert "Last invoice: 100" in fetch()[0]
+    with django_capture_on_commit_callbacks(execute=True):
+        invoice.subtotal = 120
+        invoice.save()
+    assert "Last invoice: 120" in fetch()[0]
+    with django_capture_on_commit_callbacks(execute=True):
+        invoice.delete()
+    assert "Last invoice" not in fetch()[0]
+    assert APIClient().get(ics_url.replace("token=", "token=x")).status_code == 403
+
+    # Rotating the feed token revokes URLs handed out before
+    assert client.post("/api/reports/renewal-calendar/feed-token/").status_code == 204
+    assert APIClient().get(ics_url).status_code == 403
+    fresh_url = client.get("/api/reports/renewal-calendar/?start=2025-03-01&end=2025-04-30").data["ics_url"]
+    assert fresh_url != ics_url and APIClient().get(fresh_url).status_code == 200
+
+
+@pytest.mark.django_db
+def test_vendor_spend_rollup_converts_currencies(client, tmp_path, django_capture_on_commit_callbacks):
+    from decimal import Decimal
+    from django.core.cache import cache
+    from django.core.management import call_command
+    from slm.models import Vendor, Invoice, Payment, VendorSpendRollup
+
+    cache.clear()
+    rates = tmp_path / "fx.csv"
+    rates.write_text("date,currency,rate\n2025-01-01,EUR,1.10\n2025-01-01,GBP,1.25\n2025-02-15,EUR,1.20\nbad,EUR,x\n")
+    call_command("load_fx_rates", str(rates))
+
+    acme = Vendor.objects.create(company_name="Acme")
+    globex = Vendor.objects.create(company_name="Globex")
+    with django_capture_on_commit_callbacks(execute=True):
+        inv = Invoice.objects.create(vendor=acme, invoice_date=date(2025, 1, 10), subtotal=Decimal("100"), currency="EUR")
+        Invoice.objects.create(vendor=acme, invoice_date=date(2025, 2, 20), subtotal=Decimal("100"), currency="EUR")
+        Invoice.objects.create(vendor=globex, invoice_date=date(2025, 1, 5), subtotal=Decimal("100"), currency="GBP")
+        Invoice.objects.create(vendor=globex, invoice_date=date(2025, 1, 6), subtotal=Decimal("7"), currency="OTHER")
+        Payment.objects.create(invoice=inv, payment_mode="card", amount=Decimal("40"), paid_on=date(2025, 1, 20))
+
+    data = client.get("/api/reports/vendor-spend/?currency=USD").data
+    assert data["vendor_spend"][0]["vendor_name"] == "Acme"
+    assert data["vendor_spend"][0]["total"] == "230.00"  # 100 * 1.10 + 100 * 1.20
+    assert data["vendor_spend"][0]["paid"] == "44.00"
+    assert data["vendor_spend"][1]["total"] == "125.00"
+    assert data["vendor_spend"][1]["unconverted"] == {"OTHER": "7.00"}
+
+    # Moving an invoice to another vendor and deleting one keeps the rollup exact
+    with django_capture_on_commit_callbacks(execute=True):
+        inv.vendor = globex
+        inv.save()
+        Invoice.objects.filter(currency="OTHER").get().delete()
+    rows = {r["vendor_name"]: r for r in client.get("/api/reports/vendor-spend/?currency=GBP&start=2025-01").data["vendor_spend"]}
+    assert rows["Globex"]["total"] == "188.00" and rows["Globex"]["paid"] == "35.20"  # (110 + 125) / 1.25
+    assert rows["Globex"]["unconverted"] == {}
+    before = sorted(VendorSpendRollup.objects.values_list("vendor", "month", "currency", "invoiced", "paid"))
+    call_command("rebuild_spend_rollup")
+    assert sorted(VendorSpendRollup.objects.values_list("vendor", "month", "currency", "invoiced", "paid")) == [
+        r for r in before if r[3] or r[4]
+    ]
+
+
+@pytest.mark.django_db
+def test_deleted_vendors_fold_into_one_vendorless_rollup_row(django_capture_on_commit_callbacks):
+    from decimal import Decimal
+    from django.core.management import call_command
+    from slm.models import Vendor, Invoice, VendorSpendRollup
+
+    acme, globex = Vendor.objects.create(company_name="Acme"), Vendor.objects.create(company_name="Globex")
+    with django_capture_on_commit_callbacks(execute=True):
+        for vendor in (acme, globex):
+            Invoice.objects.create(vendor=vendor, invoice_date=date(2025, 1, 10), subtotal=Decimal("10"))
+        acme.delete()
+        globex.delete()
+        Invoice.objects.create(invoice_date=date(2025, 1, 20), subtotal=Decimal("5"))
+
+    rows = list(VendorSpendRollup.objects.values_list("vendor", "invoice_count", "invoiced"))
+    assert rows == [(None, 3, Decimal("25.00"))]
+    call_command("rebuild_spend_rollup")
+    assert list(VendorSpendRollup.objects.values_list("vendor", "invoice_count", "invoiced")) == rows
+
+
+@pytest.mark.django_db
+def test_report_jobs_are_deduplicated_stored_and_pushed(
+    client, manager, settings, tmp_path, monkeypatch, django_capture_on_commit_callbacks
+):
+    import json
+    from datetime import timedelta
+    from asgiref.sync import async_to_sync
+    from channels.layers import get_channel_layer
+    from django.core.cache import cache
+    from django.test import Client
+    from django.utils import timezone
+    from slm.models import Notification, ReportJob
+    from slm.tasks import generate_report
+
+    cache.clear()
+    settings.MEDIA_ROOT = tmp_path
+    settings.CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+    monkeypatch.setattr(generate_report, "delay", lambda pk: generate_report(pk))
+    layer = get_channel_layer()
+    channel = async_to_sync(layer.new_channel)()
+    async_to_sync(layer.group_add)(f"user_{manager.pk}", channel)
+    SoftwareAsset.objects.create(name="CAD", total_licenses=5)
+    request = {"report": "inventory", "file_type": "json", "params": {}}
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post("/api/reports/jobs/", request, format="json")
+    assert response.status_code == 202
+    job = client.get(response["Location"]).data
+    assert (job["status"], job["row_count"]) == ("completed", 1)
+    payload = json.loads(b"".join(client.get(job["download_url"]).streaming_content))
+    assert payload["rows"][0]["name"] == "CAD" and payload["rows"][0]["available"] == 5
+
+    pushed = async_to_sync(layer.receive)(channel)
+    assert pushed["data"]["report_job"] == {"id": job["id"], "report": "inventory", "status": "completed"}
+    assert Notification.objects.get(user=manager, notification_type="report_ready").link.endswith("/download/")
+
+    # Same parameters over unchanged data: the stored result is shared, nothing is queued
+    other = User.objects.create_user(email="other@test.com", password="pass", role="auditor")
+    client.force_authenticate(user=other)
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        again = client.post("/api/reports/jobs/", request, format="json")
+    assert (again.status_code, again.data["id"], len(callbacks)) == (200, job["id"], 0)
+    assert client.get(again.data["download_url"]).status_code == 200
+
+    with django_capture_on_commit_callbacks(execute=True):
+        SoftwareAsset.objects.create(name="IDE", total_licenses=1)
+    with django_capture_on_commit_callbacks(execute=True):
+        fresh = client.post("/api/reports/jobs/", request, format="json")
+    assert fresh.status_code == 202 and fresh.data["id"] != job["id"]
+    assert ReportJob.objects.get(pk=fresh.data["id"]).row_count == 2
+
+    # A job whose worker died stops blocking the same request once it times out
+    ReportJob.objects.filter(pk=fresh.data["id"]).update(
+        status="running", started_at=timezone.now() - timedelta(minutes=settings.REPORT_JOB_TIMEOUT_MINUTES + 1)
+    )
+    with django_capture_on_commit_callbacks(execute=True):
+        retry = client.post("/api/reports/jobs/", request, format="json")
+    assert retry.status_code == 202 and retry.data["id"] != fresh.data["id"]
+    generate_report(fresh.data["id"])  # the lost task turning up late leaves it failed
+    assert ReportJob.objects.get(pk=fresh.data["id"]).status == "failed"
+
+    bad = client.post("/api/reports/jobs/", {"report": "chargeback", "params": {"group_by": "team"}}, format="json")
+    assert bad.status_code == 400
+    assert APIClient().post("/api/reports/jobs/", request, format="json").status_code in (401, 403)
+
+    web = Client()
+    web.force_login(manager)
+    assert web.get("/reports/jobs/").status_code == 405
+
+
+@pytest.mark.django_db
+def test_spend_cube_tracks_invoice_payment_and_seat_changes(
+    client, monkeypatch, django_capture_on_commit_callbacks, django_assert_max_num_queries
+):
+    from decimal import Decimal
+    from django.core.cache import cache
+    from slm.models import Branch, LicenseContract, Invoice, Payment, Vendor, ExchangeRate, SpendFact
+    from slm.services import spend_cube
+    from slm.services.spend_cube import rebuild_spend_cube
+
+    cache.clear()
+    north = Branch.objects.create(name="North", code="N")
+    ops = Department.objects.create(name="Ops", code="OPS", branch=north)
+    dev = Department.objects.create(name="Dev", code="DEV")
+    acme = Vendor.objects.create(company_name="Acme")
+    asset = SoftwareAsset.objects.create(name="Suite", total_licenses=10)
+    with django_capture_on_commit_callbacks(execute=True):
+        contract = LicenseContract.objects.create(software_asset=asset, vendor=acme, purchase_date=date(2025, 1, 1))
+        for _ in range(2):
+            Allocation.objects.create(software_asset=asset, department=ops, allocated_on=at(2025, 1, 2))
+        Allocation.objects.create(software_asset=asset, department=dev, allocated_on=at(2025, 1, 2))
+        invoice = Invoice.objects.create(
+            invoice_number="C-1", invoice_date=date(2025, 3, 1), vendor=acme, license_contract=contract,
+            subtotal=Decimal("100.00"),
+        )
+        Invoice.objects.create(invoice_number="E-1", invoice_date=date(2025, 3, 9), vendor=acme, currency="EUR", subtotal=Decimal("10.00"))
+        Payment.objects.create(invoice=invoice, payment_mode="card", amount=Decimal("30.00"), paid_on=date(2025, 3, 5))
+        ExchangeRate.objects.create(currency="EUR", date=date(2025, 1, 1), rate=Decimal("1.5"))
+
+    by_dept = client.get("/api/reports/spend-cube/", {"group_by": "department"}).data["rows"]
+    assert [(r["department_name"], r["currency"], r["amount"], r["paid"]) for r in by_dept] == [
+        ("Ops", "USD", "66.67", "20.00"), ("Dev", "USD", "33.33", "10.00"), (None, "EUR", "10.00", "0.00"),
+    ]
+    with django_assert_max_num_queries(0):
+        client.get("/api/reports/spend-cube/", {"group_by": "department"})
+
+    converted = client.get(
+        "/api/reports/spend-cube/", {"group_by": "vendor,month", "convert_to": "USD", "start": "2025-03"}
+    ).data["rows"]
+    assert [(r["vendor_name"], r["amount"], r["invoice_count"]) for r in converted] == [("Acme", "115.00", 2)]
+    branch = client.get("/api/reports/spend-cube/", {"group_by": "branch", "currency": "USD"}).data["rows"]
+    assert {r["branch_name"]: r["amount"] for r in branch} == {"North": "66.67", None: "33.33"}
+
+    # Seat edits refresh invoices from the earliest date they change, and only when the interval changes
+    calls = []
+    monkeypatch.setattr(spend_cube, "refresh_assets", lambda ids, since=None: calls.append((set(ids), since)))
+    seat = Allocation.objects.filter(department=ops).first()
+    seat.notes = "spare laptop"
+    seat.save()
+    assert calls == []
+    seat.returned_on = at(2025, 6, 1)
+    seat.save()
+    assert calls == [({asset.pk}, at(2025, 6, 1))]
+    monkeypatch.undo()
+
+    # Returning Dev's seat before the invoice date moves its share to Ops
+    with django_capture_on_commit_callbacks(execute=True):
+        Allocation.objects.filter(department=dev).first().delete()
+    rows = client.get("/api/reports/spend-cube/", {"group_by": "department", "currency": "USD"}).data["rows"]
+    assert [(r["department_name"], r["amount"]) for r in rows] == [("Ops", "100.00")]
+
+    incremental = sorted(SpendFact.objects.values_list("invoice_id", "department_id", "amount", "paid"))
+    rebuild_spend_cube()
+    assert sorted(SpendFact.objects.values_list("invoice_id", "department_id", "amount", "paid")) == incremental
+    assert client.get("/api/reports/spend-cube/", {"group_by": "team"}).status_code == 400
+
+
+@pytest.mark.django_db
+def test_renewal_forecast_projects_price_history_in_one_batch(client, django_assert_max_num_queries):
+    from decimal import Decimal
+    from django.core.cache import cache
+    from slm.models import LicenseContract, Invoice, RenewalHistory, Vendor, ExchangeRate
+    from slm.services.forecast import forecast_renewals
+
+    cache.clear()
+    ops = Department.objects.create(name="Ops", code="OPS")
+    dev = Department.objects.create(name="Dev", code="DEV")
+    acme, beta = Vendor.objects.create(company_name="Acme"), Vendor.objects.create(company_name="Beta")
+    suite = SoftwareAsset.objects.create(name="Suite", total_licenses=10)
+    tool = SoftwareAsset.objects.create(name="Tool", total_licenses=5)
+    for dept in (ops, ops, dev):
+        Allocation.objects.create(software_asset=suite, department=dept)
+
+    renewed = LicenseContract.objects.create(
+        software_asset=suite, vendor=acme, purchase_date=date(2024, 11, 15), expiry_date=date(2026, 11, 15)
+    )
+    Invoice.objects.create(
+        invoice_number="S-1", invoice_date=date(2024, 11, 15), vendor=acme, license_contract=renewed,
+        subtotal=Decimal("1000.00"),
+    )
+    renewal = Invoice.objects.create(
+        invoice_number="S-2", invoice_date=date(2025, 11, 15), vendor=acme, license_contract=renewed,
+        subtotal=Decimal("1100.00"),
+    )
+    RenewalHistory.objects.create(license_contract=renewed, new_expiry=date(2026, 11, 15), invoice=renewal)
+    # One-off purchases on the contract are not price changes
+    Invoice.objects.create(
+        invoice_number="S-3", invoice_date=date(2026, 1, 5), vendor=acme, license_contract=renewed,
+        subtotal=Decimal("500.00"),
+    )
+    single = LicenseContract.objects.create(
+        software_asset=tool, vendor=beta, purchase_date=date(2026, 3, 1), expiry_date=date(2027, 3, 1)
+    )
+    Invoice.objects.create(
+        invoice_number="T-1", invoice_date=date(2026, 3, 1), vendor=beta, license_contract=single,
+        currency="EUR", subtotal=Decimal("200.00"),
+    )
+    ExchangeRate.objects.create(currency="EUR", date=date(2026, 1, 1), rate=Decimal("1.5"))
+    LicenseContract.objects.create(software_asset=tool, purchase_date=date(2026, 1, 1), expiry_date=date(2027, 1, 1))
+
+    with django_assert_max_num_queries(8):
+        forecast = forecast_renewals(24, "USD", today=date(2026, 10, 18))
+    # 1100 grows 10% a cycle; the never-renewed EUR contract uses the portfolio growth
+    assert (forecast["amount"], forecast["renewals"], forecast["unpriced_contracts"]) == (Decimal("3234.00"), 4, 1)
+    months = {r["month"]: (r["amount"], r["renewals"]) for r in forecast["by_month"] if r["renewals"]}
+    assert months == {
+        "2026-11": (Decimal("1210.00"), 1), "2027-03": (Decimal("330.00"), 1), "2027-11": (Decimal("1331.00"), 1),
+        "2028-03": (Decimal("363.00"), 1),
+    }
+    assert len(forecast["by_month"]) == 24
+    assert [(r["vendor_name"], r["amount"]) for r in forecast["by_vendor"]] == [
+        ("Acme", Decimal("2541.00")), ("Beta", Decimal("693.00")),
+    ]
+    assert [(r["department_name"], r["amount"], r["rightsized"]) for r in forecast["by_department"]] == [
+        ("Ops", Decimal("1694.00"), Decimal("508.20")),
+        ("Dev", Decimal("847.00"), Decimal("254.10")),
+        ("Unallocated", Decimal("693.00"), Decimal("0.00")),
+    ]
+
+    response = client.get("/api/reports/renewal-forecast/", {"months": 12, "currency": "EUR"})
+    assert response.status_code == 200 and len(response.data["by_month"]) == 12
+    assert client.get("/api/reports/renewal-forecast/", {"months": 99}).status_code == 400
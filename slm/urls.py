@@ -48,6 +48,7 @@ urlpatterns = [
     path("branches/<int:pk>/delete/", views.BranchDeleteView.as_view(), name="branch_delete"),
     # Reports & Notifications
     path("reports/", views.ReportsView.as_view(), name="reports"),
+    path("reports/jobs/", views.ReportJobCreateView.as_view(), name="report_job_create"),
     path("reports/inventory/", views.ReportInventoryView.as_view(), name="report_inventory"),
     path("reports/renewal/", views.ReportRenewalView.as_view(), name="report_renewal"),
     path("reports/vendor-spend/", views.ReportVendorSpendView.as_view(), name="report_vendor_spend"),
@@ -2,24 +2,35 @@
 from django.views.generic import (
     TemplateView, ListView, DetailView,
     CreateView, UpdateView, FormView,
-    DeleteView,
+    DeleteView, View,
 )
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.conf import settings
 from django.contrib import messages
 from django.shortcuts import redirect, get_object_or_404
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.utils import timezone
-from django.db.models import Sum, Q
+from django.db import transaction
+from django.db.models import Q
 from datetime import timedelta
+from urllib.parse import urlencode
 
 from .models import (
     SoftwareAsset, LicenseContract, Allocation, Vendor, Invoice, Payment,
-    Notification, Department, Branch, AuditLog, RenewalHistory,
+    Notification, Department, Branch, AuditLog, RenewalHistory, ReportJob,
 )
+from .models.invoice import CURRENCY_CHOICES
 from .forms import (
     SoftwareAssetForm, LicenseContractForm, VendorForm,
     AllocationForm, InvoiceForm, PaymentForm, DepartmentForm, BranchForm,
 )
+from .services.allocation import allocate, update_allocation, SeatsUnavailable
+from .services.dashboard import get_dashboard_stats
+from .services.notifications import get_unread_count, mark_all_read
+from .services import renewals, keyset, audit_archive
+from .services import reports as report_jobs
+from .tasks import generate_report
+from .services.spend import vendor_spend
 
 
 class DashboardView(LoginRequiredMixin, TemplateView):
@@ -30,24 +41,18 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         ctx = super().get_context_data(**kwargs)
         user = self.request.user
         today = timezone.now().date()
-        next_30 = today + timedelta(days=30)
-        next_90 = today + timedelta(days=90)
-        assets = SoftwareAsset.objects.filter(is_deleted=False)
-        contracts = LicenseContract.objects.all()
-        active = contracts.filter(status="active")
-        expiring_30 = active.filter(expiry_date__lte=next_30, expiry_date__gte=today)
-        expiring_90 = active.filter(expiry_date__lte=next_90, expiry_date__gt=next_30)
-        expired = contracts.filter(expiry_date__lt=today, status="active")
-        total_spend = Invoice.objects.aggregate(s=Sum("total"))["s"] or 0
-        ctx["total_assets"] = assets.count()
-        ctx["active_contracts"] = active.count()
-        ctx["expiring_in_30"] = expiring_30.count()
-        ctx["expiring_in_90"] = expiring_90.count()
-        ctx["expired_pending"] = expired.count()
-        ctx["total_spend"] = total_spend
-        ctx["total_vendors"] = Vendor.objects.filter(is_active=True).count()
-        ctx["expiring_contracts"] = expiring_30.select_related("software_asset", "vendor")[:10]
-        ctx["unread_notifications"] = Notification.objects.filter(user=user, is_read=False).count()
+        stats = get_dashboard_stats()
+        ctx["total_assets"] = stats["total_assets"]
+        ctx["active_contracts"] = stats["active_contracts"]
+        ctx["expiring_in_30"] = stats["expiring_in_30_days"]
+        ctx["expiring_in_90"] = stats["expiring_in_90_days"]
+        ctx["expired_pending"] = stats["expired_pending"]
+        ctx["total_spend"] = stats["total_spend"]
+        ctx["total_vendors"] = stats["total_vendors"]
+        ctx["expiring_contracts"] = LicenseContract.objects.filter(
+            status="active", expiry_date__gte=today, expiry_date__lte=today + timedelta(days=30)
+        ).select_related("software_asset", "vendor")[:10]
+        ctx["unread_notifications"] = get_unread_count(user)
         return ctx
 
 
@@ -58,7 +63,7 @@ class AssetListView(LoginRequiredMixin, ListView):
     paginate_by = 20
 
     def get_queryset(self):
-        qs = SoftwareAsset.objects.filter(is_deleted=False).select_related("created_by").order_by("name")
+        qs = SoftwareAsset.objects.filter(is_deleted=False).select_related("created_by").with_usage().order_by("name")
         q = self.request.GET.get("q")
         if q:
             qs = qs.filter(
@@ -76,7 +81,7 @@ class AssetDetailView(LoginRequiredMixin, DetailView):
     context_object_name = "asset"
 
     def get_queryset(self):
-        return SoftwareAsset.objects.filter(is_deleted=False).prefetch_related("contracts", "allocations")
+        return SoftwareAsset.objects.filter(is_deleted=False).prefetch_related("contracts").with_usage()
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
@@ -267,13 +272,13 @@ class AllocationCreateView(LoginRequiredMixin, CreateView):
         return initial
 
     def form_valid(self, form):
-        asset = form.cleaned_data["software_asset"]
-        used = asset.allocations.filter(active_flag=True).count()
-        if used >= asset.total_licenses:
+        try:
+            self.object = allocate(form.instance)
+        except SeatsUnavailable:
             form.add_error("software_asset", "No available licenses for this asset.")
             return self.form_invalid(form)
         messages.success(self.request, "Allocation created successfully.")
-        return super().form_valid(form)
+        return redirect(self.get_success_url())
 
 
 class AllocationUpdateView(LoginRequiredMixin, UpdateView):
@@ -284,10 +289,13 @@ class AllocationUpdateView(LoginRequiredMixin, UpdateView):
     success_url = reverse_lazy("slm:allocation_list")
 
     def form_valid(self, form):
-        if form.cleaned_data.get("returned_on"):
-            form.instance.active_flag = False
+        try:
+            self.object = update_allocation(form.instance)
+        except SeatsUnavailable:
+            form.add_error("software_asset", "No available licenses for this asset.")
+            return self.form_invalid(form)
         messages.success(self.request, "Allocation updated successfully.")
-        return super().form_valid(form)
+        return redirect(self.get_success_url())
 
 
 class PaymentCreateView(LoginRequiredMixin, CreateView):
@@ -404,26 +412,72 @@ class BranchUpdateView(LoginRequiredMixin, UpdateView):
 class ReportsView(LoginRequiredMixin, TemplateView):
     template_name = "slm/reports.html"
 
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        ctx["report_choices"], ctx["file_types"] = ReportJob.REPORTS, ReportJob.FILE_TYPES
+        ctx["report_jobs"] = ReportJob.objects.filter(requested_by=self.request.user)[:10]
+        return ctx
+
+
+class ReportJobCreateView(LoginRequiredMixin, View):
+    """Queue a background report; the result arrives as a notification with a download link."""
+
+    def post(self, request, *args, **kwargs):
+        params = {k: v for k, v in request.POST.items() if k not in ("csrfmiddlewaretoken", "report", "file_type") and v}
+        try:
+            job, created = report_jobs.request_report(
+                request.user, request.POST.get("report"), request.POST.get("file_type", "csv"), params
+            )
+        except ValueError as exc:
+            messages.error(request, str(exc))
+            return redirect("slm:reports")
+        if created:
+            transaction.on_commit(lambda: generate_report.delay(job.pk))
+        if job.status == "completed":
+            messages.success(request, f"{job.get_report_display()} is ready.")
+        else:
+            messages.success(request, f"{job.get_report_display()} queued; you will be notified when it is ready.")
+        return redirect("slm:reports")
+
 
 class ReportInventoryView(LoginRequiredMixin, TemplateView):
     template_name = "slm/report_inventory.html"
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
-        ctx["assets"] = SoftwareAsset.objects.filter(is_deleted=False).select_related("created_by").order_by("name")
+        ctx["assets"] = (
+            SoftwareAsset.objects.filter(is_deleted=False).select_related("created_by").with_usage(live=True).order_by("name")
+        )
         return ctx
 
 
 class ReportRenewalView(LoginRequiredMixin, TemplateView):
     template_name = "slm/report_renewal.html"
+    page_size = 50
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
-        today = timezone.now().date()
-        end = today + timedelta(days=365)
-        ctx["contracts"] = LicenseContract.objects.filter(
-            expiry_date__gte=today, expiry_date__lte=end
-        ).select_related("software_asset", "vendor").order_by("expiry_date")
+        try:
+            start, end = renewals.parse_range(self.request.GET)
+            contracts, cursor = renewals.keyset_page(
+                renewals.renewal_window(start, end).select_related("software_asset", "vendor"),
+                after=self.request.GET.get("after"),
+                limit=self.page_size,
+            )
+        except ValueError as exc:
+            messages.error(self.request, str(exc))
+            start, end = renewals.parse_range({})
+            contracts, cursor = renewals.keyset_page(
+                renewals.renewal_window(start, end).select_related("software_asset", "vendor"), limit=self.page_size
+            )
+        ctx.update(
+            contracts=contracts, start=start, end=end, next_cursor=cursor,
+            is_first_page=not self.request.GET.get("after"),
+            ics_url=self.request.build_absolute_uri(
+                reverse("report-renewal-calendar-ics")
+                + "?" + urlencode({"start": start, "end": end, "token": renewals.feed_token(self.request.user)})
+            ),
+        )
         return ctx
 
 
@@ -432,24 +486,42 @@ class ReportVendorSpendView(LoginRequiredMixin, TemplateView):
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
-        from django.db.models import Sum
-        spend = Invoice.objects.values("vendor").annotate(total=Sum("total")).order_by("-total")
-        vendor_ids = [s["vendor"] for s in spend if s["vendor"]]
-        vendors = {v.id: v for v in Vendor.objects.filter(id__in=vendor_ids)}
-        ctx["rows"] = [
-            {"vendor": vendors.get(s["vendor"]), "total": s["total"]} for s in spend
-        ]
+        currencies = [c for c, _ in CURRENCY_CHOICES if c != "OTHER"]
+        currency = self.request.GET.get("currency", settings.FX_BASE_CURRENCY).upper()
+        if currency not in currencies:
+            currency = settings.FX_BASE_CURRENCY
+        ctx["currency"], ctx["currencies"] = currency, currencies
+        ctx["rows"] = vendor_spend(currency)
         return ctx
 
 
-class ReportAuditView(LoginRequiredMixin, ListView):
-    model = AuditLog
+class ReportAuditView(LoginRequiredMixin, TemplateView):
     template_name = "slm/report_audit.html"
-    context_object_name = "logs"
-    paginate_by = 50
+    page_size = 50
+    ordering = ("-timestamp", "-id")
 
-    def get_queryset(self):
-        return AuditLog.objects.select_related("user").order_by("-timestamp")
+    def get_context_data(self, **kwargs):
+        ctx = super().get_context_data(**kwargs)
+        logs = AuditLog.objects.select_related("user").order_by(*self.ordering)
+        cursor, after = self.request.GET.get("cursor"), None
+        if cursor:
+            try:
+                after = keyset.decode_cursor(AuditLog, self.ordering, cursor)
+                logs = logs.filter(keyset.seek_filter(self.ordering, after))
+            except ValueError as exc:
+                messages.error(self.request, str(exc))
+                cursor = None
+        logs = list(logs[:self.page_size + 1])
+        if len(logs) <= self.page_size:
+            # Older pages continue into archived months
+            after = keyset.position(logs[-1], self.ordering) if logs else after
+            logs += audit_archive.archived_rows(after, self.page_size + 1 - len(logs))
+        next_cursor = None
+        if len(logs) > self.page_size:
+            logs = logs[:self.page_size]
+            next_cursor = keyset.encode_cursor(keyset.position(logs[-1], self.ordering))
+        ctx.update(logs=logs, next_cursor=next_cursor, is_first_page=not cursor)
+        return ctx
 
 
 class NotificationListView(LoginRequiredMixin, ListView):
@@ -473,7 +545,7 @@ class NotificationMarkReadView(LoginRequiredMixin, TemplateView):
 
 class NotificationMarkAllReadView(LoginRequiredMixin, TemplateView):
     def get(self, request, *args, **kwargs):
-        Notification.objects.filter(user=request.user).update(is_read=True)
+        mark_all_read(request.user)
         messages.success(request, "All notifications marked as read.")
         return redirect("slm:notification_list")
 
@@ -536,14 +608,17 @@ class AllocationDeleteView(LoginRequiredMixin, DeleteView):
     template_name = "slm/confirm_delete.html"
     success_url = reverse_lazy("slm:allocation_list")
 
-    def delete(self, request, *args, **kwargs):
-        self.object = self.get_object()
-        # Deactivate instead of hard delete
+    def form_valid(self, form):
+        # Deactivate instead of hard delete; Allocation.save releases the seat
         self.object.active_flag = False
         self.object.save()
-        messages.success(request, "Allocation deactivated successfully.")
+        messages.success(self.request, "Allocation deactivated successfully.")
         return redirect(self.success_url)
 
+    def delete(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        return self.form_valid(None)
+
 
 class DepartmentDeleteView(LoginRequiredMixin, DeleteView):
     model = Department